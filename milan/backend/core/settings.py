@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 from datetime import timedelta
 import dj_database_url
 
@@ -33,14 +33,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'feedback.middleware.MetricsMiddleware',  # Outermost, so latency covers the whole stack
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'feedback.middleware.ReplicaRoutingMiddleware',  # After sessions and auth; only active with DATABASE_REPLICA_URLS
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'feedback.middleware.ProfilerMiddleware',  # Last, so every other view middleware has run
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -87,10 +90,83 @@ if not DATABASES['default']:
         }
     }
 
+# Read Replica Configuration
+# Safe HTTP requests read from a replica; writes, and a user's reads for
+# DB_STICKY_SECONDS after they write, go to the primary (feedback/routers.py).
+# To try it locally, point a replica at a copy of the database, or at the same one.
+DATABASE_REPLICA_URLS = config('DATABASE_REPLICA_URLS', default='', cast=Csv())  # comma-separated database URLs
+for index, url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f'replica{index}'] = {**dj_database_url.parse(url), 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['feedback.routers.ReplicaRouter']
+DB_STICKY_SECONDS = config('DB_STICKY_SECONDS', default=10, cast=int)  # longer than the worst replication lag you expect
+DB_REPLICA_RETRY_SECONDS = config('DB_REPLICA_RETRY_SECONDS', default=30, cast=int)  # how long a replica that failed to connect is skipped
+DB_REPLICA_TIMEOUT = config('DB_REPLICA_TIMEOUT', default=2, cast=int)  # seconds to wait for a replica connection before reading from the primary
+
+# Database Connection Reuse
+# Daphne runs each HTTP request's sync code on a thread of its own and Django
+# keeps one connection per thread, so CONN_MAX_AGE alone opens a new connection
+# for nearly every request. On PostgreSQL, requests instead borrow connections
+# from a psycopg pool shared by all threads; CONN_MAX_AGE applies when the pool
+# is off (other databases, or DB_POOL=False) and keeps the WebSocket thread's
+# connection open between database_sync_to_async calls.
+ASGI_THREADS = config('ASGI_THREADS', default=min(32, (os.cpu_count() or 1) + 4), cast=int)  # Daphne reads the same environment variable to size its thread pool
+DB_POOL = config('DB_POOL', default=True, cast=bool)  # PostgreSQL only; needs psycopg[pool]
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)  # connections kept open while idle
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=ASGI_THREADS, cast=int)  # one per worker thread; more requests wait for a free connection
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)  # seconds a request waits for a connection before failing
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)  # seconds to keep a per-thread connection when not pooling
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)  # test reused connections before handing them out
+
+for alias, database in DATABASES.items():
+    database['CONN_HEALTH_CHECKS'] = DB_CONN_HEALTH_CHECKS
+    if DB_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        database['CONN_MAX_AGE'] = 0  # pooling replaces persistent connections
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_REPLICA_TIMEOUT if alias in DATABASE_REPLICAS else DB_POOL_TIMEOUT,
+        }
+    else:
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+    if alias in DATABASE_REPLICAS and database['ENGINE'] == 'django.db.backends.postgresql':
+        database.setdefault('OPTIONS', {}).setdefault('connect_timeout', DB_REPLICA_TIMEOUT)
+
+# Cache Configuration
+# An in-process LRU per worker in front of a file cache every worker on the
+# host shares (feedback/caching.py). Swap the shared tier for Redis or the
+# database cache when workers run on several hosts.
+CACHE_DIR = config('CACHE_DIR', default=str(BASE_DIR / 'cache'))  # shared tier; must be writable by every worker
+CACHE_TIMEOUT = config('CACHE_TIMEOUT', default=300, cast=int)  # seconds before cached aggregates are recomputed
+CACHE_LOCAL_TIMEOUT = config('CACHE_LOCAL_TIMEOUT', default=5, cast=int)  # seconds a worker may serve what another worker invalidated
+CACHE_LOCAL_MAX_ENTRIES = config('CACHE_LOCAL_MAX_ENTRIES', default=1000, cast=int)  # per worker; least recently used entries go first
+CACHES = {
+    'default': {
+        'BACKEND': 'feedback.caching.TieredCache',
+        'TIMEOUT': CACHE_TIMEOUT,
+        'OPTIONS': {'LOCAL': 'local', 'SHARED': 'shared', 'LOCAL_TIMEOUT': CACHE_LOCAL_TIMEOUT},
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'feedback-local',
+        'OPTIONS': {'MAX_ENTRIES': CACHE_LOCAL_MAX_ENTRIES},
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+        'TIMEOUT': CACHE_TIMEOUT,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+
 # Channels Configuration - Using In-Memory Channel Layer
 CHANNEL_LAYERS = {
     'default': {
         'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        'CONFIG': {
+            'capacity': config('CHANNEL_LAYER_CAPACITY', default=100, cast=int),
+            'expiry': 60,
+        },
     },
 }
 
@@ -143,6 +219,9 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20
 }
+# Serve the profile, team, feedback list/detail and acknowledge endpoints from
+# the async-native views in feedback/async_views.py instead of the DRF ones
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=True, cast=bool)
 
 # JWT Configuration
 SIMPLE_JWT = {
@@ -181,10 +260,31 @@ CORS_ALLOW_HEADERS = [
     'x-csrftoken',
     'x-requested-with',
     'cache-control',
+    'last-event-id',
+    'x-profile',
 ]
 
 # SSE Configuration
-SSE_HEARTBEAT_INTERVAL = 30  # seconds
+SSE_HEARTBEAT_INTERVAL = 30  # seconds, also the /api/sse/ keepalive comment interval
+SSE_IDLE_TIMEOUT = config('SSE_IDLE_TIMEOUT', default=0, cast=int)  # seconds without client messages before closing a WebSocket, 0 disables
+SSE_SEND_QUEUE_SIZE = config('SSE_SEND_QUEUE_SIZE', default=100, cast=int)  # events queued per connection
+SSE_SEND_QUEUE_POLICY = config('SSE_SEND_QUEUE_POLICY', default='disconnect')  # coalesce, drop_oldest or disconnect (client resyncs)
+SSE_COMPRESS_THRESHOLD = config('SSE_COMPRESS_THRESHOLD', default=1024, cast=int)  # bytes; larger WebSocket payloads are deflated when negotiated
+SSE_EVENT_LOG_SIZE = config('SSE_EVENT_LOG_SIZE', default=100, cast=int)  # events kept per user for replay on reconnect
+
+# Metrics Configuration
+METRICS_TOKEN = config('METRICS_TOKEN', default='')  # Bearer token for scrapers on /metrics; staff JWTs also work
+
+# Archive Configuration
+FEEDBACK_ARCHIVE_AFTER_MONTHS = config('FEEDBACK_ARCHIVE_AFTER_MONTHS', default=24, cast=int)  # acknowledged feedback older than this moves to the archive table
+
+# Export Configuration
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)  # rows fetched per cursor round trip by /api/feedbacks/export/
+
+# Profiling Configuration (staff X-Profile header or ProfilingRule in the admin)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'profiles'))  # profiles and their SQL are written here
+PROFILE_KEEP = config('PROFILE_KEEP', default=50, cast=int)  # newest profiles kept; older ones are deleted
+PROFILE_SAMPLE_INTERVAL = config('PROFILE_SAMPLE_INTERVAL', default=0.001, cast=float)  # seconds between stack samples
 
 # Email Configuration (for future use)
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
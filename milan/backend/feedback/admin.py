@@ -1,11 +1,87 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Feedback
+from datetime import datetime
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.functional import cached_property
+from . import search
+from .models import User, Feedback, ArchivedFeedback, ProfilingRule
+
+def estimated_count(model):
+    """Row count from the planner's statistics, or None when there are none"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+        elif connection.vendor == 'sqlite':
+            try:
+                # Filled in by ANALYZE; the first number is the table's row count
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            except Exception:
+                return None
+        else:
+            return None
+        row = cursor.fetchone()
+    if row is None or row[0] is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the statistics estimate instead of COUNT(*) for unfiltered
+    changelists of large tables. Filtered lists still count exactly.
+    """
+    threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if isinstance(queryset, QuerySet) and not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate is not None and estimate > self.threshold:
+                return estimate
+        return super().count
+
+class DateBucketQuerySet(QuerySet):
+    """
+    Answers the year and month levels of the admin date_hierarchy from the
+    first and last dates, two index lookups, instead of a DISTINCT over every row.
+    Years or months with no rows between the first and last may be listed.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None, **kwargs):
+        if kind not in ('year', 'month'):
+            return super().datetimes(field_name, kind, order, tzinfo, **kwargs)
+        dates = self.order_by().values_list(field_name, flat=True)
+        first = dates.order_by(field_name).first()
+        if first is None:
+            return []
+        last = dates.order_by(f'-{field_name}').first()
+        first, last = (timezone.localtime(value) if timezone.is_aware(value) else value for value in (first, last))
+
+        buckets = []
+        year, month = first.year, first.month if kind == 'month' else 1
+        while (year, month) <= (last.year, last.month if kind == 'month' else 1):
+            bucket = datetime(year, month, 1)
+            buckets.append(timezone.make_aware(bucket) if timezone.is_aware(first) else bucket)
+            if kind == 'year':
+                year += 1
+            else:
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return buckets if order == 'ASC' else buckets[::-1]
 
 @admin.register(User)
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_manager', 'manager')
     list_filter = ('is_manager', 'is_staff', 'is_active')
+    list_select_related = ('manager',)
+    autocomplete_fields = ('manager',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = UserAdmin.fieldsets + (
         ('Role Information', {'fields': ('is_manager', 'manager')}),
     )
@@ -17,5 +93,50 @@ class CustomUserAdmin(UserAdmin):
 class FeedbackAdmin(admin.ModelAdmin):
     list_display = ('employee', 'manager', 'sentiment', 'acknowledged', 'created_at')
     list_filter = ('sentiment', 'acknowledged', 'created_at')
+    list_select_related = ('employee', 'manager')
+    date_hierarchy = 'created_at'
+    autocomplete_fields = ('employee', 'manager')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     search_fields = ('employee__username', 'manager__username', 'strengths', 'areas_to_improve')
+    search_help_text = 'Full-text search over strengths and areas to improve, or part of a username'
     readonly_fields = ('created_at', 'updated_at', 'acknowledged_at')
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return DateBucketQuerySet(model=queryset.model, query=queryset.query, using=queryset.db)
+
+    def get_search_results(self, request, queryset, search_term):
+        # icontains across the text and joined usernames scans the whole table;
+        # use the full-text index, and resolve usernames against the small user table
+        search_term = search_term.strip()
+        if not search_term or not search.supported():
+            return super().get_search_results(request, queryset, search_term)
+        sql, params = search.matching_ids(search_term)
+        user_ids = list(User.objects.filter(username__icontains=search_term).values_list('id', flat=True)[:500])
+        condition = Q(id__in=RawSQL(sql, params))
+        if user_ids:
+            condition |= Q(employee_id__in=user_ids) | Q(manager_id__in=user_ids)
+        return queryset.filter(condition), False
+
+@admin.register(ArchivedFeedback)
+class ArchivedFeedbackAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'manager', 'sentiment', 'created_at', 'acknowledged_at')
+    list_filter = ('sentiment',)
+    list_select_related = ('employee', 'manager')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    search_fields = ('employee__username', 'manager__username')
+
+    # Written only by archive_feedback
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ProfilingRule)
+class ProfilingRuleAdmin(admin.ModelAdmin):
+    list_display = ('target', 'mode', 'enabled', 'expires_at', 'created_at')
+    list_editable = ('enabled',)
+    list_filter = ('enabled', 'mode')
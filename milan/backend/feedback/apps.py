@@ -3,3 +3,36 @@ from django.apps import AppConfig
 class FeedbackConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'feedback'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_init, pre_save, post_save, post_delete, post_migrate
+        from django.contrib.auth import get_user_model
+        from . import caching, rollups, search, similarity
+        from .metrics import install_connection_timer, install_query_recorder
+        from .models import Feedback, ProfilingRule
+        from .profiling import install_sql_recorder, rules
+        install_connection_timer()
+        connection_created.connect(install_query_recorder, dispatch_uid='feedback_metrics_query_recorder')
+        connection_created.connect(install_sql_recorder, dispatch_uid='feedback_profiling_sql_recorder')
+        # Workers reload their copy of the profiling rules when the admin changes them
+        post_save.connect(rules.changed, sender=ProfilingRule, dispatch_uid='feedback_profiling_rules_saved')
+        post_delete.connect(rules.changed, sender=ProfilingRule, dispatch_uid='feedback_profiling_rules_deleted')
+        # SQLite drops the full-text triggers whenever a migration rebuilds the feedback table
+        post_migrate.connect(search.restore_triggers, sender=self, dispatch_uid='feedback_search_restore_triggers')
+        # Daily sentiment rollups follow every create, edit, acknowledgement and delete
+        post_init.connect(rollups.remember_key, sender=Feedback, dispatch_uid='feedback_rollups_init')
+        pre_save.connect(rollups.load_key, sender=Feedback, dispatch_uid='feedback_rollups_pre_save')
+        post_save.connect(rollups.feedback_saved, sender=Feedback, dispatch_uid='feedback_rollups_saved')
+        post_delete.connect(rollups.feedback_deleted, sender=Feedback, dispatch_uid='feedback_rollups_deleted')
+        # Near-duplicate index: re-sign feedback when its strengths text changes
+        post_init.connect(similarity.remember_text, sender=Feedback, dispatch_uid='feedback_similarity_init')
+        post_save.connect(similarity.feedback_saved, sender=Feedback, dispatch_uid='feedback_similarity_saved')
+        # Cached profiles, teams and feedback aggregates get new versions on every change
+        User = get_user_model()
+        post_init.connect(caching.remember_user, sender=User, dispatch_uid='feedback_caching_user_init')
+        post_save.connect(caching.user_changed, sender=User, dispatch_uid='feedback_caching_user_saved')
+        post_delete.connect(caching.user_changed, sender=User, dispatch_uid='feedback_caching_user_deleted')
+        post_init.connect(caching.remember_feedback_people, sender=Feedback, dispatch_uid='feedback_caching_feedback_init')
+        post_save.connect(caching.feedback_changed, sender=Feedback, dispatch_uid='feedback_caching_feedback_saved')
+        post_delete.connect(caching.feedback_changed, sender=Feedback, dispatch_uid='feedback_caching_feedback_deleted')
@@ -0,0 +1,288 @@
+"""
+Async-native versions of the hot REST endpoints, served when ASYNC_VIEWS is on.
+
+Under ASGI a DRF view runs on a worker thread for its whole duration, and the
+real-time events it sends hop back to the event loop through async_to_sync.
+These views run on the event loop: queries go through Django's async ORM,
+events are awaited on the channel layer directly, and no thread is held while
+a request waits. Responses, status codes and error bodies match the DRF views
+in feedback.views, whose serializers validate input and shape output here too.
+Only JSON (and form) bodies are parsed; there is no browsable API.
+"""
+import json
+from functools import wraps
+from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import (
+    APIException, AuthenticationFailed, MethodNotAllowed, NotAuthenticated, NotFound,
+    ParseError, PermissionDenied, UnsupportedMediaType, ValidationError,
+)
+from rest_framework.pagination import PageNumberPagination
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from . import caching
+from .channel_manager import channel_manager
+from .encoding import dumps
+from .fieldsets import Fieldset, feedback_fieldset, user_fieldset
+from .models import ArchivedFeedback, Feedback
+from .permissions import IsManagerOrReadOnly
+from .serializers import AcknowledgeFeedbackSerializer, FeedbackSerializer, UserSerializer
+from .views import (
+    FEEDBACK_COUNTS, bootstrap_body, bootstrap_cache_args, bootstrap_etag, bootstrap_page,
+    revalidated, visible_feedback,
+)
+
+User = get_user_model()
+
+
+def json_response(data, status=status.HTTP_200_OK):
+    return HttpResponse(dumps(data), status=status, content_type='application/json')
+
+
+def error_response(exc):
+    """The response DRF's exception handler would give for exc"""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    response = json_response(data, status=exc.status_code)
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        response['WWW-Authenticate'] = JWTAuthentication().authenticate_header(None)
+    return response
+
+
+async def authenticate(request):
+    """
+    JWTAuthentication.authenticate() with the user loaded through the async
+    ORM. Returns None when there is no bearer token.
+    """
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        return None
+    token = auth.get_validated_token(raw_token)
+    try:
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken('Token contained no recognizable user identification')
+    user = await User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+    if user is None:
+        raise AuthenticationFailed('User not found', code='user_not_found')
+    if jwt_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed('User is inactive', code='user_inactive')
+    if jwt_settings.CHECK_REVOKE_TOKEN and token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+        raise AuthenticationFailed("The user's password has been changed.", code='password_changed')
+    return user
+
+
+def async_api_view(methods):
+    """
+    @api_view for async views: requires a valid JWT, checks the method and
+    turns DRF exceptions into DRF-shaped error responses. Token auth needs no
+    CSRF protection, as with DRF's views.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            try:
+                user = await authenticate(request)
+                if user is None:
+                    raise NotAuthenticated()
+                # Later middleware sees the token's user, as with DRF's Request
+                request.user = user
+                if request.method not in methods:
+                    raise MethodNotAllowed(request.method)
+                response = await view(request, *args, **kwargs)
+            except APIException as exc:
+                response = error_response(exc)
+            response['Allow'] = ', '.join(methods)
+            return response
+        return wrapped
+    return decorator
+
+
+def request_data(request):
+    content_type = request.content_type or ''
+    if content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        return request.POST
+    if not request.body:
+        return {}
+    if content_type != 'application/json':
+        raise UnsupportedMediaType(content_type)
+    try:
+        return json.loads(request.body)
+    except ValueError as e:
+        raise ParseError(f'JSON parse error - {e}')
+
+
+async def paginate(request, queryset):
+    """PageNumberPagination over the async ORM; returns (page rows, response body without results)"""
+    pagination = PageNumberPagination()
+    paginator = pagination.django_paginator_class(queryset, pagination.page_size)
+    # Counted here so Paginator doesn't run the count query itself
+    paginator.count = await queryset.acount()
+    page_number = request.GET.get(pagination.page_query_param) or 1
+    if page_number in pagination.last_page_strings:
+        page_number = paginator.num_pages
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage as exc:
+        raise NotFound(pagination.invalid_page_message.format(page_number=page_number, message=str(exc)))
+    pagination.request = request
+    rows = [row async for row in pagination.page.object_list]
+    return rows, {
+        'count': paginator.count,
+        'next': pagination.get_next_link(),
+        'previous': pagination.get_previous_link(),
+    }
+
+
+async def notify(feedback, data, employee_event, manager_event):
+    """Send a change to the employee and the manager, as the DRF views do"""
+    await channel_manager.asend_to_user(user_id=feedback.employee_id, event_type=employee_event, data=data)
+    await channel_manager.asend_to_user(user_id=feedback.manager_id, event_type=manager_event, data=data)
+
+
+@async_api_view(['GET'])
+async def user_profile(request):
+    """Get current user profile"""
+    return json_response(UserSerializer(request.user).data)
+
+
+@async_api_view(['GET'])
+async def team_list(request):
+    """Get team members for managers (?fields= narrows each member)"""
+    if not request.user.is_manager:
+        raise PermissionDenied('Only managers can view team members.')
+    fieldset = user_fieldset(request.GET)
+    return json_response([fieldset.shape(member) for member in await cached_team(request.user)])
+
+
+async def cached_team(manager):
+    """views.cached_team() through the async ORM; the two share cache entries"""
+    async def compute():
+        team_members = [member async for member in User.objects.filter(manager=manager)]
+        return UserSerializer(team_members, many=True).data
+
+    return await caching.aremember(
+        'team', compute, parts=(manager.pk,), namespaces=(caching.team_namespace(manager.pk),),
+    )
+
+
+@async_api_view(['GET'])
+async def bootstrap(request):
+    """Profile, team (managers), first feedback page and counters in one response"""
+    user = request.user
+    cache_args = bootstrap_cache_args(request, user)
+    etag = bootstrap_etag(cache_args)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        async def compute():
+            counts = await visible_feedback(user).aaggregate(**FEEDBACK_COUNTS)
+            team = await cached_team(user) if user.is_manager else None
+            page = [feedback async for feedback in bootstrap_page(user)]
+            return bootstrap_body(request, user, counts, page, team)
+
+        body = await caching.aremember('bootstrap', compute, **cache_args)
+        response = HttpResponse(body, content_type='application/json')
+    return revalidated(response, etag)
+
+
+@async_api_view(['GET', 'POST'])
+async def feedback_list_create(request):
+    """List the feedback a user may read (?include_archived=true adds archived rows), or give feedback"""
+    if request.method == 'POST':
+        return await create_feedback(request)
+    fieldset = feedback_fieldset(request.GET)
+    queryset = fieldset.narrow(visible_feedback(request.user))
+    if request.GET.get('include_archived', '').lower() in ('true', '1', 'yes'):
+        archived = fieldset.narrow(visible_feedback(request.user, ArchivedFeedback))
+        queryset = queryset.order_by().union(archived.order_by(), all=True).order_by('-created_at', '-id')
+    page, body = await paginate(request, queryset)
+    # Users for the whole page in one query, and none when they aren't shown
+    users = await fieldset.aload_users(page)
+    body['results'] = fieldset.serializer(FeedbackSerializer, page, many=True).data
+    if users is not None:
+        body['users'] = users
+    return json_response(body)
+
+
+async def create_feedback(request):
+    serializer = FeedbackSerializer(data=request_data(request), context={'request': request})
+    serializer.is_valid(raise_exception=True)
+    validated_data = dict(serializer.validated_data)
+    employee = await User.objects.filter(id=validated_data.pop('employee_id')).afirst()
+    if employee is None or employee.manager_id != request.user.id:
+        raise ValidationError('You can only give feedback to your team members.')
+    feedback = await Feedback.objects.acreate(employee=employee, manager=request.user, **validated_data)
+
+    feedback_data = FeedbackSerializer(feedback).data
+    await notify(feedback, feedback_data, 'new_feedback', 'feedback_created')
+    return json_response(feedback_data, status=status.HTTP_201_CREATED)
+
+
+@async_api_view(['GET', 'PUT', 'PATCH', 'DELETE'])
+async def feedback_detail(request, pk):
+    """Read, edit or delete one feedback; only the manager who gave it may change it"""
+    # Writes load the whole row; ?fields= and ?expand= only shape reads
+    fieldset = feedback_fieldset(request.GET) if request.method == 'GET' else Fieldset()
+    queryset = fieldset.join(fieldset.narrow(visible_feedback(request.user)))
+    try:
+        feedback = await queryset.aget(pk=pk)
+    except Feedback.DoesNotExist:
+        raise NotFound('No Feedback matches the given query.')
+    if not IsManagerOrReadOnly().has_object_permission(request, None, feedback):
+        raise PermissionDenied()
+
+    if request.method == 'GET':
+        users = await fieldset.aload_users([feedback])
+        data = fieldset.serializer(FeedbackSerializer, feedback).data
+        if users is not None:
+            data['users'] = users
+        return json_response(data)
+
+    if request.method == 'DELETE':
+        feedback_id = feedback.id
+        await feedback.adelete()
+        await notify(feedback, {'id': feedback_id}, 'feedback_deleted', 'feedback_deleted')
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+    serializer = FeedbackSerializer(feedback, data=request_data(request), partial=request.method == 'PATCH')
+    serializer.is_valid(raise_exception=True)
+    validated_data = dict(serializer.validated_data)
+    # The employee can't be changed
+    validated_data.pop('employee_id', None)
+    for field, value in validated_data.items():
+        setattr(feedback, field, value)
+    await feedback.asave()
+
+    feedback_data = FeedbackSerializer(feedback).data
+    await notify(feedback, feedback_data, 'feedback_updated', 'feedback_updated')
+    return json_response(feedback_data)
+
+
+@async_api_view(['POST'])
+async def acknowledge_feedback(request, pk):
+    """Acknowledge feedback (employees only)"""
+    try:
+        feedback = await Feedback.objects.select_related('employee', 'manager').aget(pk=pk, employee=request.user)
+    except Feedback.DoesNotExist:
+        raise NotFound('Feedback not found.')
+    if feedback.acknowledged:
+        raise ValidationError({'detail': 'Feedback already acknowledged.'})
+
+    feedback.acknowledged = True
+    feedback.acknowledged_at = timezone.now()
+    await feedback.asave()
+
+    # The manager first: they need to know it was acknowledged
+    feedback_data = FeedbackSerializer(feedback).data
+    await channel_manager.asend_to_user(user_id=feedback.manager_id, event_type='feedback_acknowledged', data=feedback_data)
+    await channel_manager.asend_to_user(user_id=feedback.employee_id, event_type='feedback_acknowledged', data=feedback_data)
+    return json_response(AcknowledgeFeedbackSerializer(feedback).data)
@@ -0,0 +1,111 @@
+"""Helpers for loading feedback in bulk (seeding, imports)"""
+import csv
+import io
+from contextlib import contextmanager
+from itertools import islice
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.functions import Lower
+
+
+@contextmanager
+def preserve_timestamps(model, *field_names):
+    """
+    Temporarily disable auto_now/auto_now_add on the given fields so that
+    bulk_create keeps the timestamps set on the instances.
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    try:
+        for field in fields:
+            field.auto_now = False
+            field.auto_now_add = False
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+def batched(iterable, size):
+    """Yield lists of up to size items"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class EmailLookup:
+    """
+    Case-insensitive email -> user id cache. resolve() looks up only emails
+    it hasn't seen, in batches of query_size per query; unknown emails are
+    remembered as None so they aren't queried again.
+    """
+
+    def __init__(self, query_size=500):
+        self.ids = {}
+        self.query_size = query_size
+        self.queries = 0
+
+    def resolve(self, emails):
+        missing = {email.strip().lower() for email in emails if email} - self.ids.keys()
+        User = get_user_model()
+        for chunk in batched(sorted(missing), self.query_size):
+            found = dict(
+                User.objects.annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=chunk)
+                .values_list('email_lower', 'id')
+            )
+            self.queries += 1
+            for email in chunk:
+                self.ids[email] = found.get(email)
+
+    def get(self, email):
+        return self.ids.get(email.strip().lower()) if email else None
+
+
+def copy_rows(model, columns, rows):
+    """
+    Insert rows (sequences in `columns` order) with PostgreSQL COPY, which
+    skips per-row INSERT parsing. Works with psycopg 3 and psycopg2.
+    """
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    table = connection.ops.quote_name(model._meta.db_table)
+    column_sql = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in columns)
+    with connection.cursor() as cursor:
+        if is_psycopg3:
+            with cursor.copy(f'COPY {table} ({column_sql}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row(row)
+        else:
+            # Strings are quoted so '' stays an empty string; None is written as
+            # "" too, which FORCE_NULL turns back into NULL for nullable columns
+            buffer = io.StringIO()
+            csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+            buffer.seek(0)
+            nullable = [
+                connection.ops.quote_name(model._meta.get_field(name).column)
+                for name in columns if model._meta.get_field(name).null
+            ]
+            options = f", FORCE_NULL ({', '.join(nullable)})" if nullable else ''
+            cursor.copy_expert(f'COPY {table} ({column_sql}) FROM STDIN WITH (FORMAT csv{options})', buffer)
+
+
+def insert_rows(model, columns, rows):
+    """
+    Insert plain rows without building model instances: COPY on PostgreSQL,
+    one executemany INSERT elsewhere. No defaults or signals are applied.
+    """
+    if not rows:
+        return
+    if connection.vendor == 'postgresql':
+        copy_rows(model, columns, rows)
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    column_sql = ', '.join(connection.ops.quote_name(model._meta.get_field(name).column) for name in columns)
+    placeholders = ', '.join(['%s'] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(f'INSERT INTO {table} ({column_sql}) VALUES ({placeholders})', rows)
@@ -0,0 +1,467 @@
+"""
+Two-tier caching for expensive reads.
+
+TieredCache (the default cache backend) keeps recently used entries in an
+in-process LRU in front of a cache shared by every worker on the host. On top
+of it, remember() and aremember() cache a computed value under a versioned
+key:
+
+- Keys carry the current version of each namespace they depend on, such as
+  'team:12'. invalidate() gives a namespace a new version, so every key built
+  from it is missed at once and old entries simply age out.
+- Only one caller recomputes a missing value: threads (or tasks) of the same
+  process wait for it, and other workers wait on a lock in the shared tier
+  (an O_CREAT | O_EXCL file beside a file cache, whose add() isn't atomic).
+- Values are refreshed shortly before they expire with a probability that
+  grows as expiry nears, scaled by how long they took to compute (XFetch), and
+  expired values are served while one caller recomputes, so a popular key
+  expiring doesn't send every worker to the database at once.
+
+Workers keep local entries, namespace versions included, for at most
+CACHE_LOCAL_TIMEOUT seconds, which bounds how long another worker's
+invalidation takes to reach them.
+"""
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from asgiref.sync import sync_to_async
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from django.utils.functional import cached_property
+from .metrics import Counter
+
+cache_reads = Counter('cache_tier_reads_total', 'TieredCache reads by the tier that answered', ('tier',))
+cache_lookups = Counter('cache_lookups_total', 'remember() lookups by outcome', ('name', 'result'))
+
+# Namespace every cached value depends on; bulk writes that skip model
+# signals (seed, archive, imports) invalidate it
+GLOBAL = 'all'
+# Seconds a worker waits for another one to fill a missing key before
+# computing it itself
+LOCK_TIMEOUT = 10
+LOCK_POLL = 0.05
+
+
+class TieredCache(BaseCache):
+    """
+    A LOCAL cache (an in-process LRU such as LocMemCache) in front of a SHARED
+    one every worker can read (a file or database cache), both named by alias
+    in OPTIONS. Reads try the local tier and fill it from the shared one;
+    writes and deletes go to both. Local entries live at most LOCAL_TIMEOUT
+    seconds.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.local_alias = options.get('LOCAL', 'local')
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+
+    @cached_property
+    def local(self):
+        return caches[self.local_alias]
+
+    @cached_property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def local_timeout_for(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return self.local_timeout if timeout is None else min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        value = self.local.get(key, missing, version=version)
+        if value is not missing:
+            cache_reads.inc('local')
+            return value
+        value = self.shared.get(key, missing, version=version)
+        if value is missing:
+            cache_reads.inc('miss')
+            return default
+        cache_reads.inc('shared')
+        # The shared tier doesn't say how long the entry has left, so keep it
+        # locally for the shortest time it could still be valid
+        self.local.set(key, value, self.local_timeout, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, self.shared_timeout(timeout), version=version)
+        self.local.set(key, value, self.local_timeout_for(timeout), version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # The shared tier decides; only then is the entry copied locally
+        if not self.shared.add(key, value, self.shared_timeout(timeout), version=version):
+            return False
+        self.local.set(key, value, self.local_timeout_for(timeout), version=version)
+        return True
+
+    def shared_timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.local.touch(key, self.local_timeout_for(timeout), version=version)
+        return self.shared.touch(key, self.shared_timeout(timeout), version=version)
+
+    def delete(self, key, version=None):
+        deleted = self.local.delete(key, version=version)
+        return self.shared.delete(key, version=version) or deleted
+
+    def has_key(self, key, version=None):
+        return self.local.has_key(key, version=version) or self.shared.has_key(key, version=version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.local.close(**kwargs)
+        self.shared.close(**kwargs)
+
+    def lock(self, key, timeout):
+        """
+        Take a lock every worker sees, held until unlock() or for at most
+        timeout seconds. FileBasedCache.add() is a has_key() then a set(), so
+        two workers could both win it; a file cache gets an exclusively
+        created file instead.
+        """
+        if not isinstance(self.shared, FileBasedCache):
+            return self.shared.add(key, 1, timeout)
+        path = self.lock_path(key)
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            except FileExistsError:
+                # Left behind by a worker that died holding it?
+                try:
+                    if os.path.getmtime(path) + timeout > time.time():
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def unlock(self, key):
+        if not isinstance(self.shared, FileBasedCache):
+            self.shared.delete(key)
+            return
+        try:
+            os.remove(self.lock_path(key))
+        except FileNotFoundError:
+            pass
+
+    def lock_path(self, key):
+        # Not a cache file (no .djcache suffix), so culling and clear() leave it alone
+        return self.shared._key_to_file(key) + '.lock'
+
+
+def get_cache():
+    return caches[DEFAULT_CACHE_ALIAS]
+
+
+def version_key(namespace):
+    return f'ns:{namespace}'
+
+
+def namespace_version(namespace):
+    cache = get_cache()
+    version = cache.get(version_key(namespace))
+    if version is None:
+        # Start from a fresh value, never 0: a version key evicted from the
+        # shared tier must not bring back entries cached under an old version
+        cache.add(version_key(namespace), time.time_ns(), None)
+        version = cache.get(version_key(namespace))
+    return version
+
+
+def make_key(name, parts=(), namespaces=()):
+    """Cache key for name and parts under the current version of each namespace"""
+    versions = ','.join(f'{namespace}={namespace_version(namespace)}' for namespace in (GLOBAL, *namespaces))
+    return ':'.join(['cached', name, *map(str, parts), versions])
+
+
+def invalidate(*namespaces):
+    """
+    Give namespaces new versions once the current transaction commits, so a
+    reader can't cache data from before the commit under the new version
+    """
+    def bump():
+        cache = get_cache()
+        for namespace in namespaces:
+            cache.set(version_key(namespace), time.time_ns(), None)
+    transaction.on_commit(bump)
+
+
+def refresh_early(expires_at, delta, beta, now):
+    """XFetch: recompute before expiry with a probability that rises as it nears"""
+    return now - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+class Flights:
+    """Lets one caller per key compute while the rest of the process waits for its result"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}  # key -> call shared by threads
+        self.futures = {}  # (event loop, key) -> future shared by tasks
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event()}
+        if not leader:
+            call['done'].wait()
+            if 'error' in call:
+                raise call['error']
+            return call['result']
+        try:
+            call['result'] = fn()
+            return call['result']
+        except BaseException as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+
+    async def ado(self, key, fn):
+        loop = asyncio.get_running_loop()
+        future = self.futures.get((loop, key))
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self.futures[(loop, key)] = loop.create_future()
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Retrieved here, so a failure nobody else awaited isn't logged
+            future.exception()
+            raise
+        finally:
+            del self.futures[(loop, key)]
+
+
+flights = Flights()
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def take_lock(key):
+    """Claim the right to recompute key across workers"""
+    cache = get_cache()
+    if isinstance(cache, TieredCache):
+        return cache.lock(lock_key(key), LOCK_TIMEOUT)
+    return cache.add(lock_key(key), 1, LOCK_TIMEOUT)
+
+
+def release_lock(key):
+    cache = get_cache()
+    if isinstance(cache, TieredCache):
+        cache.unlock(lock_key(key))
+    else:
+        cache.delete(lock_key(key))
+
+
+def store(key, value, timeout, delta):
+    """Keep expired values for another timeout, to serve while one caller recomputes"""
+    get_cache().set(key, (value, time.time() + timeout, delta), timeout * 2)
+
+
+def lookup(name, key, beta):
+    """(value, needs recompute) for a cached entry, or None on a miss"""
+    entry = get_cache().get(key)
+    if entry is None:
+        return None
+    value, expires_at, delta = entry
+    now = time.time()
+    if now >= expires_at:
+        return value, 'stale'
+    if refresh_early(expires_at, delta, beta, now):
+        return value, 'refresh'
+    cache_lookups.inc(name, 'hit')
+    return value, None
+
+
+def remember(name, compute, parts=(), namespaces=(), timeout=None, beta=1.0):
+    """
+    The cached result of compute() for name and parts, which depend on the
+    given namespaces. Recomputed after `timeout` seconds (CACHE_TIMEOUT by
+    default), or when invalidate() is called for one of the namespaces.
+    """
+    cache = get_cache()
+    timeout = cache.default_timeout if timeout is None else timeout
+    key = make_key(name, parts, namespaces)
+    found = lookup(name, key, beta)
+    if found is not None:
+        value, reason = found
+        if reason is None:
+            return value
+        # Expired or picked for early refresh: one worker recomputes, the
+        # rest keep serving what they have
+        if not take_lock(key):
+            cache_lookups.inc(name, 'stale')
+            return value
+        cache_lookups.inc(name, reason)
+        return recompute(key, compute, timeout)
+
+    def fill():
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not take_lock(key):
+            # Another worker is computing it; take its result when it lands
+            time.sleep(LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+            if time.monotonic() > deadline:
+                break
+        cache_lookups.inc(name, 'miss')
+        return recompute(key, compute, timeout)
+
+    return flights.do(key, fill)
+
+
+def recompute(key, compute, timeout):
+    try:
+        started = time.perf_counter()
+        value = compute()
+        store(key, value, timeout, time.perf_counter() - started)
+        return value
+    finally:
+        release_lock(key)
+
+
+async def aremember(name, compute, parts=(), namespaces=(), timeout=None, beta=1.0):
+    """
+    remember() for async views; compute is an async callable. Reads run
+    inline on the event loop: both tiers are local (memory and files in the
+    page cache), so a thread hop would cost more than they do. Writes and the
+    lock run in a thread, since a file cache write can cull (list and delete)
+    the whole cache directory.
+    """
+    cache = get_cache()
+    timeout = cache.default_timeout if timeout is None else timeout
+    key = make_key(name, parts, namespaces)
+    found = lookup(name, key, beta)
+    if found is not None:
+        value, reason = found
+        if reason is None:
+            return value
+        if not await sync_to_async(take_lock, thread_sensitive=False)(key):
+            cache_lookups.inc(name, 'stale')
+            return value
+        cache_lookups.inc(name, reason)
+        return await arecompute(key, compute, timeout)
+
+    async def fill():
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while not await sync_to_async(take_lock, thread_sensitive=False)(key):
+            await asyncio.sleep(LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+            if time.monotonic() > deadline:
+                break
+        cache_lookups.inc(name, 'miss')
+        return await arecompute(key, compute, timeout)
+
+    return await flights.ado(key, fill)
+
+
+async def arecompute(key, compute, timeout):
+    try:
+        started = time.perf_counter()
+        value = await compute()
+        await sync_to_async(store, thread_sensitive=False)(key, value, timeout, time.perf_counter() - started)
+        return value
+    finally:
+        await sync_to_async(release_lock, thread_sensitive=False)(key)
+
+
+# Namespaces, so views and invalidation agree on the names
+def user_namespace(user_id):
+    return f'user:{user_id}'
+
+
+def team_namespace(manager_id):
+    return f'team:{manager_id}'
+
+
+def given_namespace(manager_id):
+    return f'feedback:manager:{manager_id}'
+
+
+def received_namespace(employee_id):
+    return f'feedback:employee:{employee_id}'
+
+
+ALL_FEEDBACK = 'feedback:all'
+# Bumped when anyone's name, email or role changes: feedback shown to a user
+# embeds people outside their own team, such as a former manager
+PEOPLE = 'people'
+# Bumped when a profiling rule is saved or deleted; workers then reload them
+PROFILING = 'profiling'
+PUBLIC_USER_FIELDS = ('username', 'email', 'first_name', 'last_name', 'is_manager')
+
+
+def public_fields(instance):
+    return tuple(instance.__dict__.get(name) for name in PUBLIC_USER_FIELDS)
+
+
+def remember_user(sender, instance, **kwargs):
+    """post_init: note the manager, so moving a user invalidates the old team too, and what others see of them"""
+    instance._cached_manager_id = instance.__dict__.get('manager_id')
+    instance._cached_public = public_fields(instance)
+
+
+def user_changed(sender, instance, raw=False, created=False, update_fields=None, **kwargs):
+    """post_save/post_delete for User"""
+    if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        # Logging in changes nothing that is cached
+        return
+    managers = {instance.manager_id, getattr(instance, '_cached_manager_id', None)} - {None}
+    namespaces = [user_namespace(instance.pk), *(team_namespace(manager_id) for manager_id in managers)]
+    if not created and public_fields(instance) != getattr(instance, '_cached_public', None):
+        namespaces.append(PEOPLE)
+    invalidate(*namespaces)
+    instance._cached_manager_id = instance.manager_id
+    instance._cached_public = public_fields(instance)
+
+
+def remember_feedback_people(sender, instance, **kwargs):
+    """post_init: note the manager and employee, in case a save changes them"""
+    instance._cached_people = (instance.__dict__.get('manager_id'), instance.__dict__.get('employee_id'))
+
+
+def feedback_changed(sender, instance, raw=False, **kwargs):
+    """post_save/post_delete for Feedback"""
+    if raw:
+        return
+    old_manager_id, old_employee_id = getattr(instance, '_cached_people', (None, None))
+    managers = {instance.manager_id, old_manager_id} - {None}
+    employees = {instance.employee_id, old_employee_id} - {None}
+    invalidate(
+        ALL_FEEDBACK,
+        *(given_namespace(manager_id) for manager_id in managers),
+        *(received_namespace(employee_id) for employee_id in employees),
+    )
+    instance._cached_people = (instance.manager_id, instance.employee_id)
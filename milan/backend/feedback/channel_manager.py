@@ -1,9 +1,14 @@
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
-import json
+import logging
 import threading
 import time
 from collections import defaultdict
+from .sse_manager import sse_manager
+from .metrics import channel_send_latency, channel_send_errors
+
+logger = logging.getLogger(__name__)
+
 
 class InMemoryChannelManager:
     """
@@ -36,25 +41,53 @@ class InMemoryChannelManager:
             print(f"Channel Manager: User {user_id} disconnected")
 
     def send_to_user(self, user_id, event_type, data):
-        """Send event to a specific user"""
+        """
+        Record an event in the user's event log and push it to the user
+        if they are connected. Disconnected users pick it up on reconnect.
+        """
+        event = sse_manager.send_to_user(user_id, event_type, data)
+        if self._should_push(user_id):
+            async_to_sync(self._push)(user_id, event_type, event)
+        return event
+
+    async def asend_to_user(self, user_id, event_type, data):
+        """send_to_user() for async views: awaits the channel layer on the running loop"""
+        event = sse_manager.send_to_user(user_id, event_type, data)
+        if self._should_push(user_id):
+            await self._push(user_id, event_type, event)
+        return event
+
+    def _should_push(self, user_id):
+        if not self.is_user_connected(user_id):
+            return False
         if not self.channel_layer:
             print("Channel layer not available")
-            return
+            return False
+        return True
 
+    async def _push(self, user_id, event_type, event):
+        # The in-memory layer's group_send() drops sends to a full channel
+        # without raising; consumers notice the seq gap and fill it from the
+        # event log (SSEConsumer.send_sequenced)
         group_name = f"user_{user_id}"
         
         try:
-            async_to_sync(self.channel_layer.group_send)(
+            started = time.perf_counter()
+            await self.channel_layer.group_send(
                 group_name,
                 {
                     'type': self._convert_event_type(event_type),
                     'event_type': event_type,
-                    'data': data
+                    'seq': event['seq'],
+                    'key': event['key'],
+                    'text': event['text']  # Pre-encoded, no per-connection json.dumps
                 }
             )
-            print(f"Sent {event_type} to user {user_id}")
+            channel_send_latency.observe(time.perf_counter() - started, event_type)
+            logger.debug(f"Sent {event_type} to user {user_id}")
         except Exception as e:
-            print(f"Error sending to user {user_id}: {e}")
+            channel_send_errors.inc('error')
+            logger.error(f"Error sending to user {user_id}: {e}")
 
     def send_to_multiple_users(self, user_ids, event_type, data):
         """Send event to multiple users"""
@@ -1,16 +1,35 @@
 import json
 import asyncio
+from urllib.parse import parse_qs
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
+from rest_framework.exceptions import ValidationError
 from .models import Feedback
 from .serializers import FeedbackSerializer
 from .channel_manager import channel_manager
+from .sse_manager import sse_manager
+from .heartbeat import heartbeat_scheduler
+from .outbound import RESYNC, OutboundQueue
+from .encoding import WireFormat, JSON
+from .fieldsets import feedback_fieldset
+from . import metrics
+from .profiling import Profiler, rules as profiling_rules, MODES as PROFILE_MODES, SAMPLE
 import logging
 
 logger = logging.getLogger(__name__)
 
 class SSEConsumer(AsyncWebsocketConsumer):
+    # Set in connect() when this connection's handlers should be profiled
+    profile_mode = None
+
+    async def dispatch(self, message):
+        if self.profile_mode is None:
+            return await super().dispatch(message)
+        # Handlers run on the event loop thread, so other tasks may show up too
+        profiler = Profiler(self.profile_mode, 'SSEConsumer', {'message_type': message['type'], 'user_id': self.user.id})
+        with profiler.run():
+            return await super().dispatch(message)
+
     async def connect(self):
         self.user = self.scope["user"]
         
@@ -18,6 +37,7 @@ class SSEConsumer(AsyncWebsocketConsumer):
         
         if isinstance(self.user, AnonymousUser):
             logger.warning("WebSocket: Anonymous user attempted connection - rejecting")
+            metrics.ws_rejects.inc('4001')
             await self.close(code=4001)
             return
         
@@ -27,10 +47,39 @@ class SSEConsumer(AsyncWebsocketConsumer):
         # Check if user already has a connection
         if channel_manager.is_user_connected(self.user.id):
             logger.warning(f"WebSocket: User {self.user_id} already connected, closing duplicate")
+            metrics.ws_rejects.inc('4002')
             await self.close(code=4002)
             return
         
+        # Event payloads follow ?fields= and ?expand=, as on the REST endpoints
+        # (blank values count: expand= asks for ids only)
+        params = parse_qs(self.scope.get('query_string', b'').decode(), keep_blank_values=True)
         try:
+            self.fieldset = feedback_fieldset({name: values[0] for name, values in params.items()})
+        except ValidationError as e:
+            logger.warning(f"WebSocket: Rejecting user {self.user_id}: {e.detail['detail']}")
+            metrics.ws_rejects.inc('4005')
+            await self.close(code=4005)
+            return
+        
+        # Negotiate the event encoding (JSON text unless the client asks otherwise)
+        self.wire, subprotocol = WireFormat.negotiate(self.scope, self.get_query_params())
+        if self.wire is None:
+            logger.warning(f"WebSocket: Rejecting user {self.user_id}: no supported subprotocol in {self.scope.get('subprotocols')}")
+            metrics.ws_rejects.inc('4006')
+            await self.close(code=4006)
+            return
+        
+        # Outbound events are queued per connection so a slow client can't
+        # back up the channel layer; see feedback.outbound for the policies
+        self.outbox = OutboundQueue(transport='websocket', user_id=self.user.id)
+        self.drain_task = None
+        
+        try:
+            # Read before joining the group: anything newer is then either
+            # delivered through it or recovered by fill_gap()
+            self.last_seq = sse_manager.current_seq(self.user.id)
+            
             # Join user group
             await self.channel_layer.group_add(
                 self.group_name,
@@ -40,28 +89,49 @@ class SSEConsumer(AsyncWebsocketConsumer):
             # Register connection in our manager
             channel_manager.add_user_connection(self.user.id, self.channel_name)
             
-            await self.accept()
+            await self.accept(subprotocol=subprotocol)
             
             # Send connection confirmation
             await self.send(text_data=json.dumps({
                 'type': 'connected',
                 'message': 'WebSocket connection established',
                 'user_id': self.user_id,
+                'seq': self.last_seq,
+                'encoding': self.wire.cache_key,
                 'timestamp': asyncio.get_event_loop().time()
             }))
+            metrics.ws_connects.inc()
+            metrics.ws_active.inc()
+            self.counted_active = True
+            metrics.ws_messages_sent.inc('connected')
+            
+            # Replay events missed since the client's last_seq, if given
+            await self.replay_missed_events()
             
             logger.info(f"WebSocket: User {self.user_id} connected successfully")
             
-            # Start heartbeat
-            asyncio.create_task(self.heartbeat())
+            # Heartbeats come from the shared scheduler, not a task per socket
+            self.last_activity = asyncio.get_running_loop().time()
+            heartbeat_scheduler.register(self)
+            
+            self.profile_mode = await self.get_profile_mode()
             
         except Exception as e:
             logger.error(f"WebSocket: Error during connection for user {self.user_id}: {e}")
+            metrics.ws_rejects.inc('4003')
             await self.close(code=4003)
 
     async def disconnect(self, close_code):
         logger.info(f"WebSocket: Disconnecting user {getattr(self, 'user_id', 'unknown')} (code: {close_code})")
         
+        heartbeat_scheduler.unregister(self)
+        if getattr(self, 'counted_active', False):
+            self.counted_active = False
+            metrics.ws_active.dec()
+            metrics.ws_disconnects.inc(str(close_code))
+        if getattr(self, 'drain_task', None) is not None:
+            self.drain_task.cancel()
+        
         if hasattr(self, 'group_name'):
             # Leave user group
             await self.channel_layer.group_discard(
@@ -73,9 +143,127 @@ class SSEConsumer(AsyncWebsocketConsumer):
             if hasattr(self, 'user') and self.user and not isinstance(self.user, AnonymousUser):
                 channel_manager.remove_user_connection(self.user.id, self.channel_name)
 
+    async def get_profile_mode(self):
+        """Profile handlers for staff who connect with ?profile=sample|cprofile, or per ProfilingRule"""
+        profiling_rules.start()
+        requested = self.get_query_params().get('profile', [None])[0]
+        if requested is not None and self.user.is_staff:
+            return requested if requested in PROFILE_MODES else SAMPLE
+        return profiling_rules.mode_for('SSEConsumer')
+
+    def get_query_params(self):
+        return parse_qs(self.scope.get('query_string', b'').decode())
+
+    def get_last_seq_param(self):
+        """Read ?last_seq=N from the connection query string"""
+        try:
+            return int(self.get_query_params()['last_seq'][0])
+        except (KeyError, IndexError, ValueError):
+            return None
+
+    async def replay_missed_events(self):
+        """Send buffered events after ?last_seq, or a resync marker if they are gone"""
+        last_seq = self.get_last_seq_param()
+        if last_seq is None:
+            return
+        
+        events, resync_required = sse_manager.get_events_since(self.user.id, last_seq)
+        if resync_required:
+            logger.info(f"WebSocket: User {self.user_id} missed events beyond the buffer, resync required")
+            await self.send(text_data=json.dumps({
+                'type': 'resync_required',
+                'seq': self.last_seq
+            }))
+            return
+        
+        # Replay goes straight to the socket, ahead of anything queued
+        self.last_seq = last_seq
+        for event in events:
+            self.last_seq = event['seq']
+            await self.send(**self.wire.encode_event(self.fieldset.shape_event(event)))
+            metrics.ws_messages_sent.inc(event['type'])
+        if events:
+            logger.info(f"WebSocket: Replayed {len(events)} events to user {self.user_id}")
+
+    async def send_sequenced(self, seq, text, event_type=None, key=None):
+        """Queue a pre-encoded event unless the client has already seen its sequence number"""
+        if seq is not None:
+            if seq <= self.last_seq:
+                return
+            if seq > self.last_seq + 1:
+                # Earlier pushes were lost on the way (the channel layer drops
+                # sends to a full channel); send them from the event log first
+                await self.fill_gap()
+                return
+            self.last_seq = seq
+        await self.enqueue({'seq': seq, 'type': event_type, 'key': key, 'frame': self.encode_frame(seq, text)})
+
+    async def fill_gap(self):
+        """Queue every logged event after last_seq, or resync_required if some are gone"""
+        metrics.channel_send_errors.inc('lost')
+        events, resync_required = sse_manager.get_events_since(self.user.id, self.last_seq)
+        if resync_required:
+            logger.warning(f"WebSocket: User {self.user_id} lost events beyond the buffer, resync required")
+            self.last_seq = sse_manager.current_seq(self.user.id)
+            await self.enqueue(self.resync_item())
+            return
+        logger.info(f"WebSocket: Filling a gap of {len(events)} events for user {self.user_id}")
+        for event in events:
+            self.last_seq = event['seq']
+            if not await self.enqueue({'seq': event['seq'], 'type': event['type'], 'key': event['key'], 'frame': self.encode_frame(event['seq'], event['text'])}):
+                return
+
+    def resync_item(self):
+        text = json.dumps({'type': 'resync_required', 'seq': self.last_seq})
+        return {'seq': None, 'type': 'resync_required', 'key': None, 'frame': {'text_data': text}}
+
+    async def enqueue(self, item):
+        """Queue an item for the socket; returns False once the connection is being dropped"""
+        if not self.outbox.put(item):
+            await self.close_slow_consumer()
+            return False
+        if self.drain_task is None:
+            self.drain_task = asyncio.create_task(self.drain_outbox())
+        return True
+
+    def encode_frame(self, seq, text):
+        """Build send() kwargs for an event in this connection's fieldset and wire format"""
+        if self.fieldset.is_default and self.wire.encoding == JSON and not self.wire.compress:
+            return {'text_data': text}
+        # Other fieldsets and encodings are cached on the event-log entry, built once per event
+        event = sse_manager.get_event(self.user.id, seq) if seq is not None else None
+        if event is None:
+            event = dict(json.loads(text), text=text)
+        return self.wire.encode_event(self.fieldset.shape_event(event))
+
+    async def drain_outbox(self):
+        """Write queued events to the socket; exits once the queue is empty"""
+        try:
+            while True:
+                item = self.outbox.get_nowait()
+                if item is None:
+                    break
+                if item is RESYNC:
+                    # drop_oldest discarded an event the client hasn't seen
+                    self.last_seq = sse_manager.current_seq(self.user.id)
+                    item = self.resync_item()
+                await self.send(**item['frame'])
+                metrics.ws_messages_sent.inc(item['type'] or 'event')
+        finally:
+            self.drain_task = None
+
+    async def close_slow_consumer(self):
+        """Drop a connection whose send queue overflowed; the client resumes with last_seq"""
+        if getattr(self, 'closing_slow', False):
+            return
+        self.closing_slow = True
+        logger.warning(f"WebSocket: User {self.user_id} fell behind, disconnecting for resync")
+        await self.close(code=4009)
+
     async def receive(self, text_data):
         """Handle incoming messages if needed"""
         try:
+            self.last_activity = asyncio.get_running_loop().time()
             data = json.loads(text_data)
             message_type = data.get('type', 'unknown')
             logger.info(f"WebSocket: Received {message_type} from user {getattr(self, 'user_id', 'unknown')}")
@@ -86,70 +274,37 @@ class SSEConsumer(AsyncWebsocketConsumer):
                     'type': 'pong',
                     'timestamp': asyncio.get_event_loop().time()
                 }))
+                metrics.ws_messages_sent.inc('pong')
         except json.JSONDecodeError:
             logger.warning("WebSocket: Invalid JSON received")
 
-    async def heartbeat(self):
-        """Send periodic heartbeat to keep connection alive"""
-        try:
-            heartbeat_count = 0
-            while True:
-                await asyncio.sleep(30)  # Send heartbeat every 30 seconds
-                heartbeat_count += 1
-                await self.send(text_data=json.dumps({
-                    'type': 'heartbeat',
-                    'timestamp': asyncio.get_event_loop().time(),
-                    'count': heartbeat_count
-                }))
-                
-                # Stop heartbeat after 20 beats (10 minutes) to prevent infinite loops
-                if heartbeat_count >= 20:
-                    logger.info(f"WebSocket: Heartbeat limit reached for user {getattr(self, 'user_id', 'unknown')}")
-                    break
-                
-        except Exception as e:
-            logger.error(f"Heartbeat error for user {getattr(self, 'user_id', 'unknown')}: {e}")
+    async def send_heartbeat(self, text):
+        """Send a pre-encoded heartbeat; called by the heartbeat scheduler"""
+        await self.send(text_data=text)
+        metrics.ws_messages_sent.inc('heartbeat')
 
     # Event handlers for different types of messages
     async def new_feedback(self, event):
         """Handle new feedback event"""
-        await self.send(text_data=json.dumps({
-            'type': 'new_feedback',
-            'data': event['data']
-        }))
+        await self.send_sequenced(event.get('seq'), event['text'], event.get('event_type'), event.get('key'))
 
     async def feedback_updated(self, event):
         """Handle feedback updated event"""
-        await self.send(text_data=json.dumps({
-            'type': 'feedback_updated',
-            'data': event['data']
-        }))
+        await self.send_sequenced(event.get('seq'), event['text'], event.get('event_type'), event.get('key'))
 
     async def feedback_deleted(self, event):
         """Handle feedback deleted event"""
-        await self.send(text_data=json.dumps({
-            'type': 'feedback_deleted',
-            'data': event['data']
-        }))
+        await self.send_sequenced(event.get('seq'), event['text'], event.get('event_type'), event.get('key'))
 
     async def feedback_acknowledged(self, event):
         """Handle feedback acknowledged event"""
-        await self.send(text_data=json.dumps({
-            'type': 'feedback_acknowledged',
-            'data': event['data']
-        }))
+        await self.send_sequenced(event.get('seq'), event['text'], event.get('event_type'), event.get('key'))
 
     async def feedback_created(self, event):
         """Handle feedback created event"""
-        await self.send(text_data=json.dumps({
-            'type': 'feedback_created',
-            'data': event['data']
-        }))
+        await self.send_sequenced(event.get('seq'), event['text'], event.get('event_type'), event.get('key'))
 
     # Generic event handler
     async def send_event(self, event):
         """Generic event sender"""
-        await self.send(text_data=json.dumps({
-            'type': event.get('event_type', 'message'),
-            'data': event.get('data', {})
-        }))
+        await self.send_sequenced(event.get('seq'), event['text'], event.get('event_type'), event.get('key'))
@@ -0,0 +1,148 @@
+"""
+Encoding for outbound real-time events.
+
+Events are encoded once when they are dispatched and the ready-to-send text
+is passed through the channel layer and the event log, so fan-out to many
+connections costs no per-connection JSON work. orjson is used when it is
+installed; the standard library json module is the fallback. WebSocket
+clients can also negotiate MessagePack and compression (see WireFormat).
+"""
+import json
+import zlib
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional compact encoding for WebSocket clients that ask for it
+    msgpack = None
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def dumps(obj):
+    """Serialize obj to a JSON string"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_django_encoder.default).decode()
+    return json.dumps(obj, cls=DjangoJSONEncoder)
+
+
+def encode_event(event_type, seq, data):
+    """
+    Encode an event for every transport at once.
+
+    Returns (text, sse): the WebSocket text frame and the Server-Sent Events
+    frame. The data payload is serialized a single time and spliced into both.
+    """
+    data_json = dumps(data)
+    type_json = dumps(event_type)
+    seq_json = 'null' if seq is None else str(seq)
+    text = f'{{"type":{type_json},"seq":{seq_json},"data":{data_json}}}'
+    sse = f"event: {event_type}\ndata: {data_json}\n\n"
+    if seq is not None:
+        sse = f"id: {seq}\n" + sse
+    return text, sse
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+# Binary frames start with one flag byte describing the payload
+FLAG_PLAIN = b'\x00'
+FLAG_DEFLATE = b'\x01'
+
+
+class WireFormat:
+    """
+    Negotiated event encoding for one WebSocket connection.
+
+    Clients pick it with a subprotocol (feedback.json, feedback.json+deflate,
+    feedback.msgpack, feedback.msgpack+deflate) or with ?encoding=msgpack and
+    ?compress=deflate. JSON text frames are the default.
+
+    Events are sent as JSON text frames, or as binary frames of one flag
+    byte (0 plain, 1 zlib-deflated) followed by the payload: msgpack, or
+    UTF-8 JSON when only compression was negotiated. Payloads are deflated
+    only above SSE_COMPRESS_THRESHOLD bytes and only when that makes them
+    smaller. Control messages (connected, heartbeat, pong, resync_required)
+    are always JSON text.
+    """
+
+    def __init__(self, encoding=JSON, compress=False, threshold=None):
+        self.encoding = encoding
+        self.compress = compress
+        self.threshold = threshold if threshold is not None else getattr(settings, 'SSE_COMPRESS_THRESHOLD', 1024)
+        self.cache_key = f"{encoding}+deflate" if compress else encoding
+
+    @property
+    def subprotocol(self):
+        return f"feedback.{self.cache_key}"
+
+    @classmethod
+    def available_encodings(cls):
+        return (JSON, MSGPACK) if msgpack is not None else (JSON,)
+
+    @classmethod
+    def negotiate(cls, scope, query_params):
+        """
+        Return (wire_format, subprotocol to accept or None). If the client
+        offered subprotocols but none can be served (msgpack isn't installed,
+        say), return (None, None): browsers fail a handshake that accepts
+        none of the offered subprotocols, so the connection must be refused.
+        """
+        available = cls.available_encodings()
+        offered = scope.get('subprotocols') or []
+        for requested in offered:
+            name, _, compress = requested.partition('+')
+            if not name.startswith('feedback.') or compress not in ('', 'deflate'):
+                continue
+            encoding = name[len('feedback.'):]
+            if encoding in available:
+                wire = cls(encoding, compress == 'deflate')
+                return wire, requested
+        if offered:
+            return None, None
+
+        encoding = query_params.get('encoding', [JSON])[0]
+        if encoding not in available:
+            encoding = JSON
+        compress = query_params.get('compress', [''])[0] == 'deflate'
+        return cls(encoding, compress), None
+
+    def encode_event(self, event):
+        """
+        Return send() kwargs for an event-log entry ('type', 'seq', 'data',
+        'text'). The frame is cached on the event, so each encoding is built
+        once per event no matter how many connections use it.
+        """
+        if self.encoding == JSON and not self.compress:
+            return {'text_data': event['text']}
+
+        frames = event.setdefault('frames', {})
+        frame = frames.get(self.cache_key)
+        if frame is None:
+            frame = frames[self.cache_key] = self._build(event)
+        return frame
+
+    def _build(self, event):
+        if self.encoding == MSGPACK:
+            payload = msgpack.packb(
+                {'type': event['type'], 'seq': event['seq'], 'data': event['data']},
+                default=_django_encoder.default,
+                use_bin_type=True
+            )
+        else:
+            payload = event['text'].encode()
+
+        if self.compress and len(payload) > self.threshold:
+            compressed = zlib.compress(payload)
+            if len(compressed) < len(payload):
+                return {'bytes_data': FLAG_DEFLATE + compressed}
+
+        if self.encoding == JSON:
+            return {'text_data': event['text']}
+        return {'bytes_data': FLAG_PLAIN + payload}
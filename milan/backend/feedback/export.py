@@ -0,0 +1,155 @@
+import csv
+import json
+from datetime import datetime, time as dt_time, timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import renderers
+from .encoding import dumps
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = (CSV, NDJSON)
+
+# Output column -> ORM lookup; user columns come from one joined query
+COLUMNS = {
+    'id': 'id',
+    'employee_id': 'employee_id',
+    'employee_email': 'employee__email',
+    'employee_first_name': 'employee__first_name',
+    'employee_last_name': 'employee__last_name',
+    'manager_id': 'manager_id',
+    'manager_email': 'manager__email',
+    'manager_first_name': 'manager__first_name',
+    'manager_last_name': 'manager__last_name',
+    'sentiment': 'sentiment',
+    'strengths': 'strengths',
+    'areas_to_improve': 'areas_to_improve',
+    'acknowledged': 'acknowledged',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+    'acknowledged_at': 'acknowledged_at',
+}
+
+# Bytes gathered before yielding, so each chunk is one socket write
+FLUSH_BYTES = 64 * 1024
+
+
+def parse_bound(value, end=False):
+    """
+    Parse a ?from= / ?to= value: an ISO date or datetime. A bare date used as
+    the upper bound covers that whole day. Returns an aware datetime or None.
+    Raises ValueError for anything else.
+    """
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Expected YYYY-MM-DD or an ISO datetime, got {value!r}")
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+    return parsed
+
+
+def export_queryset(queryset, date_from=None, date_to=None, archived=None):
+    """
+    Rows as tuples in COLUMNS order, oldest first; `to` is exclusive.
+    `archived`, an ArchivedFeedback queryset, is merged in when given.
+    """
+    querysets = [queryset] if archived is None else [queryset, archived]
+    if date_from is not None:
+        querysets = [qs.filter(created_at__gte=date_from) for qs in querysets]
+    if date_to is not None:
+        querysets = [qs.filter(created_at__lt=date_to) for qs in querysets]
+    if archived is None:
+        return querysets[0].order_by('created_at', 'id').values_list(*COLUMNS.values())
+    hot, cold = (qs.order_by().values_list(*COLUMNS.values()) for qs in querysets)
+    return hot.union(cold, all=True).order_by('created_at', 'id')
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class _LineBuffer:
+    """File-like target for csv.writer that just hands back each line"""
+
+    def write(self, value):
+        return value
+
+
+class FeedbackExport:
+    """
+    Iterates an export as byte chunks. Rows are read with
+    iterator(chunk_size), a server-side cursor on PostgreSQL, so memory stays
+    flat however many rows there are. `rows` counts rows written so far.
+    """
+
+    def __init__(self, queryset, fmt=CSV, chunk_size=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}, expected one of {FORMATS}")
+        self.queryset = queryset
+        self.fmt = fmt
+        self.chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+        self.rows = 0
+
+    @property
+    def content_type(self):
+        return 'text/csv; charset=utf-8' if self.fmt == CSV else 'application/x-ndjson'
+
+    def lines(self):
+        names = list(COLUMNS)
+        if self.fmt == CSV:
+            writer = csv.writer(_LineBuffer())
+            yield writer.writerow(names)
+            for row in self.queryset.iterator(chunk_size=self.chunk_size):
+                self.rows += 1
+                yield writer.writerow([_isoformat(value) for value in row])
+        else:
+            for row in self.queryset.iterator(chunk_size=self.chunk_size):
+                self.rows += 1
+                yield dumps(dict(zip(names, map(_isoformat, row)))) + '\n'
+
+    def __iter__(self):
+        buffer, size = [], 0
+        for line in self.lines():
+            buffer.append(line)
+            size += len(line)
+            if size >= FLUSH_BYTES:
+                yield ''.join(buffer).encode()
+                buffer, size = [], 0
+        if buffer:
+            yield ''.join(buffer).encode()
+
+    async def __aiter__(self):
+        # Under ASGI a sync iterator would be read into memory in one go, so
+        # step it on the request's sync thread (where its DB cursor lives)
+        chunks = iter(self)
+        step = sync_to_async(next, thread_sensitive=True)
+        done = object()
+        while True:
+            chunk = await step(chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """Lets DRF accept ?format=csv; export views stream their own body"""
+    media_type = 'text/csv'
+    format = CSV
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only error responses get here
+        return json.dumps(data).encode()
+
+
+class NDJSONRenderer(CSVRenderer):
+    """Lets DRF accept ?format=ndjson; export views stream their own body"""
+    media_type = 'application/x-ndjson'
+    format = NDJSON
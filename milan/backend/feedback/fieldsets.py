@@ -0,0 +1,169 @@
+"""
+Sparse fieldsets and user expansion for feedback and user responses.
+
+?fields=id,sentiment,employee keeps only the named fields; id is always kept.
+?expand= names the user relations (employee, manager) to embed as objects,
+and the others are given as ids. Without ?expand both are embedded, as
+before. expand=users gives ids plus a `users` table listing each person once,
+keyed by id: next to `results` on a list, or as one more key on a single
+feedback or event.
+
+Queries follow the fieldset: only the requested columns are loaded (plus the
+keys and the sort column), and users are joined or loaded only when they are
+shown. WebSocket connections pick a fieldset with the same query parameters;
+each shaped event is built once and cached on the event-log entry, like the
+wire formats in feedback.encoding.
+"""
+from functools import cache
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import ValidationError
+from .encoding import encode_event
+from .serializers import FeedbackSerializer, UserSerializer
+
+USER_RELATIONS = ('employee', 'manager')
+# expand value for ids plus a de-duplicated table of users
+USERS = 'users'
+# Loaded whatever the fieldset: permission checks, user loading and the
+# archive union's ordering need them
+KEY_COLUMNS = ('id', 'employee', 'manager', 'created_at')
+
+
+def split(value):
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+@cache
+def readable_fields(serializer_class):
+    return frozenset(name for name, field in serializer_class().fields.items() if not field.write_only)
+
+
+class Fieldset:
+    """The fields and user relations a client asked for; the default keeps the full response"""
+
+    def __init__(self, fields=None, expand=USER_RELATIONS, side_table=False, relations=USER_RELATIONS):
+        self.fields = None if fields is None else frozenset(fields) | {'id'}
+        self.relations = relations
+        self.embedded = frozenset(expand)
+        self.side_table = side_table
+        self.is_default = fields is None and self.embedded == set(relations) and not side_table
+        self.cache_key = 'fields={};expand={}'.format(
+            '*' if self.fields is None else ','.join(sorted(self.fields)),
+            USERS if side_table else ','.join(sorted(self.embedded)),
+        )
+
+    @classmethod
+    def parse(cls, fields, expand, serializer_class, relations=USER_RELATIONS):
+        """A fieldset from raw ?fields= and ?expand= values (None when absent)"""
+        if fields is not None:
+            fields = split(fields)
+            unknown = set(fields) - readable_fields(serializer_class)
+            if unknown:
+                raise ValidationError({'detail': f'Unknown fields: {", ".join(sorted(unknown))}.'})
+        if expand is None:
+            return cls(fields, relations, False, relations)
+        expand = set(split(expand))
+        unknown = expand - set(relations) - ({USERS} if relations else set())
+        if unknown:
+            raise ValidationError({'detail': f'Unknown expand values: {", ".join(sorted(unknown))}.'})
+        if USERS in expand and len(expand) > 1:
+            raise ValidationError({'detail': 'expand=users cannot be combined with other values.'})
+        return cls(fields, expand - {USERS}, USERS in expand, relations)
+
+    def shows(self, name):
+        return self.fields is None or name in self.fields
+
+    @property
+    def joined(self):
+        """Relations embedded as objects"""
+        return [name for name in self.relations if name in self.embedded and self.shows(name)]
+
+    @property
+    def loaded(self):
+        """Relations whose users are needed: embedded ones, or all shown ones for the users table"""
+        return [name for name in self.relations if self.shows(name) and (self.side_table or name in self.embedded)]
+
+    def narrow(self, queryset):
+        """Load only the columns the response needs"""
+        if self.fields is None:
+            return queryset
+        return queryset.only(*self.fields, *KEY_COLUMNS)
+
+    def join(self, queryset):
+        """Join the embedded users, for a single row; select_related() with no names would join everything"""
+        return queryset.select_related(*self.joined) if self.joined else queryset
+
+    def serializer(self, serializer_class, instance, **kwargs):
+        if self.relations:
+            kwargs['expand'] = self.embedded
+        return serializer_class(instance, fields=self.fields, **kwargs)
+
+    def missing_user_ids(self, feedback_list):
+        """Ids of the users to show that select_related() hasn't already loaded"""
+        return {
+            getattr(feedback, feedback._meta.get_field(name).attname)
+            for feedback in feedback_list for name in self.loaded
+            if not feedback._meta.get_field(name).is_cached(feedback)
+        }
+
+    def attach(self, feedback_list, users):
+        """Put loaded users on feedback_list; returns the users table with expand=users, else None"""
+        table = {}
+        for feedback in feedback_list:
+            for name in self.loaded:
+                field = feedback._meta.get_field(name)
+                if not field.is_cached(feedback):
+                    setattr(feedback, name, users[getattr(feedback, field.attname)])
+                user = getattr(feedback, name)
+                table[user.pk] = user
+        if not self.side_table:
+            return None
+        return {str(pk): UserSerializer(table[pk]).data for pk in sorted(table)}
+
+    def load_users(self, feedback_list):
+        """Load the users shown for feedback_list with at most one query"""
+        ids = self.missing_user_ids(feedback_list)
+        return self.attach(feedback_list, user_queryset().in_bulk(ids) if ids else {})
+
+    async def aload_users(self, feedback_list):
+        ids = self.missing_user_ids(feedback_list)
+        return self.attach(feedback_list, await user_queryset().ain_bulk(ids) if ids else {})
+
+    def shape(self, data):
+        """Apply the fieldset to data serialized in full, such as a cached roster entry or an event"""
+        if self.is_default or not isinstance(data, dict):
+            return data
+        shaped = {name: value for name, value in data.items() if self.shows(name)}
+        users = {}
+        for name in self.relations:
+            user = shaped.get(name)
+            if isinstance(user, dict) and name not in self.embedded:
+                shaped[name] = user['id']
+                users[str(user['id'])] = user
+        if self.side_table:
+            shaped[USERS] = users
+        return shaped
+
+    def shape_event(self, event):
+        """An event-log entry with its data shaped, built once per event and fieldset"""
+        if self.is_default:
+            return event
+        variants = event.setdefault('fieldsets', {})
+        shaped = variants.get(self.cache_key)
+        if shaped is None:
+            data = self.shape(event['data'])
+            text, _ = encode_event(event['type'], event['seq'], data)
+            shaped = variants[self.cache_key] = {'type': event['type'], 'seq': event['seq'], 'data': data, 'text': text}
+        return shaped
+
+
+def user_queryset():
+    """Users with only the columns UserSerializer shows"""
+    return get_user_model().objects.only(*UserSerializer.Meta.fields)
+
+
+def feedback_fieldset(params):
+    return Fieldset.parse(params.get('fields'), params.get('expand'), FeedbackSerializer)
+
+
+def user_fieldset(params):
+    return Fieldset.parse(params.get('fields'), params.get('expand'), UserSerializer, relations=())
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import logging
+import math
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HeartbeatScheduler:
+    """
+    Process-wide timer wheel that drives heartbeats and idle timeouts.
+
+    Live consumers are spread over `interval / tick` slots. A single task
+    advances one slot per tick and beats every consumer in it, so the cost
+    is one asyncio task per process instead of one per socket. The task only
+    runs while at least one consumer is registered.
+
+    Consumers need `send_heartbeat(text)`, `close(code)` and a
+    `last_activity` attribute holding the loop time of the last client
+    message.
+    """
+
+    IDLE_CLOSE_CODE = 4008
+
+    def __init__(self, interval=None, idle_timeout=None, tick=1.0):
+        self.interval = interval or getattr(settings, 'SSE_HEARTBEAT_INTERVAL', 30)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else getattr(settings, 'SSE_IDLE_TIMEOUT', 0)
+        self.tick = tick
+        self.slot_count = max(1, math.ceil(self.interval / tick))
+        self.slots = [set() for _ in range(self.slot_count)]
+        self.positions = {}  # consumer -> slot index
+        self.cursor = 0
+        self.task = None
+        self.loop = None
+
+    def register(self, consumer):
+        """Start beating a consumer; call from the consumer's event loop"""
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # First use, or a new event loop (e.g. test runs): start clean
+            self.slots = [set() for _ in range(self.slot_count)]
+            self.positions.clear()
+            self.loop = loop
+            self.task = None
+        self._schedule(consumer)
+        if self.task is None or self.task.done():
+            self.task = loop.create_task(self._run())
+
+    def unregister(self, consumer):
+        """Stop beating a consumer"""
+        slot = self.positions.pop(consumer, None)
+        if slot is not None:
+            self.slots[slot].discard(consumer)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _schedule(self, consumer):
+        # The slot just behind the cursor comes up again in exactly slot_count ticks
+        slot = (self.cursor - 1) % self.slot_count
+        self.slots[slot].add(consumer)
+        self.positions[consumer] = slot
+
+    async def _run(self):
+        while self.positions:
+            await asyncio.sleep(self.tick)
+            due = list(self.slots[self.cursor])
+            self.slots[self.cursor] = set()
+            self.cursor = (self.cursor + 1) % self.slot_count
+            if not due:
+                continue
+
+            now = self.loop.time()
+            # One encoded heartbeat per tick, shared by every consumer in the slot
+            text = json.dumps({'type': 'heartbeat', 'timestamp': now})
+            beats = []
+            for consumer in due:
+                del self.positions[consumer]
+                if self.idle_timeout and now - consumer.last_activity > self.idle_timeout:
+                    beats.append(self._close_idle(consumer))
+                else:
+                    self._schedule(consumer)
+                    beats.append(consumer.send_heartbeat(text))
+            results = await asyncio.gather(*beats, return_exceptions=True)
+            for consumer, result in zip(due, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Heartbeat error for user {getattr(consumer, 'user_id', 'unknown')}: {result}")
+                    self.unregister(consumer)
+
+    async def _close_idle(self, consumer):
+        logger.info(f"WebSocket: Closing idle connection for user {getattr(consumer, 'user_id', 'unknown')}")
+        await consumer.close(code=self.IDLE_CLOSE_CODE)
+
+
+# Global heartbeat scheduler instance
+heartbeat_scheduler = HeartbeatScheduler()
@@ -0,0 +1,121 @@
+import calendar
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from feedback import caching
+from feedback.models import ArchivedFeedback, Feedback, FeedbackLSHBucket, FeedbackSignature, SentimentSuggestion
+
+# Columns copied to the archive; the same order as both tables
+FIELDS = [field.attname for field in ArchivedFeedback._meta.concrete_fields]
+
+
+def months_before(moment, months):
+    """Same day and time `months` calendar months earlier, clamped to month end"""
+    month_index = moment.year * 12 + moment.month - 1 - months
+    year, month = divmod(month_index, 12)
+    day = min(moment.day, calendar.monthrange(year, month + 1)[1])
+    return moment.replace(year=year, month=month + 1, day=day)
+
+
+def table_stats(model):
+    """(row count, on-disk bytes or None) for a model's table"""
+    table = model._meta.db_table
+    rows = model.objects.count()
+    size = None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            size = cursor.fetchone()[0]
+        elif connection.vendor == 'sqlite':
+            try:
+                # Needs SQLite built with SQLITE_ENABLE_DBSTAT_VTAB; table plus its indexes
+                cursor.execute(
+                    "SELECT SUM(pgsize) FROM dbstat WHERE name = %s "
+                    "OR name IN (SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+                    [table, table],
+                )
+                size = cursor.fetchone()[0]
+            except Exception:
+                size = None
+    return rows, size
+
+
+def format_stats(stats):
+    rows, size = stats
+    return f'{rows:,} rows' + (f', {size / 1024 / 1024:,.1f} MB' if size is not None else '')
+
+
+class Command(BaseCommand):
+    help = (
+        'Move acknowledged feedback older than FEEDBACK_ARCHIVE_AFTER_MONTHS into the archive table. '
+        'Rows move in small batches, each in its own transaction, with a pause between batches so it '
+        'can run alongside live traffic (e.g. nightly from cron). The list API only returns archived '
+        'rows with ?include_archived=true.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Archive acknowledged feedback older than this (default: FEEDBACK_ARCHIVE_AFTER_MONTHS)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows moved per transaction')
+        parser.add_argument('--sleep', type=float, default=0.1, help='Seconds to pause between batches')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would move')
+
+    def handle(self, *args, **options):
+        months = options['months'] if options['months'] is not None else settings.FEEDBACK_ARCHIVE_AFTER_MONTHS
+        if months < 1:
+            raise CommandError('--months must be at least 1')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        cutoff = months_before(timezone.now(), months)
+        candidates = Feedback.objects.filter(acknowledged=True, created_at__lt=cutoff)
+        before = table_stats(Feedback)
+        self.stdout.write(f'Hot table: {format_stats(before)}; archive: {format_stats(table_stats(ArchivedFeedback))}')
+
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count():,} acknowledged rows created before {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        started = time.monotonic()
+        moved = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            count = self.move_batch(candidates, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            if batches % 10 == 0:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'  {moved:,} archived ({moved / elapsed if elapsed else 0:,.0f} rows/s)')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        # Moved rows skip the model signals that keep cached aggregates fresh
+        caching.invalidate(caching.GLOBAL)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Hot table: {format_stats(table_stats(Feedback))}; archive: {format_stats(table_stats(ArchivedFeedback))}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved:,} feedback rows created before {cutoff:%Y-%m-%d} in {batches} batches, '
+            f'{elapsed:.1f}s ({moved / elapsed if elapsed else 0:,.0f} rows/s)'
+        ))
+
+    def move_batch(self, candidates, batch_size):
+        """Copy one batch of the oldest candidates to the archive and delete them; returns the count"""
+        with transaction.atomic():
+            batch = candidates.order_by('created_at', 'id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Rows a request is editing right now are left for the next run
+                batch = batch.select_for_update(skip_locked=True)
+            rows = list(batch.values_list(*FIELDS)[:batch_size])
+            if not rows:
+                return 0
+            ArchivedFeedback.objects.bulk_create([ArchivedFeedback(**dict(zip(FIELDS, row))) for row in rows])
+            ids = [row[0] for row in rows]
+            SentimentSuggestion.objects.filter(feedback_id__in=ids).delete()
+            FeedbackLSHBucket.objects.filter(feedback_id__in=ids).delete()
+            FeedbackSignature.objects.filter(feedback_id__in=ids).delete()
+            # Archived feedback still counts in the sentiment rollups, so skip the delete signals
+            Feedback.objects.filter(id__in=ids)._raw_delete(Feedback.objects.db)
+        return len(rows)
@@ -0,0 +1,51 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from feedback.export import FeedbackExport, export_queryset, parse_bound, FORMATS, CSV
+from feedback.models import ArchivedFeedback, Feedback
+
+
+class Command(BaseCommand):
+    help = (
+        'Export feedback with joined employee and manager columns as CSV or NDJSON, '
+        'streaming from a server-side cursor so memory stays flat. '
+        'Same output as GET /api/feedbacks/export/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default=CSV)
+        parser.add_argument('--from', dest='date_from', help='Earliest created_at, YYYY-MM-DD or ISO datetime')
+        parser.add_argument('--to', dest='date_to', help='Latest created_at; a bare date includes that whole day')
+        parser.add_argument('--output', '-o', default='-', help='File to write (default: stdout)')
+        parser.add_argument('--include-archived', action='store_true', help='Also export rows moved to the archive table')
+        parser.add_argument('--chunk-size', type=int, help='Rows fetched per cursor round trip (default: EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        try:
+            date_from = parse_bound(options['date_from'])
+            date_to = parse_bound(options['date_to'], end=True)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        archived = ArchivedFeedback.objects.all() if options['include_archived'] else None
+        queryset = export_queryset(Feedback.objects.all(), date_from, date_to, archived)
+        export = FeedbackExport(queryset, options['format'], options['chunk_size'])
+
+        started = time.monotonic()
+        if options['output'] == '-':
+            self.write(export, sys.stdout.buffer)
+        else:
+            with open(options['output'], 'wb') as f:
+                self.write(export, f)
+        elapsed = time.monotonic() - started
+
+        # Progress goes to stderr so stdout stays clean when piping
+        self.stderr.write(self.style.SUCCESS(
+            f'Exported {export.rows} feedback rows in {elapsed:.1f}s '
+            f'({export.rows / elapsed if elapsed else 0:,.0f} rows/s)'
+        ))
+
+    def write(self, export, stream):
+        for chunk in export:
+            stream.write(chunk)
+        stream.flush()
@@ -0,0 +1,203 @@
+import csv
+import json
+import os
+import time
+from collections import Counter
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from feedback.bulk import EmailLookup, batched, copy_rows, preserve_timestamps
+from feedback import caching, rollups
+from feedback.models import Feedback, ImportCheckpoint
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+
+# Fields written for each imported row, in COPY column order
+FIELDS = [
+    'employee_id', 'manager_id', 'strengths', 'areas_to_improve', 'sentiment',
+    'acknowledged', 'created_at', 'updated_at', 'acknowledged_at',
+]
+SENTIMENTS = {choice for choice, _ in Feedback.SENTIMENT_CHOICES}
+TRUE_VALUES = {'true', '1', 'yes', 'y', 't'}
+FALSE_VALUES = {'false', '0', 'no', 'n', 'f', ''}
+
+
+def parse_timestamp(value, field, required=False):
+    if value in (None, ''):
+        if required:
+            raise ValueError(f'{field} is required')
+        return None
+    parsed = parse_datetime(str(value))
+    if parsed is None:
+        raise ValueError(f'{field} is not an ISO datetime: {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
+    return parsed
+
+
+def parse_bool(value, field):
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else '').strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'{field} is not a boolean: {value!r}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Import historical feedback from NDJSON or CSV (the export_feedback columns work as-is). '
+        'Employee and manager emails are resolved to users through a batched lookup cache; '
+        'created_at, updated_at and acknowledgement state are kept. Rows go in with bulk_create, '
+        'or COPY on PostgreSQL. Progress is checkpointed with every batch, so rerunning the same '
+        'command after a crash resumes where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file')
+        parser.add_argument('--format', choices=[CSV, NDJSON], help='Input format (default: from the file extension)')
+        parser.add_argument('--job', help='Checkpoint name (default: the file name)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Records per transaction')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start from the top')
+        parser.add_argument('--rejects', help='Write rejected records with the reason to this NDJSON file')
+        parser.add_argument('--no-copy', action='store_true', help='Use bulk_create even on PostgreSQL')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist')
+        fmt = options['format'] or (CSV if path.lower().endswith('.csv') else NDJSON)
+        job = options['job'] or os.path.basename(path)
+        self.use_copy = connection.vendor == 'postgresql' and not options['no_copy']
+        self.lookup = EmailLookup()
+
+        checkpoint, _ = ImportCheckpoint.objects.get_or_create(job=job)
+        if options['restart']:
+            checkpoint.position = checkpoint.imported = checkpoint.rejected = 0
+            checkpoint.finished = False
+            checkpoint.save()
+        elif checkpoint.finished:
+            raise CommandError(f'Job {job!r} already finished ({checkpoint.imported} rows); use --restart to import again.')
+        elif checkpoint.position:
+            self.stdout.write(f'Resuming {job!r} after record {checkpoint.position:,}')
+
+        rejects = open(options['rejects'], 'a') if options['rejects'] else None
+        started = time.monotonic()
+        imported_before = checkpoint.imported
+        try:
+            with open(path, newline='' if fmt == CSV else None, encoding='utf-8') as f:
+                records = islice(self.read(f, fmt), checkpoint.position, None)
+                for number, batch in enumerate(batched(records, options['batch_size']), start=1):
+                    rows, errors = self.build_rows(batch, checkpoint.position)
+                    with transaction.atomic():
+                        self.insert(rows)
+                        checkpoint.position += len(batch)
+                        checkpoint.imported += len(rows)
+                        checkpoint.rejected += len(errors)
+                        checkpoint.save()
+                    if rejects:
+                        for error in errors:
+                            rejects.write(json.dumps(error, default=str) + '\n')
+                    if number % 10 == 0:
+                        self.report(checkpoint, imported_before, started)
+        finally:
+            if rejects:
+                rejects.close()
+
+        checkpoint.finished = True
+        checkpoint.save()
+        # Bulk writes skip the model signals that keep cached aggregates fresh
+        caching.invalidate(caching.GLOBAL)
+        elapsed = time.monotonic() - started
+        imported = checkpoint.imported - imported_before
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported:,} feedback rows in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:,.0f} rows/s, {"COPY" if self.use_copy else "bulk_create"}); '
+            f'{checkpoint.rejected:,} records rejected in total, {self.lookup.queries} email lookup queries'
+        ))
+
+    def read(self, f, fmt):
+        """Yield raw records as dicts; unparseable NDJSON lines become {'_error': ...}"""
+        if fmt == CSV:
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                record = {'_error': f'invalid JSON: {e}', '_raw': line[:500]}
+            if not isinstance(record, dict):
+                record = {'_error': 'not a JSON object', '_raw': line[:500]}
+            yield record
+
+    def build_rows(self, batch, position):
+        """Validate a batch; returns (rows in FIELDS order, rejected records)"""
+        self.lookup.resolve(
+            email for record in batch if '_error' not in record
+            for email in (record.get('employee_email'), record.get('manager_email'))
+        )
+        rows, errors = [], []
+        for offset, record in enumerate(batch):
+            try:
+                rows.append(self.build_row(record))
+            except ValueError as e:
+                errors.append({'record': position + offset + 1, 'error': str(e), 'data': record})
+        return rows, errors
+
+    def build_row(self, record):
+        if '_error' in record:
+            raise ValueError(record['_error'])
+        employee_id = self.lookup.get(record.get('employee_email'))
+        manager_id = self.lookup.get(record.get('manager_email'))
+        if employee_id is None:
+            raise ValueError(f"unknown employee_email {record.get('employee_email')!r}")
+        if manager_id is None:
+            raise ValueError(f"unknown manager_email {record.get('manager_email')!r}")
+
+        sentiment = (record.get('sentiment') or 'neutral').strip().lower()
+        if sentiment not in SENTIMENTS:
+            raise ValueError(f'sentiment must be one of {sorted(SENTIMENTS)}, got {sentiment!r}')
+        strengths = record.get('strengths') or ''
+        areas_to_improve = record.get('areas_to_improve') or ''
+        if not strengths and not areas_to_improve:
+            raise ValueError('strengths and areas_to_improve are both empty')
+
+        created_at = parse_timestamp(record.get('created_at'), 'created_at', required=True)
+        acknowledged_at = parse_timestamp(record.get('acknowledged_at'), 'acknowledged_at')
+        acknowledged = parse_bool(record.get('acknowledged', acknowledged_at is not None), 'acknowledged')
+        updated_at = parse_timestamp(record.get('updated_at'), 'updated_at') or acknowledged_at or created_at
+
+        return [
+            employee_id, manager_id, strengths, areas_to_improve, sentiment,
+            acknowledged, created_at, updated_at, acknowledged_at,
+        ]
+
+    def insert(self, rows):
+        if not rows:
+            return
+        if self.use_copy:
+            copy_rows(Feedback, FIELDS, rows)
+        else:
+            with preserve_timestamps(Feedback, 'created_at', 'updated_at'):
+                Feedback.objects.bulk_create([Feedback(**dict(zip(FIELDS, row))) for row in rows])
+        # Bulk inserts skip the save signals, so count the batch into the rollups here
+        rollups.apply(Counter(
+            rollups.rollup_key(created_at, manager_id, sentiment, acknowledged)
+            for _, manager_id, _, _, sentiment, acknowledged, created_at, _, _ in rows
+        ))
+
+    def report(self, checkpoint, imported_before, started):
+        elapsed = time.monotonic() - started
+        imported = checkpoint.imported - imported_before
+        self.stdout.write(
+            f'  record {checkpoint.position:,}: {imported:,} imported '
+            f'({imported / elapsed if elapsed else 0:,.0f} rows/s), {checkpoint.rejected:,} rejected'
+        )
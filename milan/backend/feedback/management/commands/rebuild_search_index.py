@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from feedback import search
+
+
+class Command(BaseCommand):
+    help = (
+        'Recreate the feedback full-text index (FTS5 table and triggers on SQLite, '
+        'tsvector column and GIN index on PostgreSQL) and repopulate it from the feedback table. '
+        'Run after restoring a database, or on SQLite after a migration rebuilt the feedback table.'
+    )
+
+    def handle(self, *args, **options):
+        if not search.supported():
+            raise CommandError(f'Full-text search is not available on {connection.vendor}')
+        started = time.monotonic()
+        search.install(rebuild=True)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the {connection.vendor} search index in {time.monotonic() - started:.1f}s'
+        ))
@@ -0,0 +1,73 @@
+import json
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from feedback import similarity
+from feedback.models import Feedback
+
+
+class Command(BaseCommand):
+    help = (
+        'Report clusters of near-duplicate feedback (copy-pasted strengths text) from the MinHash/LSH '
+        'index. Feedback that is not indexed yet, or was edited since, is indexed first. Clusters come '
+        'from shared LSH buckets confirmed against signatures, so the run is near-linear in the number '
+        'of feedback rows instead of comparing every pair.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=similarity.DUPLICATE_THRESHOLD, help='Estimated Jaccard similarity that counts as a duplicate (0-1)')
+        parser.add_argument('--manager', type=int, action='append', dest='managers', help='Only feedback given by this manager id (repeatable)')
+        parser.add_argument('--min-size', type=int, default=2, help='Smallest cluster to report')
+        parser.add_argument('--limit', type=int, default=20, help='Clusters to print, largest first')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Feedback rows indexed per batch')
+        parser.add_argument('--skip-index', action='store_true', help='Report from the index as it is, without indexing missing feedback')
+        parser.add_argument('--json', action='store_true', help='Print every reported cluster as one JSON object per line')
+
+    def handle(self, *args, **options):
+        if not 0 < options['threshold'] <= 1:
+            raise CommandError('--threshold must be in (0, 1]')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        started = time.monotonic()
+        if not options['skip_index']:
+            indexed = similarity.index_missing(
+                options['batch_size'],
+                progress=lambda count: count % 50000 == 0 and self.stderr.write(f'  {count:,} indexed'),
+            )
+            elapsed = time.monotonic() - started
+            self.stderr.write(
+                f'Indexed {indexed:,} feedback rows in {elapsed:.1f}s '
+                f'({indexed / elapsed if elapsed else 0:,.0f} rows/s)'
+            )
+
+        clustering_started = time.monotonic()
+        found = [
+            cluster for cluster in similarity.clusters(options['threshold'], options['managers'])
+            if len(cluster) >= options['min_size']
+        ]
+        clustering = time.monotonic() - clustering_started
+
+        shown = found if options['json'] else found[:options['limit']]
+        for cluster in shown:
+            self.write_cluster(cluster, options['json'])
+
+        duplicates = sum(len(cluster) for cluster in found)
+        self.stderr.write(self.style.SUCCESS(
+            f'Found {len(found):,} clusters covering {duplicates:,} feedback rows in {clustering:.1f}s '
+            f'(threshold {options["threshold"]}, {time.monotonic() - started:.1f}s in total)'
+        ))
+
+    def write_cluster(self, ids, as_json):
+        rows = Feedback.objects.filter(id__in=ids).values_list('manager_id', 'strengths')
+        managers = Counter()
+        sample = ''
+        for manager_id, strengths in rows:
+            managers[manager_id] += 1
+            sample = sample or strengths
+        if as_json:
+            self.stdout.write(json.dumps({'size': len(ids), 'managers': dict(managers), 'ids': ids, 'sample': sample}))
+            return
+        by_manager = ', '.join(f'{manager_id} ({count})' for manager_id, count in managers.most_common(5))
+        self.stdout.write(f'{len(ids):,} feedback, managers {by_manager}: {sample[:80]!r}')
+        self.stdout.write(f'  ids: {", ".join(map(str, ids[:10]))}{" ..." if len(ids) > 10 else ""}')
@@ -0,0 +1,123 @@
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from feedback import caching, rollups
+from feedback.models import Feedback, SentimentSuggestion
+from feedback.sentiment import get_model
+
+FIELDS = ('id', 'strengths', 'areas_to_improve', 'sentiment', 'created_at', 'manager_id', 'acknowledged')
+
+
+class Command(BaseCommand):
+    help = (
+        'Score feedback text with the in-repo sentiment model and store a suggested sentiment per '
+        'feedback. Text is scored in NumPy batches, so a full pass over the table is cheap; run it '
+        'with --only-missing on a schedule to pick up new, imported or edited feedback. With --apply, '
+        'feedback still on the default "neutral" takes the suggestion when it is confident enough.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Feedback rows scored per batch')
+        parser.add_argument('--only-missing', action='store_true', help='Skip feedback already scored by the current model and unchanged since')
+        parser.add_argument('--apply', action='store_true', help='Set sentiment on neutral feedback from confident suggestions')
+        parser.add_argument('--min-confidence', type=float, default=0.3, help='Confidence needed for --apply (0-1)')
+        parser.add_argument('--dry-run', action='store_true', help='Score and report throughput without writing')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        model = get_model()
+        queryset = Feedback.objects.order_by('id')
+        if options['only_missing']:
+            # Rescore feedback edited since it was scored, or scored by another model version
+            queryset = queryset.exclude(
+                sentiment_suggestion__model_version=model.version,
+                sentiment_suggestion__scored_at__gte=F('updated_at'),
+            )
+
+        started = time.monotonic()
+        scoring = 0.0
+        scored = applied = batches = 0
+        suggested = Counter()
+        last_id = 0
+        while True:
+            rows = list(queryset.filter(id__gt=last_id).values_list(*FIELDS)[:options['batch_size']])
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            scoring_started = time.perf_counter()
+            labels, scores, confidences = model.predict([row[1] for row in rows], [row[2] for row in rows])
+            scoring += time.perf_counter() - scoring_started
+            suggested.update(labels.tolist())
+            scored += len(rows)
+            batches += 1
+
+            if not options['dry_run']:
+                with transaction.atomic():
+                    self.save(rows, labels, scores, confidences, model.version)
+                    if options['apply']:
+                        applied += self.apply(rows, labels, confidences, options['min_confidence'])
+
+            if batches % 20 == 0:
+                self.stdout.write(f'  {scored:,} scored ({scored / (time.monotonic() - started):,.0f} docs/s)')
+
+        if applied:
+            # Bulk writes skip the model signals that keep cached aggregates fresh
+            caching.invalidate(caching.GLOBAL)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            'Suggested: ' + ', '.join(f'{label} {suggested[label]:,}' for label in ('positive', 'neutral', 'negative'))
+        )
+        if options['apply']:
+            self.stdout.write(f'Applied {applied:,} suggestions to neutral feedback')
+        self.stdout.write(self.style.SUCCESS(
+            f'Scored {scored:,} feedback rows with model {model.version} in {elapsed:.1f}s: '
+            f'{scored / elapsed if elapsed else 0:,.0f} docs/s overall, '
+            f'{scored / scoring if scoring else 0:,.0f} docs/s in the model'
+            + (' (dry run, nothing written)' if options['dry_run'] else '')
+        ))
+
+    def save(self, rows, labels, scores, confidences, version):
+        SentimentSuggestion.objects.bulk_create(
+            [
+                SentimentSuggestion(
+                    feedback_id=row[0],
+                    sentiment=label,
+                    score=float(score),
+                    confidence=float(confidence),
+                    model_version=version,
+                )
+                for row, label, score, confidence in zip(rows, labels.tolist(), scores.tolist(), confidences.tolist())
+            ],
+            update_conflicts=True,
+            unique_fields=['feedback'],
+            update_fields=['sentiment', 'score', 'confidence', 'model_version', 'scored_at'],
+        )
+
+    def apply(self, rows, labels, confidences, min_confidence):
+        """Update neutral feedback to confident suggestions; returns how many changed"""
+        suggestions = {}
+        for (id, _, _, sentiment, _, _, _), label, confidence in zip(rows, labels.tolist(), confidences.tolist()):
+            if sentiment == 'neutral' and label != 'neutral' and confidence >= min_confidence:
+                suggestions[id] = label
+        if not suggestions:
+            return 0
+        # rows were read before this transaction: lock the feedback that is
+        # still neutral and count from it, so an edit in between can't move
+        # a rollup count without its row changing
+        locked = Feedback.objects.select_for_update().filter(id__in=suggestions, sentiment='neutral')
+        changes = {}
+        deltas = Counter()
+        for id, created_at, manager_id, acknowledged in locked.values_list('id', 'created_at', 'manager_id', 'acknowledged'):
+            label = suggestions[id]
+            changes.setdefault(label, []).append(id)
+            # A queryset update skips the save signals, so move the rollup counts here
+            deltas[rollups.rollup_key(created_at, manager_id, 'neutral', acknowledged)] -= 1
+            deltas[rollups.rollup_key(created_at, manager_id, label, acknowledged)] += 1
+        for label, ids in changes.items():
+            Feedback.objects.filter(id__in=ids).update(sentiment=label)
+        rollups.apply(deltas)
+        return sum(len(ids) for ids in changes.values())
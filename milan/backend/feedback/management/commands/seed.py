@@ -0,0 +1,223 @@
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from feedback import caching, rollups
+from feedback.bulk import batched, preserve_timestamps
+from feedback.models import Feedback, FeedbackLSHBucket, FeedbackSignature, SentimentSuggestion
+
+User = get_user_model()
+
+SEED_DOMAIN = 'seed.example.com'
+SEED_PASSWORD = 'password'
+
+FIRST_NAMES = [
+    'Aarav', 'Priya', 'James', 'Maria', 'Chen', 'Fatima', 'Lucas', 'Amara', 'Noah', 'Sofia',
+    'Ravi', 'Emma', 'Kenji', 'Olivia', 'Mateo', 'Zara', 'Ethan', 'Ananya', 'Liam', 'Yara',
+]
+LAST_NAMES = [
+    'Sharma', 'Smith', 'Garcia', 'Nguyen', 'Okafor', 'Müller', 'Kim', 'Patel', 'Rossi', 'Silva',
+    'Khan', 'Brown', 'Tanaka', 'Ivanova', 'Haddad', 'Johnson', 'Mehta', 'Dubois', 'Lopez', 'Wang',
+]
+
+STRENGTHS = [
+    'Excellent communication skills and always keeps stakeholders informed.',
+    'Consistently meets deadlines, even under pressure.',
+    'Shows great initiative in problem-solving.',
+    'Helps team members whenever they get stuck.',
+    'Writes clean, well-tested code that is easy to review.',
+    'Very reliable and detail-oriented.',
+    'Brings a calm, constructive attitude to difficult discussions.',
+    'Took ownership of the release process this quarter.',
+    'Mentored two new joiners and got them productive quickly.',
+    'Has deep knowledge of our billing systems.',
+    'Runs focused, well-prepared meetings.',
+    'Proactively flags risks before they become problems.',
+    'Customer feedback about their support work has been outstanding.',
+    'Learns new tools quickly and shares what they learn.',
+    'Delivered the migration project ahead of schedule.',
+    'Documentation they write is clear and thorough.',
+]
+AREAS_MILD = [
+    'Could take on more leadership in cross-team projects.',
+    'Would benefit from presenting their work more often.',
+    'Could delegate more instead of taking everything on personally.',
+    'Should keep building depth in system design.',
+    'Could share progress updates a little earlier.',
+    'Would grow by mentoring more junior colleagues.',
+    'Could be more vocal in planning sessions.',
+    'Should set aside time for longer-term technical improvements.',
+]
+AREAS_SERIOUS = [
+    'Missed several deadlines without raising it early.',
+    'Needs to improve time management and prioritisation.',
+    'Code reviews have been slow and have blocked the team.',
+    'Communication with stakeholders has been inconsistent.',
+    'Quality issues reached production more than once this quarter.',
+    'Needs to follow through on commitments made in planning.',
+    'Has been difficult to reach during on-call shifts.',
+    'Must respond more constructively to feedback from peers.',
+]
+
+# Default sentiment mix: most reviews are positive, few are negative
+SENTIMENT_WEIGHTS = {'positive': 0.55, 'neutral': 0.30, 'negative': 0.15}
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate a deterministic synthetic dataset for load and benchmark runs: '
+        'N managers, M employees per manager and K feedbacks per employee. '
+        f'All seeded accounts use @{SEED_DOMAIN} emails and the password "{SEED_PASSWORD}".'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--managers', type=int, default=10, help='Number of managers (N)')
+        parser.add_argument('--employees-per-manager', type=int, default=10, help='Employees per manager (M)')
+        parser.add_argument('--feedback-per-employee', type=int, default=10, help='Feedbacks per employee (K)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; same seed and --end give the same data')
+        parser.add_argument('--years', type=float, default=3, help='Spread created_at over this many years')
+        parser.add_argument('--end', help='Latest timestamp as YYYY-MM-DD (default: today, UTC)')
+        parser.add_argument('--ack-ratio', type=float, default=0.7, help='Share of feedback that is acknowledged')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create batch')
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded users and feedback first')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        if options['end']:
+            try:
+                end = datetime.strptime(options['end'], '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+            except ValueError:
+                raise CommandError('--end must look like YYYY-MM-DD')
+        else:
+            end = datetime.now(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.end = end
+        self.span_seconds = int(options['years'] * 365.25 * 24 * 3600)
+
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(email__endswith=f'@{SEED_DOMAIN}').exists():
+            raise CommandError('Seeded users already exist; run with --clear to replace them.')
+
+        # One hash for every account keeps user creation cheap
+        self.password_hash = make_password(SEED_PASSWORD)
+
+        started = time.monotonic()
+        manager_ids = self.create_managers(options['managers'])
+        employees = self.create_employees(manager_ids, options['employees_per_manager'])
+        total = self.create_feedback(employees, options['feedback_per_employee'], options['ack_ratio'])
+        # Bulk writes skip the model signals that keep cached aggregates fresh
+        caching.invalidate(caching.GLOBAL)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(manager_ids)} managers, {len(employees)} employees and {total} feedbacks '
+            f'in {elapsed:.1f}s ({total / elapsed if elapsed else 0:,.0f} feedback rows/s)'
+        ))
+
+    def clear(self):
+        seeded = User.objects.filter(email__endswith=f'@{SEED_DOMAIN}')
+        # Raw delete skips loading every row for the delete signals; the
+        # managers' sentiment rollups go with them below
+        seeded_feedback = Feedback.objects.filter(manager__in=seeded.filter(is_manager=True))
+        SentimentSuggestion.objects.filter(feedback__in=seeded_feedback).delete()
+        FeedbackLSHBucket.objects.filter(feedback__in=seeded_feedback).delete()
+        FeedbackSignature.objects.filter(feedback__in=seeded_feedback).delete()
+        deleted = seeded_feedback._raw_delete(Feedback.objects.db)
+        self.stdout.write(f'Deleted {deleted} seeded feedback rows')
+        # Employees first so deleting managers doesn't have to null out their FKs
+        seeded.filter(is_manager=False).delete()
+        seeded.delete()
+
+    def make_user(self, email, is_manager, manager_id=None):
+        return User(
+            username=email,
+            email=email,
+            password=self.password_hash,
+            first_name=self.rng.choice(FIRST_NAMES),
+            last_name=self.rng.choice(LAST_NAMES),
+            is_manager=is_manager,
+            manager_id=manager_id,
+        )
+
+    def bulk_create_users(self, users):
+        for batch in batched(users, self.batch_size):
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+
+    def create_managers(self, count):
+        emails = [f'manager{i}@{SEED_DOMAIN}' for i in range(count)]
+        self.bulk_create_users(self.make_user(email, True) for email in emails)
+        ids = dict(User.objects.filter(email__in=emails).values_list('email', 'id'))
+        return [ids[email] for email in emails]
+
+    def create_employees(self, manager_ids, per_manager):
+        def users():
+            for m, manager_id in enumerate(manager_ids):
+                for e in range(per_manager):
+                    yield self.make_user(f'employee{m}.{e}@{SEED_DOMAIN}', False, manager_id)
+
+        self.bulk_create_users(users())
+        return list(
+            User.objects.filter(email__endswith=f'@{SEED_DOMAIN}', is_manager=False)
+            .order_by('id')
+            .values_list('id', 'manager_id')
+        )
+
+    def make_feedback(self, employee_id, manager_id, ack_ratio):
+        rng = self.rng
+        sentiment = rng.choices(list(SENTIMENT_WEIGHTS), weights=list(SENTIMENT_WEIGHTS.values()))[0]
+
+        # Review lengths vary from a one-liner to a few paragraphs
+        strengths_count = {'positive': rng.randint(2, 6), 'neutral': rng.randint(1, 4), 'negative': rng.randint(1, 2)}[sentiment]
+        areas_pool, areas_count = {
+            'positive': (AREAS_MILD, rng.randint(1, 2)),
+            'neutral': (AREAS_MILD + AREAS_SERIOUS[:3], rng.randint(1, 3)),
+            'negative': (AREAS_SERIOUS, rng.randint(2, 5)),
+        }[sentiment]
+
+        created_at = self.end - timedelta(seconds=rng.randrange(self.span_seconds))
+        age_days = (self.end - created_at).days
+        # Feedback from the last month is less likely to have been acknowledged yet
+        acknowledged = rng.random() < ack_ratio * min(1.0, (age_days + 1) / 30)
+        acknowledged_at = None
+        if acknowledged:
+            acknowledged_at = min(self.end, created_at + timedelta(seconds=rng.randrange(3600, 21 * 24 * 3600)))
+        updated_at = acknowledged_at or created_at
+        if rng.random() < 0.1:
+            updated_at = min(self.end, updated_at + timedelta(hours=rng.randrange(1, 72)))
+
+        return Feedback(
+            employee_id=employee_id,
+            manager_id=manager_id,
+            strengths=' '.join(rng.sample(STRENGTHS, strengths_count)),
+            areas_to_improve=' '.join(rng.sample(areas_pool, min(areas_count, len(areas_pool)))),
+            sentiment=sentiment,
+            acknowledged=acknowledged,
+            created_at=created_at,
+            updated_at=updated_at,
+            acknowledged_at=acknowledged_at,
+        )
+
+    def create_feedback(self, employees, per_employee, ack_ratio):
+        def rows():
+            for employee_id, manager_id in employees:
+                for _ in range(per_employee):
+                    yield self.make_feedback(employee_id, manager_id, ack_ratio)
+
+        total = 0
+        started = time.monotonic()
+        with preserve_timestamps(Feedback, 'created_at', 'updated_at'):
+            for batch in batched(rows(), self.batch_size):
+                with transaction.atomic():
+                    Feedback.objects.bulk_create(batch)
+                    rollups.apply(Counter(rollups.feedback_key(feedback) for feedback in batch))
+                total += len(batch)
+                if total % (self.batch_size * 20) == 0:
+                    rate = total / (time.monotonic() - started)
+                    self.stdout.write(f'  {total:,} feedback rows ({rate:,.0f} rows/s)')
+        return total
@@ -0,0 +1,235 @@
+import functools
+import time
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request [query count, query seconds]; None outside an instrumented request.
+# Context variables follow the request into sync_to_async threads, where the ORM runs.
+current_db_stats = ContextVar('current_db_stats', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """A named metric family with a fixed set of label names"""
+
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        registry.register(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            items = sorted(self.values.items())
+        for labels, value in items:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def set(self, value, *labels):
+        """Mirror a running total kept elsewhere, such as a pool's statistics"""
+        with self.lock:
+            self.values[labels] = value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        # Per-bucket counts are stored non-cumulatively and summed at render time
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            items = sorted((labels, [list(state[0]), state[1], state[2]]) for labels, state in self.values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, labels)} {count}')
+        return lines
+
+
+class Registry:
+    """Holds every metric and renders them in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def add_collector(self, collector):
+        """Call collector() before every render, to refresh values read from elsewhere"""
+        self.collectors.append(collector)
+
+    def render(self):
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# HTTP, labelled by resolved URL name
+http_requests = Counter('http_requests_total', 'HTTP requests by URL name, method and status', ('view', 'method', 'status'))
+http_latency = Histogram('http_request_duration_seconds', 'HTTP request latency by URL name', ('view',))
+http_db_queries = Counter('http_db_queries_total', 'Database queries run while handling requests, by URL name', ('view',))
+http_db_seconds = Counter('http_db_query_seconds_total', 'Time spent in database queries, by URL name', ('view',))
+
+# WebSocket
+ws_connects = Counter('websocket_connects_total', 'Accepted WebSocket connections')
+ws_rejects = Counter('websocket_rejects_total', 'Rejected WebSocket connections by close code', ('code',))
+ws_disconnects = Counter('websocket_disconnects_total', 'WebSocket disconnects by close code', ('code',))
+ws_active = Gauge('websocket_connections', 'Open WebSocket connections')
+ws_messages_sent = Counter('websocket_messages_sent_total', 'Frames sent to WebSocket clients by message type', ('type',))
+
+# Channel layer
+channel_send_latency = Histogram(
+    'channel_layer_send_seconds', 'Time for a channel layer group_send to complete', ('event_type',),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+channel_send_errors = Counter('channel_layer_send_errors_total', 'Failed channel layer sends by reason', ('reason',))
+
+# Database connections. A "new" connection is a full connect (TCP, TLS and
+# authentication to a remote server); a "pool" one is a checkout from the
+# psycopg pool, timed from asking to getting it, health check included.
+db_connections = Counter('db_connections_total', 'Connections handed to Django by database alias and source', ('alias', 'source'))
+db_connect_latency = Histogram(
+    'db_connect_seconds', 'Time to get a usable database connection by alias and source', ('alias', 'source'),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+db_pool_size = Gauge('db_pool_connections', 'Connections held by the pool, in use or idle', ('alias',))
+db_pool_available = Gauge('db_pool_available_connections', 'Idle connections ready in the pool', ('alias',))
+db_pool_waiting = Gauge('db_pool_requests_waiting', 'Checkouts currently waiting for a free connection', ('alias',))
+# Running totals kept by the pool since it started, so counters
+db_pool_opened = Counter('db_pool_connections_opened_total', 'Connections the pool has opened to the server', ('alias',))
+db_pool_wait_seconds = Counter('db_pool_wait_seconds_total', 'Time checkouts have spent waiting for a free connection', ('alias',))
+db_pool_request_errors = Counter('db_pool_request_errors_total', 'Checkouts that timed out or failed', ('alias',))
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper that adds query count and time to the current request"""
+    stats = current_db_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats[0] += 1
+        stats[1] += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created handler: wrap every new database connection once"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def timed_connect(connect):
+    """Wrap DatabaseWrapper.connect to count connections and time getting them"""
+    @functools.wraps(connect)
+    def wrapper(self):
+        source = 'pool' if getattr(self, 'pool', None) is not None else 'new'
+        started = time.perf_counter()
+        try:
+            return connect(self)
+        finally:
+            db_connect_latency.observe(time.perf_counter() - started, self.alias, source)
+            db_connections.inc(self.alias, source)
+    wrapper.timed = True
+    return wrapper
+
+
+def install_connection_timer():
+    """Time every backend's connect(); idempotent"""
+    from django.db.backends.base.base import BaseDatabaseWrapper
+    if not getattr(BaseDatabaseWrapper.connect, 'timed', False):
+        BaseDatabaseWrapper.connect = timed_connect(BaseDatabaseWrapper.connect)
+
+
+def collect_pool_stats():
+    """Copy psycopg pool statistics into the db_pool_* metrics"""
+    from django.db import connections
+    for alias in connections:
+        # Only PostgreSQL has a pool; it is created unopened on first access
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.get_stats()
+        db_pool_size.set(stats.get('pool_size', 0), alias)
+        db_pool_available.set(stats.get('pool_available', 0), alias)
+        db_pool_waiting.set(stats.get('requests_waiting', 0), alias)
+        db_pool_opened.set(stats.get('connections_num', 0), alias)
+        db_pool_wait_seconds.set(stats.get('requests_wait_ms', 0) / 1000, alias)
+        db_pool_request_errors.set(stats.get('requests_errors', 0), alias)
+
+
+registry.add_collector(collect_pool_stats)
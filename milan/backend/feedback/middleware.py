@@ -1,12 +1,22 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
 from channels.middleware import BaseMiddleware
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from rest_framework_simplejwt.tokens import UntypedToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 from urllib.parse import parse_qs
 import logging
+import time
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from .metrics import current_db_stats, http_requests, http_latency, http_db_queries, http_db_seconds
+from .routers import RoutingState, current_routing, mark_wrote, recently_wrote, replica_aliases, sticky_requests
+from .profiling import Profiler, rules, MODES, SAMPLE
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -47,3 +57,221 @@ class JWTAuthMiddleware(BaseMiddleware):
             logger.warning("WebSocket: No token provided")
 
         return await super().__call__(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """
+    Records request count, latency, DB query count and DB time per resolved
+    URL name. Queries are counted by the execute wrapper in feedback.metrics,
+    which adds to the list held in current_db_stats for this request.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = [0, 0.0]
+        token = current_db_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_db_stats.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = [0, 0.0]
+        token = current_db_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_db_stats.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def record(self, request, response, elapsed, stats):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name if match else None) or 'unmatched'
+        http_requests.inc(view, request.method, response.status_code)
+        http_latency.observe(elapsed, view)
+        if stats[0]:
+            http_db_queries.inc(view, amount=stats[0])
+            http_db_seconds.inc(view, amount=stats[1])
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Opens a read-replica routing scope for each request (see feedback.routers).
+    Safe requests read from a replica unless the user wrote within
+    DB_STICKY_SECONDS. The user comes from the JWT's claims, so deciding costs
+    no query; admin sessions are read from the primary. Removed from the stack
+    when no replicas are configured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self.state_for(request, self.user_key(request) or self.session_user_key(request))
+        token = current_routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if state.wrote and state.user_key is None:
+            self.remember_writer(request)
+        return response
+
+    async def __acall__(self, request):
+        user_key = self.user_key(request)
+        if user_key is None and settings.SESSION_COOKIE_NAME in request.COOKIES:
+            user_key = await sync_to_async(self.session_user_key)(request)
+        state = await sync_to_async(self.state_for)(request, user_key)
+        token = current_routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_routing.reset(token)
+        if state.wrote and state.user_key is None:
+            await sync_to_async(self.remember_writer)(request)
+        return response
+
+    def state_for(self, request, user_key):
+        primary = request.method not in SAFE_METHODS
+        if not primary and recently_wrote(user_key):
+            sticky_requests.inc()
+            primary = True
+        return RoutingState(user_key, primary)
+
+    def user_key(self, request):
+        """User id from a valid bearer token, without touching the database"""
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not header.startswith('Bearer '):
+            return None
+        try:
+            token = JWTAuthentication().get_validated_token(header[len('Bearer '):])
+        except (InvalidToken, TokenError):
+            return None
+        user_id = token.get(jwt_settings.USER_ID_CLAIM)
+        return str(user_id) if user_id is not None else None
+
+    def session_user_key(self, request):
+        session = getattr(request, 'session', None)
+        if session is None or settings.SESSION_COOKIE_NAME not in request.COOKIES:
+            return None
+        return session.get('_auth_user_id')
+
+    def remember_writer(self, request):
+        # Writes by a request that had no token, such as a login: stick the
+        # user the view authenticated, if any
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            mark_wrote(str(user.pk))
+
+
+class ProfilerMiddleware:
+    """
+    Profiles a request when a staff user sends `X-Profile: sample|cprofile`,
+    or when an enabled ProfilingRule names its URL. The view is run under the
+    profiler from process_view, on the thread it would have used anyway.
+    Other requests only pay for a header lookup and a dict lookup of their
+    URL name; the rules are kept current off the request path.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            self.process_view = self.process_view_async
+        else:
+            self.process_view = self.process_view_sync
+        rules.start()
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def wanted(self, request):
+        if 'HTTP_X_PROFILE' in request.META:
+            return True
+        return request.resolver_match is not None and request.resolver_match.view_name in rules.targets
+
+    def profiler_for(self, request):
+        """Build a Profiler if this request should be profiled; may query the database (to check staff)"""
+        view_name = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+        requested = request.META.get('HTTP_X_PROFILE')
+        if requested is not None and self.requester_is_staff(request):
+            mode = requested.strip().lower()
+            mode = mode if mode in MODES else SAMPLE
+        else:
+            mode = rules.mode_for(view_name)
+        if mode is None:
+            return None
+        return Profiler(mode, view_name, {'method': request.method, 'path': request.get_full_path()})
+
+    def requester_is_staff(self, request):
+        # Admin session login first, then the API's JWT
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            return True
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return result is not None and result[0].is_staff
+
+    def run_profiled(self, profiler, view_func, request, view_args, view_kwargs):
+        if iscoroutinefunction(view_func):
+            # An async view on the sync stack; Django would run it the same way
+            view_func = async_to_sync(view_func)
+        with profiler.run():
+            response = view_func(request, *view_args, **view_kwargs)
+            # DRF responses render lazily; include rendering in the profile
+            if hasattr(response, 'render') and callable(response.render):
+                response = response.render()
+            profiler.labels['status'] = response.status_code
+        response['X-Profile-Id'] = profiler.profile_id
+        return response
+
+    def process_view_sync(self, request, view_func, view_args, view_kwargs):
+        if not self.wanted(request):
+            return None
+        profiler = self.profiler_for(request)
+        if profiler is None:
+            return None
+        return self.run_profiled(profiler, view_func, request, view_args, view_kwargs)
+
+    async def process_view_async(self, request, view_func, view_args, view_kwargs):
+        if not self.wanted(request):
+            return None
+        profiler = await sync_to_async(self.profiler_for)(request)
+        if profiler is None:
+            return None
+        if iscoroutinefunction(view_func):
+            # Async views run on the event loop thread, which is what gets profiled
+            with profiler.run():
+                response = await view_func(request, *view_args, **view_kwargs)
+                profiler.labels['status'] = response.status_code
+            response['X-Profile-Id'] = profiler.profile_id
+            return response
+        return await sync_to_async(self.run_profiled)(profiler, view_func, request, view_args, view_kwargs)
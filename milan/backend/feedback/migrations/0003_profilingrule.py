@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0002_alter_user_options_alter_user_email_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfilingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(help_text='URL name such as feedback_list_create, or SSEConsumer for WebSocket handlers', max_length=100, unique=True)),
+                ('mode', models.CharField(choices=[('sample', 'Sampling (folded stacks for flamegraphs)'), ('cprofile', 'cProfile (pstats)')], default='sample', max_length=10)),
+                ('enabled', models.BooleanField(default=True)),
+                ('expires_at', models.DateTimeField(blank=True, help_text='Stop profiling after this time', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'feedback_profilingrule',
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0004_importcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedFeedback',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('strengths', models.TextField()),
+                ('areas_to_improve', models.TextField()),
+                ('sentiment', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], default='neutral', max_length=10)),
+                ('acknowledged', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('acknowledged_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'feedback_archivedfeedback',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(condition=models.Q(('acknowledged', True)), fields=['created_at'], name='feedback_archivable_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedfeedback',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_received_feedback', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedfeedback',
+            name='manager',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_given_feedback', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,75 @@
+from django.db import migrations
+
+# The SQL is written out here rather than taken from feedback.search, so
+# later changes to that module don't change what this migration did
+
+POSTGRESQL_INSTALL = [
+    "ALTER TABLE feedback_feedback ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(strengths, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(areas_to_improve, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS feedback_search_vector_idx ON feedback_feedback USING GIN (search_vector)",
+]
+
+POSTGRESQL_UNINSTALL = [
+    "DROP INDEX IF EXISTS feedback_search_vector_idx",
+    "ALTER TABLE feedback_feedback DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS feedback_feedback_fts USING fts5("
+    "strengths, areas_to_improve, content='feedback_feedback', content_rowid='id', "
+    "tokenize='porter unicode61')",
+    """
+    CREATE TRIGGER IF NOT EXISTS feedback_fts_insert AFTER INSERT ON feedback_feedback BEGIN
+        INSERT INTO feedback_feedback_fts(rowid, strengths, areas_to_improve)
+        VALUES (new.id, new.strengths, new.areas_to_improve);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS feedback_fts_delete AFTER DELETE ON feedback_feedback BEGIN
+        INSERT INTO feedback_feedback_fts(feedback_feedback_fts, rowid, strengths, areas_to_improve)
+        VALUES ('delete', old.id, old.strengths, old.areas_to_improve);
+    END""",
+    """
+    CREATE TRIGGER IF NOT EXISTS feedback_fts_update
+    AFTER UPDATE OF strengths, areas_to_improve ON feedback_feedback BEGIN
+        INSERT INTO feedback_feedback_fts(feedback_feedback_fts, rowid, strengths, areas_to_improve)
+        VALUES ('delete', old.id, old.strengths, old.areas_to_improve);
+        INSERT INTO feedback_feedback_fts(rowid, strengths, areas_to_improve)
+        VALUES (new.id, new.strengths, new.areas_to_improve);
+    END""",
+    # Index the feedback that already exists
+    "INSERT INTO feedback_feedback_fts(feedback_feedback_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS feedback_fts_insert",
+    "DROP TRIGGER IF EXISTS feedback_fts_delete",
+    "DROP TRIGGER IF EXISTS feedback_fts_update",
+    "DROP TABLE IF EXISTS feedback_feedback_fts",
+]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+    """
+    Full-text index over feedback text: a generated tsvector column with a
+    GIN index on PostgreSQL, an FTS5 table kept in sync by triggers on SQLite.
+    Other backends get no index. See feedback/search.py.
+    """
+
+    dependencies = [
+        ('feedback', '0005_archivedfeedback'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'postgresql': POSTGRESQL_INSTALL, 'sqlite': SQLITE_INSTALL}),
+            run({'postgresql': POSTGRESQL_UNINSTALL, 'sqlite': SQLITE_UNINSTALL}),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['-created_at', '-id'], name='feedback_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['sentiment', '-created_at', '-id'], name='feedback_sentiment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['acknowledged', '-created_at', '-id'], name='feedback_acknowledged_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0007_feedback_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sentiment', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=10)),
+                ('acknowledged', models.BooleanField()),
+                ('count', models.IntegerField(default=0)),
+                ('manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sentiment_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'feedback_sentimentrollup',
+                'indexes': [models.Index(fields=['day'], name='feedback_rollup_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('manager', 'day', 'sentiment', 'acknowledged'), name='feedback_sentimentrollup_key')],
+            },
+        ),
+    ]
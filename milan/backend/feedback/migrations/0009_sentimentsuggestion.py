@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0008_sentimentrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentSuggestion',
+            fields=[
+                ('feedback', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sentiment_suggestion', serialize=False, to='feedback.feedback')),
+                ('sentiment', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=10)),
+                ('score', models.FloatField()),
+                ('confidence', models.FloatField()),
+                ('model_version', models.CharField(max_length=20)),
+                ('scored_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'feedback_sentimentsuggestion',
+            },
+        ),
+    ]
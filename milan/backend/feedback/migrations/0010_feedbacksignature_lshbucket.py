@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feedback', '0009_sentimentsuggestion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackSignature',
+            fields=[
+                ('feedback', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='minhash_signature', serialize=False, to='feedback.feedback')),
+                ('signature', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'feedback_feedbacksignature',
+            },
+        ),
+        migrations.CreateModel(
+            name='FeedbackLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('feedback', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='feedback.feedback')),
+            ],
+            options={
+                'db_table': 'feedback_lshbucket',
+                'indexes': [models.Index(fields=['key', 'feedback'], name='feedback_lshbucket_key_idx')],
+            },
+        ),
+    ]
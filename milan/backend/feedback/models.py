@@ -57,6 +57,167 @@ class Feedback(models.Model):
     class Meta:
         ordering = ['-created_at']
         db_table = 'feedback_feedback'
+        indexes = [
+            # Lets archive_feedback find old acknowledged rows without a full scan
+            models.Index(fields=['created_at'], name='feedback_archivable_idx', condition=models.Q(acknowledged=True)),
+            # Default ordering (the admin adds -id as a tiebreaker), date_hierarchy and the admin list filters
+            models.Index(fields=['-created_at', '-id'], name='feedback_created_idx'),
+            models.Index(fields=['sentiment', '-created_at', '-id'], name='feedback_sentiment_idx'),
+            models.Index(fields=['acknowledged', '-created_at', '-id'], name='feedback_acknowledged_idx'),
+        ]
     
     def __str__(self):
         return f"Feedback for {self.employee} from {self.manager}"
+
+class ArchivedFeedback(models.Model):
+    """
+    Acknowledged feedback moved out of the hot table by archive_feedback.
+    Ids are kept and the columns mirror Feedback in the same order, so the
+    two tables can be combined with UNION.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    employee = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_received_feedback'
+    )
+    manager = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_given_feedback'
+    )
+    strengths = models.TextField()
+    areas_to_improve = models.TextField()
+    sentiment = models.CharField(max_length=10, choices=Feedback.SENTIMENT_CHOICES, default='neutral')
+    acknowledged = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    acknowledged_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        db_table = 'feedback_archivedfeedback'
+    
+    def __str__(self):
+        return f"Archived feedback for {self.employee} from {self.manager}"
+
+class SentimentRollup(models.Model):
+    """
+    Feedback counts per day, manager, sentiment and acknowledged state,
+    covering both hot and archived feedback. Kept current by the signal
+    handlers in feedback.rollups; rebuild_sentiment_rollups recounts it.
+    """
+    day = models.DateField()
+    manager = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='sentiment_rollups'
+    )
+    sentiment = models.CharField(max_length=10, choices=Feedback.SENTIMENT_CHOICES)
+    acknowledged = models.BooleanField()
+    count = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'feedback_sentimentrollup'
+        constraints = [
+            models.UniqueConstraint(fields=['manager', 'day', 'sentiment', 'acknowledged'], name='feedback_sentimentrollup_key'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='feedback_rollup_day_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.manager_id} {self.sentiment} ack={self.acknowledged}: {self.count}"
+
+class SentimentSuggestion(models.Model):
+    """Model-suggested sentiment for a feedback, written in batches by score_sentiment"""
+    feedback = models.OneToOneField(
+        Feedback,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='sentiment_suggestion'
+    )
+    sentiment = models.CharField(max_length=10, choices=Feedback.SENTIMENT_CHOICES)
+    score = models.FloatField()
+    confidence = models.FloatField()
+    model_version = models.CharField(max_length=20)
+    scored_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'feedback_sentimentsuggestion'
+    
+    def __str__(self):
+        return f"{self.feedback_id}: {self.sentiment} ({self.confidence:.2f})"
+
+class FeedbackSignature(models.Model):
+    """MinHash signature of a feedback's strengths text (see feedback/similarity.py)"""
+    feedback = models.OneToOneField(
+        Feedback,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='minhash_signature'
+    )
+    signature = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'feedback_feedbacksignature'
+    
+    def __str__(self):
+        return f"Signature for feedback {self.feedback_id}"
+
+class FeedbackLSHBucket(models.Model):
+    """One LSH band key of a feedback's signature; feedback sharing a key are near-duplicate candidates"""
+    feedback = models.ForeignKey(
+        Feedback,
+        on_delete=models.CASCADE,
+        related_name='lsh_buckets'
+    )
+    key = models.BigIntegerField()
+    
+    class Meta:
+        db_table = 'feedback_lshbucket'
+        indexes = [
+            models.Index(fields=['key', 'feedback'], name='feedback_lshbucket_key_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key}: feedback {self.feedback_id}"
+
+class ProfilingRule(models.Model):
+    """Admin toggle that profiles every request to one URL name, or SSEConsumer handlers"""
+    MODE_CHOICES = [
+        ('sample', 'Sampling (folded stacks for flamegraphs)'),
+        ('cprofile', 'cProfile (pstats)'),
+    ]
+    
+    target = models.CharField(
+        max_length=100,
+        unique=True,
+        help_text='URL name such as feedback_list_create, or SSEConsumer for WebSocket handlers'
+    )
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default='sample')
+    enabled = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True, help_text='Stop profiling after this time')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'feedback_profilingrule'
+    
+    def __str__(self):
+        return f"Profile {self.target} ({self.mode})"
+
+class ImportCheckpoint(models.Model):
+    """Progress of an import_feedback job, committed in the same transaction as each batch"""
+    job = models.CharField(max_length=255, unique=True)
+    position = models.PositiveBigIntegerField(default=0)  # input records consumed
+    imported = models.PositiveBigIntegerField(default=0)
+    rejected = models.PositiveBigIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'feedback_importcheckpoint'
+    
+    def __str__(self):
+        return f"Import {self.job} at record {self.position}"
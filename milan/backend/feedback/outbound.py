@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import weakref
+from collections import deque
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+COALESCE = 'coalesce'
+DROP_OLDEST = 'drop_oldest'
+DISCONNECT = 'disconnect'
+POLICIES = (COALESCE, DROP_OLDEST, DISCONNECT)
+
+# Handed out by get()/get_nowait() in place of events dropped under
+# drop_oldest: the stream must tell its client to resync, since the dropped
+# event's seq would otherwise be skipped over without a trace
+RESYNC = {'seq': None, 'type': 'resync_required', 'key': None}
+
+# Every live queue, for per-connection depth metrics
+_live_queues = weakref.WeakSet()
+
+
+class OutboundQueue:
+    """
+    Bounded per-connection send queue with a slow-consumer policy.
+
+    Items are event dicts with at least 'seq', 'type' and 'key' (the id of
+    the object the event is about, or None). When the queue is full:
+
+    - coalesce: a queued event of the same type for the same object is
+      replaced by the new one; if there is none, fall back to disconnect
+    - drop_oldest: the oldest queued event is discarded, and the next read
+      returns RESYNC so the stream tells its client to refetch
+    - disconnect: the queue is closed and the connection should be dropped;
+      the client reconnects with its last seq and the event log replays
+      what it missed, or asks it to resync
+
+    Must only be used from the event loop that owns the connection.
+    """
+
+    def __init__(self, maxsize=None, policy=None, **labels):
+        self.maxsize = maxsize or getattr(settings, 'SSE_SEND_QUEUE_SIZE', 100)
+        self.policy = policy or getattr(settings, 'SSE_SEND_QUEUE_POLICY', DISCONNECT)
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown send queue policy {self.policy!r}, expected one of {POLICIES}")
+        self.labels = labels
+        self.items = deque()
+        self.overflowed = False
+        self.lost = False  # Events dropped since the last read
+        self.waiter = None
+        # Metrics
+        self.enqueued = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.high_water = 0
+        _live_queues.add(self)
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, item):
+        """Queue an item; returns False if the queue has overflowed and is closed"""
+        if self.overflowed:
+            return False
+
+        if len(self.items) >= self.maxsize:
+            if self.policy == DROP_OLDEST:
+                self.items.popleft()
+                self.dropped += 1
+                self.lost = True
+            elif not (self.policy == COALESCE and self._coalesce(item)):
+                self._overflow()
+                return False
+
+        self.items.append(item)
+        self.enqueued += 1
+        if len(self.items) > self.high_water:
+            self.high_water = len(self.items)
+        self._wake()
+        return True
+
+    def get_nowait(self):
+        """Pop the next item (RESYNC after a drop), or None if the queue is empty"""
+        if self.lost:
+            self.lost = False
+            return RESYNC
+        return self.items.popleft() if self.items else None
+
+    async def get(self):
+        """Wait for the next item (RESYNC after a drop); returns None once the queue has overflowed"""
+        while not self.items and not self.overflowed and not self.lost:
+            self.waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self.waiter
+            finally:
+                self.waiter = None
+        if self.overflowed:
+            return None
+        if self.lost:
+            self.lost = False
+            return RESYNC
+        return self.items.popleft()
+
+    def stats(self):
+        """Queue-depth metrics for this connection"""
+        return {
+            **self.labels,
+            'depth': len(self.items),
+            'max_size': self.maxsize,
+            'high_water': self.high_water,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'overflowed': self.overflowed,
+        }
+
+    def _coalesce(self, item):
+        key = item.get('key')
+        if key is None:
+            return False
+        for index, queued in enumerate(self.items):
+            if queued.get('key') == key and queued.get('type') == item.get('type'):
+                # Drop the stale copy; the new one goes to the back to keep seq order
+                del self.items[index]
+                self.coalesced += 1
+                return True
+        return False
+
+    def _overflow(self):
+        logger.warning(f"Send queue overflow ({self.maxsize} events, policy {self.policy}) for {self.labels}")
+        self.overflowed = True
+        self.dropped += len(self.items)
+        self.items.clear()
+        self._wake()
+
+    def _wake(self):
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+
+def connection_stats(limit=None):
+    """Per-connection queue stats, deepest queues first"""
+    stats = sorted((queue.stats() for queue in list(_live_queues)), key=lambda s: (s['depth'], s['high_water']), reverse=True)
+    return stats[:limit] if limit else stats
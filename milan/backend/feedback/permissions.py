@@ -9,16 +9,17 @@ class IsManagerOrReadOnly(permissions.BasePermission):
         return request.user and request.user.is_authenticated
     
     def has_object_permission(self, request, view, obj):
+        # Ids are compared, so a check never loads the related users
         # Read permissions for any authenticated user
         if request.method in permissions.SAFE_METHODS:
             # Employees can only read their own feedback
             if not request.user.is_manager:
-                return obj.employee == request.user
+                return obj.employee_id == request.user.id
             # Managers can read feedback they gave
-            return obj.manager == request.user
+            return obj.manager_id == request.user.id
         
         # Write permissions only for managers who gave the feedback
-        return request.user.is_manager and obj.manager == request.user
+        return request.user.is_manager and obj.manager_id == request.user.id
 
 class IsEmployeeOrManager(permissions.BasePermission):
     """
@@ -27,4 +28,4 @@ class IsEmployeeOrManager(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Only the employee who received the feedback can acknowledge it
-        return obj.employee == request.user
+        return obj.employee_id == request.user.id
@@ -0,0 +1,237 @@
+import cProfile
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from django.conf import settings
+from django.utils import timezone
+from .caching import PROFILING, invalidate, namespace_version
+
+logger = logging.getLogger(__name__)
+
+SAMPLE = 'sample'
+CPROFILE = 'cprofile'
+MODES = (SAMPLE, CPROFILE)
+
+# SQL statements run during the profiled request, or None when not profiling.
+# Like feedback.metrics, this follows the request into sync_to_async threads.
+current_sql_log = ContextVar('current_sql_log', default=None)
+
+
+def record_sql(execute, sql, params, many, context):
+    """Database execute wrapper that logs queries while a profile is running"""
+    log = current_sql_log.get()
+    if log is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        log.append({
+            'sql': sql,
+            'params': repr(params)[:500],
+            'many': many,
+            'alias': context['connection'].alias,
+            'ms': round((time.perf_counter() - started) * 1000, 3),
+        })
+
+
+def install_sql_recorder(sender, connection, **kwargs):
+    """connection_created handler: wrap every new database connection once"""
+    if record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_sql)
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a background
+    thread and counts identical stacks. The result is written in the folded
+    format read by flamegraph.pl, speedscope and inferno.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(names))] += 1
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class ProfilingRules:
+    """
+    In-process copy of the enabled, unexpired ProfilingRule rows, keyed by
+    target. Saving or deleting a rule gives the 'profiling' cache namespace a
+    new version; a background thread in every worker compares its copy's
+    version with it once per CHECK_INTERVAL, reloads when it changed and drops
+    rules as they expire, so the request path only does a dict lookup.
+    """
+
+    CHECK_INTERVAL = 1  # Seconds between version checks
+
+    def __init__(self):
+        self.targets = {}
+        self.loaded = False
+        self.version = None
+        self.lock = threading.Lock()
+        self.watcher = None
+
+    def start(self):
+        """Load the rules and keep them current from a daemon thread; idempotent"""
+        with self.lock:
+            if self.watcher is not None:
+                return
+            self.watcher = threading.Thread(target=self._watch, name='profiling-rules', daemon=True)
+        self.watcher.start()
+
+    def _watch(self):
+        from django.db import connection
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Profiler: could not refresh profiling rules: {e}")
+            finally:
+                # Hand the connection back between checks
+                connection.close()
+            time.sleep(self.CHECK_INTERVAL)
+
+    def refresh(self):
+        """Reload if another worker (or this one) changed the rules, else drop expired ones"""
+        if not self.loaded or namespace_version(PROFILING) != self.version:
+            self.reload()
+            return
+        now = timezone.now()
+        if any(self.expired(rule, now) for rule in self.targets.values()):
+            with self.lock:
+                self.targets = {target: rule for target, rule in self.targets.items() if not self.expired(rule, now)}
+
+    def reload(self):
+        from .models import ProfilingRule
+        # Read the version first, so a change during the load is picked up next time
+        version = namespace_version(PROFILING)
+        try:
+            rules = list(ProfilingRule.objects.filter(enabled=True).values('target', 'mode', 'expires_at'))
+        except Exception as e:
+            # Table missing before migrate, or the database is unavailable
+            logger.warning(f"Profiler: could not load profiling rules: {e}")
+            rules = []
+        now = timezone.now()
+        with self.lock:
+            self.targets = {rule['target']: rule for rule in rules if not self.expired(rule, now)}
+            self.version = version
+            self.loaded = True
+
+    @staticmethod
+    def expired(rule, now):
+        return rule['expires_at'] is not None and rule['expires_at'] <= now
+
+    def changed(self, **kwargs):
+        """Signal handler for rule saves and deletes: every worker reloads within CHECK_INTERVAL (plus CACHE_LOCAL_TIMEOUT)"""
+        invalidate(PROFILING)
+
+    def mode_for(self, target):
+        """Profiling mode for a URL name or consumer name, or None"""
+        rule = self.targets.get(target)
+        if rule is None or self.expired(rule, timezone.now()):
+            return None
+        return rule['mode']
+
+
+rules = ProfilingRules()
+
+
+class Profiler:
+    """Runs one sampling or cProfile session and writes it to PROFILE_DIR"""
+
+    def __init__(self, mode, target, labels=None):
+        self.mode = mode if mode in MODES else SAMPLE
+        self.target = target
+        self.labels = labels or {}
+        stamp = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%S')
+        self.profile_id = f"{stamp}-{target.replace(':', '_')}-{uuid.uuid4().hex[:8]}"
+
+    @contextmanager
+    def run(self):
+        """Profile the calling thread for the duration of the block"""
+        sql_log = []
+        token = current_sql_log.set(sql_log)
+        if self.mode == CPROFILE:
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            profile = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL)
+            profile.start()
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - started
+            if self.mode == CPROFILE:
+                profile.disable()
+            else:
+                profile.stop()
+            current_sql_log.reset(token)
+            try:
+                self.write(profile, sql_log, elapsed)
+            except OSError as e:
+                logger.error(f"Profiler: could not write profile {self.profile_id}: {e}")
+
+    def write(self, profile, sql_log, elapsed):
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        base = directory / self.profile_id
+        if self.mode == CPROFILE:
+            # pstats format; render with flameprof or snakeviz
+            profile.dump_stats(f"{base}.prof")
+        else:
+            Path(f"{base}.folded").write_text(profile.folded())
+        Path(f"{base}.json").write_text(json.dumps({
+            'id': self.profile_id,
+            'target': self.target,
+            'mode': self.mode,
+            'duration_ms': round(elapsed * 1000, 3),
+            'query_count': len(sql_log),
+            'query_ms': round(sum(query['ms'] for query in sql_log), 3),
+            **self.labels,
+            'queries': sql_log,
+        }, indent=2, default=str))
+        logger.info(f"Profiler: wrote {base} ({self.mode}, {elapsed * 1000:.1f}ms, {len(sql_log)} queries)")
+        rotate(directory, settings.PROFILE_KEEP)
+
+
+def rotate(directory, keep):
+    """Delete the oldest profiles so at most `keep` remain"""
+    sessions = sorted(directory.glob('*.json'), key=lambda path: path.stat().st_mtime)
+    for metadata in sessions[:max(0, len(sessions) - keep)]:
+        for path in directory.glob(f"{metadata.stem}.*"):
+            path.unlink(missing_ok=True)
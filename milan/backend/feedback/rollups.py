@@ -0,0 +1,129 @@
+"""Daily sentiment rollups: incremental maintenance and full recounts"""
+from collections import Counter
+from datetime import datetime, time as dt_time
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import ArchivedFeedback, Feedback, SentimentRollup
+
+# Feedback fields that decide which rollup row a feedback counts towards
+KEY_FIELDS = ('created_at', 'manager_id', 'sentiment', 'acknowledged')
+
+
+def rollup_key(created_at, manager_id, sentiment, acknowledged):
+    return (timezone.localdate(created_at), manager_id, sentiment, bool(acknowledged))
+
+
+def feedback_key(feedback):
+    return rollup_key(*(getattr(feedback, name) for name in KEY_FIELDS))
+
+
+def apply(deltas):
+    """Add a Counter of rollup key -> change to the stored counts"""
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        day, manager_id, sentiment, acknowledged = key
+        lookup = {'day': day, 'manager_id': manager_id, 'sentiment': sentiment, 'acknowledged': acknowledged}
+        if SentimentRollup.objects.filter(**lookup).update(count=F('count') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                SentimentRollup.objects.create(count=delta, **lookup)
+        except IntegrityError:
+            # Another writer created the row first
+            SentimentRollup.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def remember_key(sender, instance, **kwargs):
+    """post_init: note the loaded key so a later save knows which row to move from"""
+    loaded = instance.pk is not None and all(name in instance.__dict__ for name in KEY_FIELDS)
+    instance._rollup_key = feedback_key(instance) if loaded else None
+
+
+def load_key(sender, instance, raw=False, **kwargs):
+    """pre_save: fetch the stored key for instances loaded without the key fields"""
+    if raw or instance.pk is None or getattr(instance, '_rollup_key', None) is not None:
+        return
+    row = Feedback.objects.filter(pk=instance.pk).values_list(*KEY_FIELDS).first()
+    instance._rollup_key = rollup_key(*row) if row else None
+
+
+def feedback_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new_key = feedback_key(instance)
+    old_key = None if created else getattr(instance, '_rollup_key', None)
+    if old_key != new_key:
+        deltas = Counter({new_key: 1})
+        if old_key is not None:
+            deltas[old_key] -= 1
+        apply(deltas)
+    instance._rollup_key = new_key
+
+
+def feedback_deleted(sender, instance, **kwargs):
+    key = getattr(instance, '_rollup_key', None) or feedback_key(instance)
+    apply({key: -1})
+
+
+def count_feedback(date_from=None, date_to=None, manager_ids=None):
+    """Recount rollup keys from hot and archived feedback for days in [date_from, date_to)"""
+    counts = Counter()
+    for model in (Feedback, ArchivedFeedback):
+        queryset = model.objects.all()
+        if date_from is not None:
+            queryset = queryset.filter(created_at__gte=start_of_day(date_from))
+        if date_to is not None:
+            queryset = queryset.filter(created_at__lt=start_of_day(date_to))
+        if manager_ids is not None:
+            queryset = queryset.filter(manager_id__in=manager_ids)
+        rows = (
+            queryset.annotate(day=TruncDate('created_at'))
+            .values_list('day', 'manager_id', 'sentiment', 'acknowledged')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for day, manager_id, sentiment, acknowledged, total in rows.iterator():
+            counts[(day, manager_id, sentiment, bool(acknowledged))] += total
+    return counts
+
+
+def stored_counts(date_from=None, date_to=None, manager_ids=None):
+    queryset = rollup_rows(date_from, date_to, manager_ids).exclude(count=0)
+    return Counter({
+        (day, manager_id, sentiment, acknowledged): count
+        for day, manager_id, sentiment, acknowledged, count
+        in queryset.values_list('day', 'manager_id', 'sentiment', 'acknowledged', 'count').iterator()
+    })
+
+
+def rollup_rows(date_from=None, date_to=None, manager_ids=None):
+    queryset = SentimentRollup.objects.all()
+    if date_from is not None:
+        queryset = queryset.filter(day__gte=date_from)
+    if date_to is not None:
+        queryset = queryset.filter(day__lt=date_to)
+    if manager_ids is not None:
+        queryset = queryset.filter(manager_id__in=manager_ids)
+    return queryset
+
+
+def rebuild(date_from=None, date_to=None, manager_ids=None, batch_size=5000):
+    """Replace the stored rollups in range with a fresh count; returns the number of rows written"""
+    counts = count_feedback(date_from, date_to, manager_ids)
+    with transaction.atomic():
+        rollup_rows(date_from, date_to, manager_ids).delete()
+        SentimentRollup.objects.bulk_create(
+            [
+                SentimentRollup(day=day, manager_id=manager_id, sentiment=sentiment, acknowledged=acknowledged, count=total)
+                for (day, manager_id, sentiment, acknowledged), total in counts.items()
+            ],
+            batch_size=batch_size,
+        )
+    return len(counts)
+
+
+def start_of_day(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
@@ -0,0 +1,147 @@
+"""
+Read-replica routing with read-your-writes stickiness.
+
+Reads go to a replica only inside an HTTP request that ReplicaRoutingMiddleware
+opened a routing scope for; management commands, WebSocket consumers and
+anything else outside a request always use the primary. Within a request:
+
+- unsafe methods (POST, PUT, PATCH, DELETE) read from the primary throughout;
+- the first write sends every later read in the request to the primary, and
+  marks the user so their requests read from the primary for
+  DB_STICKY_SECONDS, long enough for replicas to catch up;
+- reads inside a transaction on the primary stay on the primary.
+
+A replica that fails to connect is skipped for DB_REPLICA_RETRY_SECONDS and
+reads fall back to the primary.
+
+Sticky marks are kept in the default cache, so they only reach the workers
+that cache is shared with: every worker on the host with the file-based
+'shared' tier in CACHES. Deployments with workers on several hosts must point
+that tier at a cache all of them reach (Redis or the database cache).
+"""
+import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from .metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+# Models whose reads always go to the primary: sessions are written on login
+# and read back on the very next request
+PRIMARY_ONLY_APPS = ('sessions',)
+
+# The routing scope of the current request; None outside one. Like
+# feedback.metrics.current_db_stats, it follows the request into sync_to_async
+# threads, and the state object is shared with them.
+current_routing = ContextVar('current_routing', default=None)
+
+replica_failures = Counter('db_replica_unavailable_total', 'Replica connection failures that sent reads to the primary', ('alias',))
+sticky_requests = Counter('db_sticky_requests_total', 'Safe requests read from the primary because the user wrote recently')
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_key(user_key):
+    return f'db-sticky:{user_key}'
+
+
+def recently_wrote(user_key):
+    return user_key is not None and cache.get(sticky_key(user_key)) is not None
+
+
+def mark_wrote(user_key):
+    """Keep the user's reads on the primary for the next DB_STICKY_SECONDS"""
+    cache.set(sticky_key(user_key), 1, settings.DB_STICKY_SECONDS)
+
+
+class ReplicaHealth:
+    """Remembers replicas that failed to connect, so they are skipped for a while"""
+
+    def __init__(self):
+        self.down_until = {}
+        self.lock = threading.Lock()
+
+    def available(self, alias):
+        until = self.down_until.get(alias)
+        if until is not None:
+            if time.monotonic() < until:
+                return False
+            with self.lock:
+                self.down_until.pop(alias, None)
+        try:
+            # A no-op when this thread already holds an open connection
+            connections[alias].ensure_connection()
+        except DatabaseError as e:
+            with self.lock:
+                self.down_until[alias] = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+            replica_failures.inc(alias)
+            logger.warning(f"Replica {alias} unavailable, reading from the primary: {e}")
+            return False
+        return True
+
+
+health = ReplicaHealth()
+
+
+class RoutingState:
+    """Routing decisions for one request"""
+
+    def __init__(self, user_key=None, primary=False):
+        self.user_key = user_key
+        self.primary = primary
+        self.wrote = False
+        self.replica = None
+
+    def read_alias(self):
+        if self.primary or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if self.replica is None:
+            # One replica for the whole request, so its reads see one snapshot
+            replicas = replica_aliases()
+            start = random.randrange(len(replicas)) if replicas else 0
+            ordered = replicas[start:] + replicas[:start]
+            self.replica = next((alias for alias in ordered if health.available(alias)), DEFAULT_DB_ALIAS)
+        return self.replica
+
+    def written(self):
+        if self.wrote:
+            return
+        self.wrote = True
+        self.primary = True
+        if self.user_key is not None:
+            mark_wrote(self.user_key)
+
+
+class ReplicaRouter:
+    """Send reads in a request's routing scope to a replica and every write to the primary"""
+
+    def db_for_read(self, model, **hints):
+        state = current_routing.get()
+        if state is None or not replica_aliases() or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return None
+        return state.read_alias()
+
+    def db_for_write(self, model, **hints):
+        state = current_routing.get()
+        if state is not None:
+            state.written()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
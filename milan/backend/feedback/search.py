@@ -0,0 +1,217 @@
+import html
+import re
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+# The inverted index lives in the database so every write path (ORM saves,
+# bulk_create, COPY, archiving) keeps it current without application code:
+#   PostgreSQL: a generated, weighted tsvector column with a GIN index
+#   SQLite:     an external-content FTS5 table maintained by triggers
+TABLE = 'feedback_feedback'
+FTS_TABLE = 'feedback_feedback_fts'
+VECTOR_COLUMN = 'search_vector'
+VECTOR_INDEX = 'feedback_search_vector_idx'
+TS_CONFIG = 'english'
+
+# Snippet highlight markers; the text between them is escaped before <mark> is added
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SQLITE_TRIGGERS = {
+    'feedback_fts_insert': f"""
+        CREATE TRIGGER IF NOT EXISTS feedback_fts_insert AFTER INSERT ON {TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, strengths, areas_to_improve)
+            VALUES (new.id, new.strengths, new.areas_to_improve);
+        END""",
+    'feedback_fts_delete': f"""
+        CREATE TRIGGER IF NOT EXISTS feedback_fts_delete AFTER DELETE ON {TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, strengths, areas_to_improve)
+            VALUES ('delete', old.id, old.strengths, old.areas_to_improve);
+        END""",
+    'feedback_fts_update': f"""
+        CREATE TRIGGER IF NOT EXISTS feedback_fts_update
+        AFTER UPDATE OF strengths, areas_to_improve ON {TABLE} BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, strengths, areas_to_improve)
+            VALUES ('delete', old.id, old.strengths, old.areas_to_improve);
+            INSERT INTO {FTS_TABLE}(rowid, strengths, areas_to_improve)
+            VALUES (new.id, new.strengths, new.areas_to_improve);
+        END""",
+}
+
+
+def supported(conn=connection):
+    return conn.vendor in ('postgresql', 'sqlite')
+
+
+def install(conn=connection, rebuild=False):
+    """Create the index for this backend if missing; `rebuild` repopulates the SQLite FTS table"""
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(
+                f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS {VECTOR_COLUMN} tsvector GENERATED ALWAYS AS ("
+                f"setweight(to_tsvector('{TS_CONFIG}', coalesce(strengths, '')), 'A') || "
+                f"setweight(to_tsvector('{TS_CONFIG}', coalesce(areas_to_improve, '')), 'B')) STORED"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {VECTOR_INDEX} ON {TABLE} USING GIN ({VECTOR_COLUMN})")
+            if rebuild:
+                cursor.execute(f"REINDEX INDEX {VECTOR_INDEX}")
+        elif conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                f"strengths, areas_to_improve, content='{TABLE}', content_rowid='id', "
+                f"tokenize='porter unicode61')"
+            )
+            # SQLite rebuilds a table when Django alters it, which drops these triggers
+            for sql in SQLITE_TRIGGERS.values():
+                cursor.execute(sql)
+            if rebuild:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def restore_triggers(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    post_migrate handler: a migration that rebuilds the feedback table on
+    SQLite drops the FTS triggers, and search would go stale without an error
+    """
+    conn = connections[using]
+    if conn.vendor == 'sqlite' and FTS_TABLE in conn.introspection.table_names():
+        install(conn)
+
+
+def uninstall(conn=connection):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {VECTOR_INDEX}")
+            cursor.execute(f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS {VECTOR_COLUMN}")
+        elif conn.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def fts5_query(text):
+    """
+    Turn free text into a safe FTS5 MATCH expression: every word must match,
+    and the last one also matches as a prefix so search-as-you-type works.
+    Returns '' when there are no searchable words.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def highlight(snippet):
+    """Escape a raw snippet and wrap matches in <mark>"""
+    if not snippet:
+        return ''
+    return html.escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def matching_ids(text):
+    """(sql, params) for a subquery of matching feedback ids, for queryset.filter(id__in=RawSQL(...))"""
+    if connection.vendor == 'postgresql':
+        return (
+            f"SELECT id FROM {TABLE} WHERE {VECTOR_COLUMN} @@ websearch_to_tsquery('{TS_CONFIG}', %s)",
+            [text],
+        )
+    match = fts5_query(text)
+    if not match:
+        return f"SELECT rowid FROM {FTS_TABLE} WHERE 0", []
+    return f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+
+
+class SearchResults:
+    """
+    Ranked matches for one query, restricted to a manager's or employee's
+    feedback. Supports count() and slicing, so it can be handed straight to
+    a DRF paginator; only the requested page is ranked and snippeted.
+    Each hit is a dict with id, rank and snippet.
+    """
+
+    def __init__(self, text, manager=None, employee=None):
+        self.text = text.strip()
+        self.filters = []
+        self.params = []
+        if manager is not None:
+            self.filters.append('f.manager_id = %s')
+            self.params.append(manager.pk if hasattr(manager, 'pk') else manager)
+        if employee is not None:
+            self.filters.append('f.employee_id = %s')
+            self.params.append(employee.pk if hasattr(employee, 'pk') else employee)
+        self._count = None
+
+    def _where(self):
+        return ''.join(f' AND {clause}' for clause in self.filters)
+
+    def _empty(self):
+        return not self.text or (connection.vendor == 'sqlite' and not fts5_query(self.text))
+
+    def count(self):
+        if self._count is None:
+            if self._empty():
+                self._count = 0
+            else:
+                sql, params = self._count_sql()
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('SearchResults only supports slicing')
+        offset = key.start or 0
+        limit = (key.stop - offset) if key.stop is not None else self.count() - offset
+        if limit <= 0 or self._empty():
+            return []
+        sql, params = self._page_sql(limit, offset)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [{'id': id, 'rank': float(rank), 'snippet': highlight(snippet)} for id, rank, snippet in rows]
+
+    def _count_sql(self):
+        if connection.vendor == 'postgresql':
+            return (
+                f"SELECT COUNT(*) FROM {TABLE} f "
+                f"WHERE f.{VECTOR_COLUMN} @@ websearch_to_tsquery('{TS_CONFIG}', %s){self._where()}",
+                [self.text, *self.params],
+            )
+        return (
+            f"SELECT COUNT(*) FROM {FTS_TABLE} CROSS JOIN {TABLE} f ON f.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s{self._where()}",
+            [fts5_query(self.text), *self.params],
+        )
+
+    def _page_sql(self, limit, offset):
+        if connection.vendor == 'postgresql':
+            # Rank and page first so ts_headline only runs on the rows returned
+            options = (
+                f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=30, MinWords=10, '
+                f'MaxFragments=2, FragmentDelimiter=" … "'
+            )
+            return (
+                f"SELECT page.id, page.rank, ts_headline('{TS_CONFIG}', "
+                f"page.strengths || ' … ' || page.areas_to_improve, page.query, %s) "
+                f"FROM (SELECT f.id, f.strengths, f.areas_to_improve, f.created_at, q AS query, "
+                f"ts_rank_cd(f.{VECTOR_COLUMN}, q) AS rank "
+                f"FROM {TABLE} f, websearch_to_tsquery('{TS_CONFIG}', %s) q "
+                f"WHERE f.{VECTOR_COLUMN} @@ q{self._where()} "
+                f"ORDER BY rank DESC, f.created_at DESC LIMIT %s OFFSET %s) page "
+                f"ORDER BY page.rank DESC, page.created_at DESC",
+                [options, self.text, *self.params, limit, offset],
+            )
+        # bm25() is lower-is-better; strengths weighted above areas_to_improve as on PostgreSQL
+        return (
+            f"SELECT f.id, -bm25({FTS_TABLE}, 2.0, 1.0) AS rank, "
+            f"snippet({FTS_TABLE}, -1, '{MARK_START}', '{MARK_END}', ' … ', 16) "
+            f"FROM {FTS_TABLE} CROSS JOIN {TABLE} f ON f.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s{self._where()} "
+            f"ORDER BY bm25({FTS_TABLE}, 2.0, 1.0), f.created_at DESC LIMIT %s OFFSET %s",
+            [fts5_query(self.text), *self.params, limit, offset],
+        )
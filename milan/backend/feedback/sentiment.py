@@ -0,0 +1,120 @@
+"""
+Suggested sentiment for feedback text from a hashed bag-of-words model.
+
+Words are hashed into a fixed-size weight vector built from the in-repo
+lexicon (sentiment_lexicon.tsv). Scoring works on whole batches with
+NumPy: each distinct word is hashed once per batch, and per-document
+scores come from one weighted bincount.
+"""
+import hashlib
+import re
+import threading
+import zlib
+from itertools import chain
+from pathlib import Path
+import numpy as np
+
+LEXICON_PATH = Path(__file__).with_name('sentiment_lexicon.tsv')
+BUCKETS = 2 ** 18
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+NEGATORS = ('not', 'never', 'no', 'without', 'lack', 'lacks', 'nor', 'hardly')
+NEGATION_SCOPE = 3
+
+# Both fields count the same; critique is expected in areas_to_improve, but
+# serious problems there should still pull the score down
+AREAS_WEIGHT = 1.0
+# Scores at or above POSITIVE_THRESHOLD suggest positive and scores below
+# NEGATIVE_THRESHOLD suggest negative; anything between is neutral. Reviews
+# nearly always mix praise with critique, so a net negative score already
+# reads as a negative review.
+POSITIVE_THRESHOLD = 0.9
+NEGATIVE_THRESHOLD = 0.0
+
+
+def bucket(token):
+    return zlib.crc32(token.encode()) % BUCKETS
+
+
+class SentimentModel:
+    def __init__(self, weights, version):
+        self.weights = weights
+        self.version = version
+
+    @classmethod
+    def from_lexicon(cls, path=LEXICON_PATH):
+        text = Path(path).read_text(encoding='utf-8')
+        weights = np.zeros(BUCKETS, dtype=np.float32)
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            token, weight = line.split('\t')
+            weights[bucket(token.lower())] += float(weight)
+        return cls(weights, hashlib.sha1(text.encode()).hexdigest()[:12])
+
+    def score_texts(self, texts):
+        """Length-normalised score per text, as a float32 array"""
+        tokenized = [TOKEN_RE.findall(text.lower()) if text else [] for text in texts]
+        lengths = np.fromiter((len(tokens) for tokens in tokenized), dtype=np.int64, count=len(tokenized))
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(len(texts), dtype=np.float32)
+
+        words = np.array(list(chain.from_iterable(tokenized)))
+        doc_index = np.repeat(np.arange(len(texts)), lengths)
+
+        # Hash each distinct word once
+        vocabulary, inverse = np.unique(words, return_inverse=True)
+        buckets = np.fromiter((bucket(word) for word in vocabulary), dtype=np.int64, count=len(vocabulary))
+        values = self.weights[buckets[inverse]]
+
+        # Flip words that follow a negator in the same text
+        is_negator = np.isin(vocabulary, NEGATORS)[inverse] | np.char.endswith(words, "n't")
+        negated = np.zeros(total, dtype=bool)
+        for offset in range(1, NEGATION_SCOPE + 1):
+            negated[offset:] |= is_negator[:-offset] & (doc_index[offset:] == doc_index[:-offset])
+        values = np.where(negated, -values, values)
+
+        sums = np.bincount(doc_index, weights=values, minlength=len(texts))
+        return (sums / np.sqrt(np.maximum(lengths, 1))).astype(np.float32)
+
+    def score(self, strengths, areas_to_improve):
+        """Combined scores for parallel lists of strengths and areas_to_improve"""
+        return self.score_texts(strengths) + AREAS_WEIGHT * self.score_texts(areas_to_improve)
+
+    def predict(self, strengths, areas_to_improve):
+        """(labels, scores, confidences) for parallel lists of texts"""
+        scores = self.score(strengths, areas_to_improve)
+        labels = np.where(
+            scores >= POSITIVE_THRESHOLD, 'positive',
+            np.where(scores < NEGATIVE_THRESHOLD, 'negative', 'neutral'),
+        )
+        # Distance from the nearest threshold, squashed into 0..1
+        margin = np.minimum(np.abs(scores - POSITIVE_THRESHOLD), np.abs(scores - NEGATIVE_THRESHOLD))
+        confidences = np.tanh(margin).astype(np.float32)
+        return labels, scores, confidences
+
+    def suggest(self, strengths, areas_to_improve):
+        """Suggestion for one draft: {'sentiment', 'score', 'confidence'}"""
+        labels, scores, confidences = self.predict([strengths or ''], [areas_to_improve or ''])
+        return {
+            'sentiment': str(labels[0]),
+            'score': round(float(scores[0]), 4),
+            'confidence': round(float(confidences[0]), 4),
+            'model_version': self.version,
+        }
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_model():
+    """The shared model, built from the lexicon on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = SentimentModel.from_lexicon()
+    return _model
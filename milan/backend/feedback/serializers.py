@@ -6,7 +6,17 @@ from django.core.validators import validate_email
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """fields=[...] keeps only the named fields in the output; write-only fields stay for input"""
+    
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name, field in list(self.fields.items()):
+                if name not in fields and not field.write_only:
+                    self.fields.pop(name)
+
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'is_manager']
@@ -43,11 +53,18 @@ class UserCreateSerializer(serializers.ModelSerializer):
         )
         return user
 
-class FeedbackSerializer(serializers.ModelSerializer):
+class FeedbackSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     employee = UserSerializer(read_only=True)
     manager = UserSerializer(read_only=True)
     employee_id = serializers.IntegerField(write_only=True)
     
+    def __init__(self, *args, expand=('employee', 'manager'), **kwargs):
+        """The employee and manager are embedded when named in expand, and given as ids otherwise"""
+        super().__init__(*args, **kwargs)
+        for name in ('employee', 'manager'):
+            if name in self.fields and name not in expand:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(read_only=True)
+    
     class Meta:
         model = Feedback
         fields = [
@@ -74,6 +91,19 @@ class FeedbackSerializer(serializers.ModelSerializer):
         validated_data.pop('employee_id', None)
         return super().update(instance, validated_data)
 
+class FeedbackSearchSerializer(FeedbackSerializer):
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+    snippet = serializers.CharField(source='search_snippet', read_only=True)
+    
+    class Meta(FeedbackSerializer.Meta):
+        fields = FeedbackSerializer.Meta.fields + ['rank', 'snippet']
+
+class SimilarFeedbackSerializer(FeedbackSerializer):
+    similarity = serializers.FloatField(read_only=True)
+    
+    class Meta(FeedbackSerializer.Meta):
+        fields = FeedbackSerializer.Meta.fields + ['similarity']
+
 class AcknowledgeFeedbackSerializer(serializers.ModelSerializer):
     class Meta:
         model = Feedback
@@ -0,0 +1,285 @@
+"""
+Near-duplicate detection for feedback text with MinHash and LSH.
+
+The strengths text is cut into word 3-shingles, and each feedback gets a
+NUM_PERM-value MinHash signature. Signatures are split into BANDS bands;
+feedback sharing any band key is a candidate pair, which is confirmed by
+comparing signatures. With 16 bands of 4 rows, pairs at Jaccard similarity
+0.5 become candidates about 64% of the time, and pairs at 0.8 over 99.9%.
+"""
+import re
+import zlib
+from itertools import chain
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Q
+from .bulk import insert_rows
+from .models import Feedback, FeedbackLSHBucket, FeedbackSignature
+
+TEXT_FIELD = 'strengths'
+SHINGLE_SIZE = 3
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Similar feedback for the API, and copy-paste duplicates for the report
+DEFAULT_THRESHOLD = 0.5
+DUPLICATE_THRESHOLD = 0.8
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+# Fixed permutations, so signatures stay comparable across processes and releases
+_rng = np.random.RandomState(20240601)
+PERM_A = _rng.randint(0, 2 ** 63, size=NUM_PERM, dtype=np.int64).astype(np.uint64) * np.uint64(2) + np.uint64(1)
+PERM_B = _rng.randint(0, 2 ** 63, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+BAND_MIX = _rng.randint(1, 2 ** 31, size=ROWS, dtype=np.int64).astype(np.uint64)
+EMPTY = np.uint32(0xFFFFFFFF)
+
+
+def _word_hash(word):
+    return zlib.crc32(word.encode())
+
+
+def signatures(texts):
+    """
+    MinHash signatures for a batch of texts as a (len(texts), NUM_PERM)
+    uint32 array. Texts without words get a row of EMPTY.
+    """
+    tokenized = [TOKEN_RE.findall(text.lower()) if text else [] for text in texts]
+    lengths = np.fromiter((len(tokens) for tokens in tokenized), dtype=np.int64, count=len(tokenized))
+    result = np.full((len(texts), NUM_PERM), EMPTY, dtype=np.uint32)
+    if not lengths.any():
+        return result
+
+    # Hash each distinct word once, then combine neighbours into shingle hashes
+    words = np.array(list(chain.from_iterable(tokenized)))
+    vocabulary, inverse = np.unique(words, return_inverse=True)
+    word_hashes = np.fromiter((_word_hash(word) for word in vocabulary), dtype=np.uint64, count=len(vocabulary))[inverse]
+    doc_index = np.repeat(np.arange(len(texts)), lengths)
+    position = np.arange(len(words)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    # A shingle starts at every word with SHINGLE_SIZE - 1 words after it in
+    # the same text; texts shorter than that get one shingle of all their words
+    remaining = np.repeat(lengths, lengths) - position
+    starts = (remaining >= SHINGLE_SIZE) | ((position == 0) & (remaining < SHINGLE_SIZE))
+    shingles = word_hashes.copy()
+    for offset in range(1, SHINGLE_SIZE):
+        following = np.zeros_like(word_hashes)
+        following[:-offset] = word_hashes[offset:]
+        in_doc = np.zeros(len(words), dtype=bool)
+        in_doc[:-offset] = doc_index[offset:] == doc_index[:-offset]
+        shingles = (shingles * np.uint64(1000003) + np.where(in_doc, following, 0)) & np.uint64(0xFFFFFFFF)
+    shingles, shingle_docs = shingles[starts], doc_index[starts]
+
+    # Multiply-shift hashing, (a * x + b) mod 2**64 >> 32 with odd a, for each
+    # permutation; laid out permutation-major so the per-text minimum reduces
+    # along contiguous rows
+    hashed = (PERM_A[:, None] * shingles[None, :] + PERM_B[:, None]) >> np.uint64(32)
+    boundaries = np.flatnonzero(np.r_[True, shingle_docs[1:] != shingle_docs[:-1]])
+    result[shingle_docs[boundaries]] = np.minimum.reduceat(hashed, boundaries, axis=1).T.astype(np.uint32)
+    return result
+
+
+def band_keys(signature_rows):
+    """LSH bucket keys, shape (n, BANDS), as int64 for a BigIntegerField"""
+    bands = signature_rows.reshape(len(signature_rows), BANDS, ROWS).astype(np.uint64)
+    mixed = (bands * BAND_MIX).sum(axis=2, dtype=np.uint64)
+    keys = mixed * np.uint64(BANDS) + np.arange(BANDS, dtype=np.uint64)
+    return keys.view(np.int64)
+
+
+def similarity(signature, others):
+    """Estimated Jaccard similarity of one signature against a (n, NUM_PERM) array"""
+    return (others == signature).mean(axis=1)
+
+
+def is_empty(signature):
+    return bool((signature == EMPTY).all())
+
+
+def to_bytes(signature):
+    return signature.astype('<u4').tobytes()
+
+
+def from_bytes(value):
+    return np.frombuffer(bytes(value), dtype='<u4')
+
+
+def index(feedback_ids, texts):
+    """Store signatures and bucket keys for feedback, replacing any old ones"""
+    rows = signatures(texts)
+    keys = band_keys(rows)
+    with transaction.atomic():
+        FeedbackLSHBucket.objects.filter(feedback_id__in=feedback_ids).delete()
+        FeedbackSignature.objects.bulk_create(
+            [FeedbackSignature(feedback_id=id, signature=to_bytes(row)) for id, row in zip(feedback_ids, rows)],
+            update_conflicts=True,
+            unique_fields=['feedback'],
+            update_fields=['signature', 'updated_at'],
+        )
+        # Sixteen bucket rows per feedback, so skip building model instances
+        insert_rows(FeedbackLSHBucket, ('feedback', 'key'), [
+            (id, key)
+            for id, row, row_keys in zip(feedback_ids, rows, keys.tolist())
+            if not is_empty(row)
+            for key in row_keys
+        ])
+    return rows
+
+
+def unindexed_feedback():
+    """Feedback with no signature, or edited since it was indexed"""
+    return Feedback.objects.filter(
+        Q(minhash_signature__isnull=True) | Q(minhash_signature__updated_at__lt=F('updated_at'))
+    )
+
+
+def index_missing(batch_size=1000, progress=None):
+    """Index every unindexed feedback in batches; returns how many were indexed"""
+    indexed = 0
+    last_id = 0
+    queryset = unindexed_feedback().order_by('id')
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values_list('id', TEXT_FIELD)[:batch_size])
+        if not rows:
+            return indexed
+        last_id = rows[-1][0]
+        index([row[0] for row in rows], [row[1] for row in rows])
+        indexed += len(rows)
+        if progress:
+            progress(indexed)
+
+
+def signature_for(feedback):
+    """Stored signature for a feedback, indexing it first if needed"""
+    stored = FeedbackSignature.objects.filter(feedback=feedback, updated_at__gte=feedback.updated_at).first()
+    if stored is not None:
+        return from_bytes(stored.signature)
+    return index([feedback.pk], [getattr(feedback, TEXT_FIELD)])[0]
+
+
+def similar_to(feedback, queryset, threshold=DEFAULT_THRESHOLD, limit=20, max_candidates=1000):
+    """
+    [(feedback id, similarity)] for feedback in `queryset` that is near-duplicate
+    of `feedback`, most similar first. Candidates come from shared LSH buckets,
+    most shared bands first, and are confirmed against their signatures.
+    """
+    signature = signature_for(feedback)
+    if is_empty(signature):
+        return []
+    keys = [int(key) for key in band_keys(signature[None, :])[0]]
+    candidates = list(
+        FeedbackLSHBucket.objects.filter(key__in=keys, feedback__in=queryset.values('id'))
+        .exclude(feedback_id=feedback.pk)
+        .values('feedback_id')
+        .annotate(bands=Count('id'))
+        .order_by('-bands', '-feedback_id')
+        .values_list('feedback_id', flat=True)[:max_candidates]
+    )
+    if not candidates:
+        return []
+    stored = FeedbackSignature.objects.filter(feedback_id__in=candidates).values_list('feedback_id', 'signature')
+    ids, rows = [], []
+    for id, value in stored:
+        ids.append(id)
+        rows.append(from_bytes(value))
+    scores = similarity(signature, np.vstack(rows))
+    matches = sorted(
+        ((id, float(score)) for id, score in zip(ids, scores) if score >= threshold),
+        key=lambda match: (-match[1], -match[0]),
+    )
+    return matches[:limit]
+
+
+def remember_text(sender, instance, **kwargs):
+    """post_init: note the indexed text so saves that don't change it skip reindexing"""
+    instance._indexed_text = instance.__dict__.get(TEXT_FIELD)
+
+
+def feedback_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    text = getattr(instance, TEXT_FIELD)
+    if created or text != getattr(instance, '_indexed_text', None):
+        index([instance.pk], [text])
+    instance._indexed_text = text
+
+
+class LeaderClusters:
+    """
+    Clusters built around a leader: feedback joins a cluster only when it is
+    similar to the leader itself, so a chain of partial overlaps (A like B,
+    B like C) can't pull unrelated text into one giant cluster.
+    """
+
+    def __init__(self, matrix, position, threshold):
+        self.matrix = matrix
+        self.position = position
+        self.threshold = threshold
+        self.leader = {}
+
+    def rows(self, ids):
+        return self.matrix[[self.position[id] for id in ids]]
+
+    def add_bucket(self, bucket):
+        """Place the unclustered members of one LSH bucket"""
+        waiting = [id for id in bucket if id not in self.leader]
+        if not waiting or len(bucket) < 2:
+            return
+        rows = self.rows(waiting)
+
+        # First try the clusters other members of the bucket already belong to
+        leaders = list({self.leader[id] for id in bucket if id in self.leader})
+        if leaders:
+            scores = (rows[:, None, :] == self.rows(leaders)[None, :, :]).mean(axis=2)
+            best = scores.argmax(axis=1)
+            matched = scores[np.arange(len(waiting)), best] >= self.threshold
+            for id, index in zip(np.array(waiting)[matched].tolist(), best[matched].tolist()):
+                self.leader[id] = leaders[index]
+            waiting, rows = [id for id, hit in zip(waiting, matched) if not hit], rows[~matched]
+
+        # Then start new clusters among what is left
+        while len(waiting) > 1:
+            matched = similarity(rows[0], rows[1:]) >= self.threshold
+            if matched.any():
+                self.leader[waiting[0]] = waiting[0]
+                for id in np.array(waiting[1:])[matched].tolist():
+                    self.leader[id] = waiting[0]
+            waiting, rows = [id for id, hit in zip(waiting[1:], matched) if not hit], rows[1:][~matched]
+
+    def groups(self):
+        found = {}
+        for id, leader in self.leader.items():
+            found.setdefault(leader, []).append(id)
+        return [sorted(group) for group in found.values() if len(group) > 1]
+
+
+def clusters(threshold=DUPLICATE_THRESHOLD, manager_ids=None):
+    """
+    Groups of near-duplicate feedback ids (each of size two or more), largest
+    first. Work is near-linear in the number of bucket rows: each bucket's
+    members are compared with cluster leaders instead of pairwise.
+    """
+    buckets = FeedbackLSHBucket.objects.all()
+    signatures_qs = FeedbackSignature.objects.all()
+    if manager_ids is not None:
+        buckets = buckets.filter(feedback__manager_id__in=manager_ids)
+        signatures_qs = signatures_qs.filter(feedback__manager_id__in=manager_ids)
+
+    ids, rows = [], []
+    for id, value in signatures_qs.values_list('feedback_id', 'signature').iterator(chunk_size=5000):
+        ids.append(id)
+        rows.append(from_bytes(value))
+    if not ids:
+        return []
+    found = LeaderClusters(np.vstack(rows), {id: i for i, id in enumerate(ids)}, threshold)
+
+    shared = buckets.values('key').annotate(size=Count('id')).filter(size__gt=1).values('key')
+    members = buckets.filter(key__in=shared).order_by('key', 'feedback_id').values_list('key', 'feedback_id')
+    current_key, bucket = None, []
+    for key, feedback_id in chain(members.iterator(chunk_size=10000), [(None, None)]):
+        if key != current_key:
+            found.add_bucket(bucket)
+            current_key, bucket = key, []
+        if feedback_id in found.position:
+            bucket.append(feedback_id)
+    return sorted(found.groups(), key=lambda group: (-len(group), group[0]))
@@ -1,84 +1,161 @@
+import asyncio
+import logging
 import threading
 import time
-import json
 from collections import defaultdict, deque
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+from django.conf import settings
+from .encoding import encode_event
+from .outbound import OutboundQueue
+
+logger = logging.getLogger(__name__)
+
 
 class SSEManager:
-    """Manages Server-Sent Events connections and message broadcasting"""
-    
-    def __init__(self):
-        self.connections: Dict[int, bool] = {}  # user_id -> is_connected
-        self.user_events: Dict[int, deque] = defaultdict(lambda: deque(maxlen=100))  # user_id -> events queue
+    """
+    Per-user sequenced event log.
+
+    Every event sent to a user gets a monotonic sequence number and is kept in
+    a bounded ring buffer so a reconnecting client can ask for everything
+    after the last sequence number it saw. Streaming connections subscribe
+    with a bounded OutboundQueue and are woken up as soon as an event is
+    recorded.
+    """
+
+    def __init__(self, max_events: Optional[int] = None):
+        self.max_events = max_events or getattr(settings, 'SSE_EVENT_LOG_SIZE', 100)
+        # Sequence numbers start at the process start time in milliseconds so
+        # offsets handed out by a previous process always look stale.
+        self.epoch = int(time.time() * 1000)
+        self.subscribers: Dict[int, set] = defaultdict(set)  # user_id -> {(loop, queue)}
+        self.user_events: Dict[int, deque] = defaultdict(lambda: deque(maxlen=self.max_events))  # user_id -> events ring buffer
+        self.user_seq: Dict[int, int] = {}  # user_id -> last assigned sequence number
         self.lock = threading.Lock()
-    
-    def add_connection(self, user_id: int):
-        """Add a new SSE connection for a user"""
+
+    def subscribe(self, user_id: int) -> Tuple[OutboundQueue, int]:
+        """
+        Open a stream for a user; must be called from the stream's event loop.
+        Returns the queue and the user's current seq, read under the same lock
+        send_to_user() takes, so every later event lands on the queue.
+        """
+        queue = OutboundQueue(transport='sse', user_id=user_id)
         with self.lock:
-            self.connections[user_id] = True
+            self.subscribers[user_id].add((asyncio.get_running_loop(), queue))
+            seq = self.user_seq.get(user_id, self.epoch)
             print(f"SSE: User {user_id} connected")
-    
-    def remove_connection(self, user_id: int):
-        """Remove SSE connection for a user"""
+        return queue, seq
+
+    def unsubscribe(self, user_id: int, queue: OutboundQueue):
+        """Close a stream opened with subscribe()"""
         with self.lock:
-            if user_id in self.connections:
-                del self.connections[user_id]
-                print(f"SSE: User {user_id} disconnected")
-    
+            streams = self.subscribers.get(user_id)
+            if streams is None:
+                return
+            for entry in [entry for entry in streams if entry[1] is queue]:
+                streams.discard(entry)
+            if not streams:
+                del self.subscribers[user_id]
+            print(f"SSE: User {user_id} disconnected")
+
     def is_user_connected(self, user_id: int) -> bool:
-        """Check if a user has an active SSE connection"""
+        """Check if a user has an active SSE stream"""
         with self.lock:
-            return self.connections.get(user_id, False)
-    
-    def send_to_user(self, user_id: int, event_type: str, data: Any):
-        """Send an event to a specific user"""
+            return user_id in self.subscribers
+
+    def send_to_user(self, user_id: int, event_type: str, data: Any) -> Dict:
+        """Record an event for a user and return it with its sequence number"""
         with self.lock:
+            seq = self.user_seq.get(user_id, self.epoch) + 1
+            self.user_seq[user_id] = seq
+            # Encode once here; every connection sends the same text
+            text, sse = encode_event(event_type, seq, data)
             event = {
+                'seq': seq,
                 'type': event_type,
                 'data': data,
+                'text': text,
+                'sse': sse,
+                'key': data.get('id') if isinstance(data, dict) else None,  # For coalescing
                 'timestamp': time.time()
             }
-            
-            # Add event to user's queue
+
+            # Add event to user's ring buffer
             self.user_events[user_id].append(event)
-            print(f"SSE: Sent {event_type} to user {user_id}")
-    
+            streams = list(self.subscribers.get(user_id, ()))
+
+        # Hand the event to open streams; callers may be on any thread
+        for loop, queue in streams:
+            try:
+                loop.call_soon_threadsafe(queue.put, event)
+            except RuntimeError:
+                # Event loop already closed, the stream is gone
+                self.unsubscribe(user_id, queue)
+        logger.debug(f"SSE: Sent {event_type} to user {user_id} (seq {seq})")
+        return event
+
     def send_to_multiple_users(self, user_ids: List[int], event_type: str, data: Any):
         """Send an event to multiple users"""
         for user_id in user_ids:
             self.send_to_user(user_id, event_type, data)
-    
-    def get_events_for_user(self, user_id: int) -> List[Dict]:
-        """Get and clear pending events for a user"""
+
+    def current_seq(self, user_id: int) -> int:
+        """Get the last sequence number assigned to a user"""
         with self.lock:
-            events = list(self.user_events[user_id])
-            self.user_events[user_id].clear()
-            return events
-    
+            return self.user_seq.get(user_id, self.epoch)
+
+    def get_event(self, user_id: int, seq: int) -> Optional[Dict]:
+        """Look up a buffered event by sequence number"""
+        with self.lock:
+            events = self.user_events.get(user_id)
+            if not events:
+                return None
+            index = seq - (self.user_seq[user_id] - len(events) + 1)
+            return events[index] if 0 <= index < len(events) else None
+
+    def get_events_since(self, user_id: int, last_seq: int) -> Tuple[List[Dict], bool]:
+        """
+        Get buffered events after last_seq.
+
+        Returns (events, resync_required). resync_required is True when some
+        of the missed events are no longer in the buffer (or last_seq was
+        never handed out by this process), in which case the client has to
+        refetch its state.
+        """
+        with self.lock:
+            current = self.user_seq.get(user_id, self.epoch)
+            if last_seq == current:
+                return [], False
+            if last_seq > current:
+                return [], True
+
+            events = self.user_events.get(user_id, ())
+            first_retained = current - len(events) + 1
+            if last_seq + 1 < first_retained:
+                return [], True
+            return [event for event in events if event['seq'] > last_seq], False
+
     def broadcast_to_all(self, event_type: str, data: Any):
         """Broadcast an event to all connected users"""
-        with self.lock:
-            connected_users = list(self.connections.keys())
-            for user_id in connected_users:
-                self.send_to_user(user_id, event_type, data)
-    
+        for user_id in self.get_connected_users():
+            self.send_to_user(user_id, event_type, data)
+
     def get_connected_users(self) -> List[int]:
         """Get list of all connected user IDs"""
         with self.lock:
-            return list(self.connections.keys())
-    
+            return list(self.subscribers.keys())
+
     def cleanup_old_events(self, max_age_seconds: int = 3600):
         """Clean up old events (older than max_age_seconds)"""
         current_time = time.time()
         with self.lock:
             for user_id in list(self.user_events.keys()):
                 events = self.user_events[user_id]
-                # Filter out old events
-                fresh_events = deque(
-                    [event for event in events if current_time - event['timestamp'] < max_age_seconds],
-                    maxlen=100
-                )
-                self.user_events[user_id] = fresh_events
+                # Events are appended in time order, so trimming from the left
+                # keeps the buffer a contiguous run of sequence numbers
+                while events and current_time - events[0]['timestamp'] >= max_age_seconds:
+                    events.popleft()
+                if not events:
+                    del self.user_events[user_id]
 
 # Global SSE manager instance
 sse_manager = SSEManager()
@@ -1,6 +1,23 @@
 from django.urls import path
+from django.conf import settings
 from rest_framework_simplejwt.views import TokenRefreshView
-from . import views
+from . import async_views, views
+
+# Hot endpoints run on the event loop unless ASYNC_VIEWS is off
+if settings.ASYNC_VIEWS:
+    user_profile = async_views.user_profile
+    team_list = async_views.team_list
+    feedback_list_create = async_views.feedback_list_create
+    feedback_detail = async_views.feedback_detail
+    acknowledge_feedback = async_views.acknowledge_feedback
+    bootstrap = async_views.bootstrap
+else:
+    user_profile = views.user_profile
+    team_list = views.team_list
+    feedback_list_create = views.FeedbackListCreateView.as_view()
+    feedback_detail = views.FeedbackDetailView.as_view()
+    acknowledge_feedback = views.acknowledge_feedback
+    bootstrap = views.bootstrap
 
 urlpatterns = [
     # Authentication
@@ -8,15 +25,29 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('register/', views.register_user, name='register_user'),
     
+    # Everything a dashboard needs on load
+    path('bootstrap/', bootstrap, name='bootstrap'),
+    
     # User
-    path('user/profile/', views.user_profile, name='user_profile'),
-    path('team/', views.team_list, name='team_list'),
+    path('user/profile/', user_profile, name='user_profile'),
+    path('team/', team_list, name='team_list'),
+    path('team/stats/', views.team_stats, name='team_stats'),
     
     # Feedback
-    path('feedbacks/', views.FeedbackListCreateView.as_view(), name='feedback_list_create'),
-    path('feedbacks/<int:pk>/', views.FeedbackDetailView.as_view(), name='feedback_detail'),
-    path('feedbacks/<int:pk>/acknowledge/', views.acknowledge_feedback, name='acknowledge_feedback'),
+    path('feedbacks/', feedback_list_create, name='feedback_list_create'),
+    path('feedbacks/export/', views.export_feedback, name='export_feedback'),
+    path('feedbacks/search/', views.FeedbackSearchView.as_view(), name='feedback_search'),
+    path('feedbacks/suggest-sentiment/', views.suggest_sentiment, name='suggest_sentiment'),
+    path('feedbacks/<int:pk>/', feedback_detail, name='feedback_detail'),
+    path('feedbacks/<int:pk>/acknowledge/', acknowledge_feedback, name='acknowledge_feedback'),
+    path('feedbacks/<int:pk>/similar/', views.similar_feedback, name='similar_feedback'),
+    
+    # Analytics
+    path('analytics/sentiment/', views.sentiment_analytics, name='sentiment_analytics'),
     
     # Server-Sent Events (backward compatibility)
     path('sse/', views.SSEView.as_view(), name='sse_stream'),
+    
+    # Real-time diagnostics (staff only)
+    path('realtime/connections/', views.realtime_connections, name='realtime_connections'),
 ]
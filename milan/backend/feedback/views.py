@@ -1,19 +1,43 @@
 from rest_framework import generics, permissions, status, serializers
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth import get_user_model, authenticate
-from django.http import StreamingHttpResponse
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils.functional import cached_property
 from django.views import View
-import json
-import time
-from .models import Feedback
-from .serializers import UserSerializer, FeedbackSerializer, AcknowledgeFeedbackSerializer, UserCreateSerializer
-from .permissions import IsManagerOrReadOnly, IsEmployeeOrManager
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+import asyncio
+import hashlib
+import hmac
+from .models import ArchivedFeedback, Feedback, SentimentRollup
+from .serializers import UserSerializer, FeedbackSerializer, FeedbackSearchSerializer, SimilarFeedbackSerializer, AcknowledgeFeedbackSerializer, UserCreateSerializer
+from .permissions import IsManagerOrReadOnly
 from .channel_manager import channel_manager
+from .sse_manager import sse_manager
+from .encoding import dumps, encode_event
+from .fieldsets import feedback_fieldset, user_fieldset
+from .outbound import RESYNC, connection_stats
+from .middleware import get_user_from_token
+from .metrics import registry
+from .export import FeedbackExport, export_queryset, parse_bound, CSVRenderer, NDJSONRenderer
+from .search import SearchResults
+from .sentiment import get_model as get_sentiment_model
+from . import caching, similarity
 
 User = get_user_model()
 
@@ -91,91 +115,303 @@ def register_user(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def team_list(request):
-    """Get team members for managers"""
+    """Get team members for managers (?fields= narrows each member)"""
     if not request.user.is_manager:
         return Response(
             {'detail': 'Only managers can view team members.'}, 
             status=status.HTTP_403_FORBIDDEN
         )
     
-    team_members = User.objects.filter(manager=request.user)
-    serializer = UserSerializer(team_members, many=True)
-    return Response(serializer.data)
+    fieldset = user_fieldset(request.query_params)
+    return Response([fieldset.shape(member) for member in cached_team(request.user)])
+
+def cached_team(manager):
+    """The /api/team/ roster, cached until someone joins, leaves or changes"""
+    return caching.remember(
+        'team', lambda: UserSerializer(User.objects.filter(manager=manager), many=True).data,
+        parts=(manager.pk,), namespaces=(caching.team_namespace(manager.pk),),
+    )
+
+FEEDBACK_COUNTS = {
+    'total': Count('id'),
+    'acknowledged': Count('id', filter=Q(acknowledged=True)),
+    'positive': Count('id', filter=Q(sentiment='positive')),
+    'neutral': Count('id', filter=Q(sentiment='neutral')),
+    'negative': Count('id', filter=Q(sentiment='negative')),
+}
+
+def empty_counts():
+    return {**dict.fromkeys(FEEDBACK_COUNTS, 0), 'last_feedback_at': None}
+
+def feedback_counts(manager):
+    """Per-employee counts of the feedback a manager gave, archived feedback included"""
+    counts = {}
+    for model in (Feedback, ArchivedFeedback):
+        rows = (
+            model.objects.filter(manager=manager).order_by()
+            .values('employee_id').annotate(**FEEDBACK_COUNTS, last=Max('created_at'))
+        )
+        for row in rows:
+            merged = counts.setdefault(row['employee_id'], empty_counts())
+            for name in FEEDBACK_COUNTS:
+                merged[name] += row[name]
+            if merged['last_feedback_at'] is None or row['last'] > merged['last_feedback_at']:
+                merged['last_feedback_at'] = row['last']
+    return counts
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def team_stats(request):
+    """Feedback given to each team member and team totals (Manager only); cached until feedback or the team changes"""
+    if not request.user.is_manager:
+        return Response(
+            {'detail': 'Only managers can view team stats.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    manager = request.user
+    
+    def compute():
+        counts = feedback_counts(manager)
+        members = []
+        totals = dict.fromkeys(FEEDBACK_COUNTS, 0)
+        for member in User.objects.filter(manager=manager).order_by('first_name', 'last_name', 'id'):
+            member_counts = counts.get(member.pk) or empty_counts()
+            for name in FEEDBACK_COUNTS:
+                totals[name] += member_counts[name]
+            members.append({
+                'employee': UserSerializer(member).data,
+                **member_counts,
+                'pending': member_counts['total'] - member_counts['acknowledged'],
+            })
+        totals['pending'] = totals['total'] - totals['acknowledged']
+        return {'members': members, 'totals': totals}
+    
+    data = caching.remember(
+        'team-stats', compute, parts=(manager.pk,),
+        namespaces=(caching.team_namespace(manager.pk), caching.given_namespace(manager.pk)),
+    )
+    return Response(data)
+
+def visible_feedback(user, model=Feedback):
+    """Feedback a user may read, from the hot table or ArchivedFeedback"""
+    if user.is_manager:
+        # Managers see feedback they've given
+        return model.objects.filter(manager=user)
+    else:
+        # Employees see feedback they've received
+        return model.objects.filter(employee=user)
+
+def bootstrap_cache_args(request, user):
+    """Cache key parts and namespaces for a user's bootstrap payload: everything it shows"""
+    if user.is_manager:
+        namespaces = (caching.team_namespace(user.pk), caching.given_namespace(user.pk))
+    else:
+        namespaces = (caching.received_namespace(user.pk),)
+    return {
+        'parts': (user.pk, feedback_list_url(request)),
+        'namespaces': (caching.user_namespace(user.pk), caching.PEOPLE, *namespaces),
+    }
+
+def bootstrap_etag(cache_args):
+    """Changes whenever one of the payload's namespaces does, so checking it needs no queries"""
+    key = caching.make_key('bootstrap', **cache_args)
+    return quote_etag(hashlib.md5(key.encode()).hexdigest())
+
+def feedback_list_url(request):
+    return request.build_absolute_uri(reverse('feedback_list_create'))
+
+def bootstrap_page(user):
+    """The first /api/feedbacks/ page; the user is on every row, so only the other side is joined"""
+    return visible_feedback(user).select_related('employee' if user.is_manager else 'manager')[:PageNumberPagination.page_size]
+
+def bootstrap_body(request, user, counts, page, team):
+    """The bootstrap payload as JSON text, each part shaped like its own endpoint's response"""
+    for feedback in page:
+        setattr(feedback, 'manager' if user.is_manager else 'employee', user)
+    counters = {**counts, 'pending': counts['total'] - counts['acknowledged']}
+    if team is not None:
+        counters['team_size'] = len(team)
+    return dumps({
+        'profile': UserSerializer(user).data,
+        'team': team,
+        'feedback': {
+            'count': counts['total'],
+            'next': replace_query_param(feedback_list_url(request), 'page', 2) if counts['total'] > len(page) else None,
+            'previous': None,
+            'results': FeedbackSerializer(page, many=True).data,
+        },
+        'counters': counters,
+    })
+
+def revalidated(response, etag):
+    """Let browsers keep a bootstrap response, as long as they revalidate it with If-None-Match"""
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def bootstrap(request):
+    """
+    Profile, team (managers), first feedback page and counters in one
+    response. The rendered JSON is cached, and a matching If-None-Match gets
+    a 304 without touching it.
+    """
+    user = request.user
+    cache_args = bootstrap_cache_args(request, user)
+    etag = bootstrap_etag(cache_args)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        def compute():
+            counts = visible_feedback(user).aggregate(**FEEDBACK_COUNTS)
+            team = cached_team(user) if user.is_manager else None
+            return bootstrap_body(request, user, counts, list(bootstrap_page(user)), team)
+        
+        body = caching.remember('bootstrap', compute, **cache_args)
+        response = HttpResponse(body, content_type='application/json')
+    return revalidated(response, etag)
+
+def include_archived(request):
+    return request.query_params.get('include_archived', '').lower() in ('true', '1', 'yes')
 
 class FeedbackListCreateView(generics.ListCreateAPIView):
     serializer_class = FeedbackSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    @cached_property
+    def fieldset(self):
+        return feedback_fieldset(self.request.query_params)
+    
     def get_queryset(self):
-        user = self.request.user
-        if user.is_manager:
-            # Managers see feedback they've given
-            return Feedback.objects.filter(manager=user)
-        else:
-            # Employees see feedback they've received
-            return Feedback.objects.filter(employee=user)
+        queryset = visible_feedback(self.request.user)
+        if self.request.method != 'GET':
+            return queryset
+        queryset = self.fieldset.narrow(queryset)
+        if include_archived(self.request):
+            # Archive columns line up with Feedback's, so rows come back as Feedback instances
+            archived = self.fieldset.narrow(visible_feedback(self.request.user, ArchivedFeedback))
+            queryset = queryset.order_by().union(archived.order_by(), all=True).order_by('-created_at', '-id')
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        # Users for the whole page in one query, and none when they aren't shown
+        users = self.fieldset.load_users(page)
+        response = self.get_paginated_response(self.fieldset.serializer(FeedbackSerializer, page, many=True).data)
+        if users is not None:
+            response.data['users'] = users
+        return response
     
     def perform_create(self, serializer):
         feedback = serializer.save()
         
-        # Send real-time notification via Channels ONLY if users are connected
+        # Send real-time notification via Channels (logged for replay if offline)
         employee_id = feedback.employee.id
         manager_id = feedback.manager.id
         
         # Serialize the feedback for sending
         feedback_data = FeedbackSerializer(feedback).data
         
-        # Send to employee ONLY if they are connected
-        if channel_manager.is_user_connected(employee_id):
-            channel_manager.send_to_user(
-                user_id=employee_id,
-                event_type='new_feedback',
-                data=feedback_data
-            )
+        # Send to employee
+        channel_manager.send_to_user(
+            user_id=employee_id,
+            event_type='new_feedback',
+            data=feedback_data
+        )
         
-        # Send to manager ONLY if they are connected (for their dashboard update)
-        if channel_manager.is_user_connected(manager_id):
-            channel_manager.send_to_user(
-                user_id=manager_id,
-                event_type='feedback_created',
-                data=feedback_data
-            )
+        # Send to manager (for their dashboard update)
+        channel_manager.send_to_user(
+            user_id=manager_id,
+            event_type='feedback_created',
+            data=feedback_data
+        )
+
+class FeedbackSearchView(generics.ListAPIView):
+    """Full-text search over feedback the user may read, best match first, with highlighted snippets"""
+    serializer_class = FeedbackSearchSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def list(self, request, *args, **kwargs):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'detail': 'The q parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Same visibility as visible_feedback()
+        user = request.user
+        results = SearchResults(text, manager=user) if user.is_manager else SearchResults(text, employee=user)
+        hits = self.paginate_queryset(results)
+        
+        feedback = Feedback.objects.select_related('employee', 'manager').in_bulk([hit['id'] for hit in hits])
+        page = []
+        for hit in hits:
+            item = feedback.get(hit['id'])
+            if item is None:
+                continue
+            item.search_rank = hit['rank']
+            item.search_snippet = hit['snippet']
+            page.append(item)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def suggest_sentiment(request):
+    """Suggest a sentiment for draft feedback text (Manager only)"""
+    if not request.user.is_manager:
+        return Response(
+            {'detail': 'Only managers can write feedback.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    strengths = request.data.get('strengths') or ''
+    areas_to_improve = request.data.get('areas_to_improve') or ''
+    if not isinstance(strengths, str) or not isinstance(areas_to_improve, str):
+        return Response({'detail': 'strengths and areas_to_improve must be strings.'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(get_sentiment_model().suggest(strengths, areas_to_improve))
 
 class FeedbackDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = FeedbackSerializer
     permission_classes = [permissions.IsAuthenticated, IsManagerOrReadOnly]
     
+    @cached_property
+    def fieldset(self):
+        return feedback_fieldset(self.request.query_params)
+    
     def get_queryset(self):
-        user = self.request.user
-        if user.is_manager:
-            return Feedback.objects.filter(manager=user)
-        else:
-            return Feedback.objects.filter(employee=user)
+        queryset = visible_feedback(self.request.user)
+        if self.request.method == 'GET':
+            queryset = self.fieldset.join(self.fieldset.narrow(queryset))
+        return queryset
+    
+    def retrieve(self, request, *args, **kwargs):
+        feedback = self.get_object()
+        users = self.fieldset.load_users([feedback])
+        data = self.fieldset.serializer(FeedbackSerializer, feedback).data
+        if users is not None:
+            data['users'] = users
+        return Response(data)
     
     def perform_update(self, serializer):
         feedback = serializer.save()
         
-        # Send real-time notification for feedback update ONLY if users are connected
+        # Send real-time notification for feedback update
         employee_id = feedback.employee.id
         manager_id = feedback.manager.id
         
         feedback_data = FeedbackSerializer(feedback).data
         
-        # Send to employee ONLY if connected
-        if channel_manager.is_user_connected(employee_id):
-            channel_manager.send_to_user(
-                user_id=employee_id,
-                event_type='feedback_updated',
-                data=feedback_data
-            )
+        # Send to employee
+        channel_manager.send_to_user(
+            user_id=employee_id,
+            event_type='feedback_updated',
+            data=feedback_data
+        )
         
-        # Send to manager ONLY if connected
-        if channel_manager.is_user_connected(manager_id):
-            channel_manager.send_to_user(
-                user_id=manager_id,
-                event_type='feedback_updated',
-                data=feedback_data
-            )
+        # Send to manager
+        channel_manager.send_to_user(
+            user_id=manager_id,
+            event_type='feedback_updated',
+            data=feedback_data
+        )
     
     def perform_destroy(self, instance):
         employee_id = instance.employee.id
@@ -184,20 +420,18 @@ class FeedbackDetailView(generics.RetrieveUpdateDestroyAPIView):
         
         instance.delete()
         
-        # Send real-time notification for feedback deletion ONLY if users are connected
-        if channel_manager.is_user_connected(employee_id):
-            channel_manager.send_to_user(
-                user_id=employee_id,
-                event_type='feedback_deleted',
-                data={'id': feedback_id}
-            )
+        # Send real-time notification for feedback deletion
+        channel_manager.send_to_user(
+            user_id=employee_id,
+            event_type='feedback_deleted',
+            data={'id': feedback_id}
+        )
         
-        if channel_manager.is_user_connected(manager_id):
-            channel_manager.send_to_user(
-                user_id=manager_id,
-                event_type='feedback_deleted',
-                data={'id': feedback_id}
-            )
+        channel_manager.send_to_user(
+            user_id=manager_id,
+            event_type='feedback_deleted',
+            data={'id': feedback_id}
+        )
 
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
@@ -221,49 +455,281 @@ def acknowledge_feedback(request, pk):
     if serializer.is_valid():
         feedback = serializer.save()
         
-        # Send real-time notification for acknowledgment ONLY if users are connected
+        # Send real-time notification for acknowledgment
         employee_id = feedback.employee.id
         manager_id = feedback.manager.id
         
         feedback_data = FeedbackSerializer(feedback).data
         
-        # Send to manager ONLY if connected (they need to know it was acknowledged)
-        if channel_manager.is_user_connected(manager_id):
-            channel_manager.send_to_user(
-                user_id=manager_id,
-                event_type='feedback_acknowledged',
-                data=feedback_data
-            )
+        # Send to manager (they need to know it was acknowledged)
+        channel_manager.send_to_user(
+            user_id=manager_id,
+            event_type='feedback_acknowledged',
+            data=feedback_data
+        )
         
-        # Send to employee ONLY if connected (for their dashboard update)
-        if channel_manager.is_user_connected(employee_id):
-            channel_manager.send_to_user(
-                user_id=employee_id,
-                event_type='feedback_acknowledged',
-                data=feedback_data
-            )
+        # Send to employee (for their dashboard update)
+        channel_manager.send_to_user(
+            user_id=employee_id,
+            event_type='feedback_acknowledged',
+            data=feedback_data
+        )
         
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-# Keep the SSE endpoint for backward compatibility
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def similar_feedback(request, pk):
+    """
+    Near-duplicates of a feedback's strengths text from the MinHash/LSH index.
+    Staff search every team; others search the feedback they can see.
+    Optional ?threshold= (estimated Jaccard, default 0.5) and ?limit=.
+    """
+    user = request.user
+    scope = Feedback.objects.all() if user.is_staff else visible_feedback(user)
+    try:
+        feedback = scope.get(pk=pk)
+    except Feedback.DoesNotExist:
+        return Response(
+            {'detail': 'Feedback not found.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    try:
+        threshold = float(request.query_params.get('threshold', similarity.DEFAULT_THRESHOLD))
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        return Response({'detail': 'threshold must be a number and limit an integer.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < threshold <= 1 or not 1 <= limit <= 100:
+        return Response({'detail': 'threshold must be in (0, 1] and limit in 1-100.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    matches = similarity.similar_to(feedback, scope, threshold=threshold, limit=limit)
+    found = scope.select_related('employee', 'manager').in_bulk([id for id, _ in matches])
+    results = []
+    for id, score in matches:
+        if id in found:
+            found[id].similarity = round(score, 4)
+            results.append(found[id])
+    return Response({
+        'id': feedback.id,
+        'threshold': threshold,
+        'results': SimilarFeedbackSerializer(results, many=True).data,
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+@renderer_classes([CSVRenderer, NDJSONRenderer])
+def export_feedback(request):
+    """Stream feedback as CSV or NDJSON (?format=), optionally between ?from= and ?to= and with ?include_archived=true; staff get everything"""
+    try:
+        date_from = parse_bound(request.query_params.get('from'))
+        date_to = parse_bound(request.query_params.get('to'), end=True)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = Feedback.objects.all() if request.user.is_staff else visible_feedback(request.user)
+    archived = None
+    if include_archived(request):
+        archived = ArchivedFeedback.objects.all() if request.user.is_staff else visible_feedback(request.user, ArchivedFeedback)
+    export = FeedbackExport(export_queryset(queryset, date_from, date_to, archived), request.accepted_renderer.format)
+    
+    # ASGI servers need an async iterator to stream without buffering the whole body
+    content = aiter(export) if isinstance(request._request, ASGIRequest) else iter(export)
+    response = StreamingHttpResponse(content, content_type=export.content_type)
+    response['Content-Disposition'] = f'attachment; filename="feedback-export.{export.fmt}"'
+    return response
+
+SENTIMENT_GRANULARITIES = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def sentiment_analytics(request):
+    """
+    Feedback counts by sentiment per day, week or month (?granularity=),
+    read from the daily rollups. Managers see their team; staff see every
+    team or one with ?manager=<id>. Optional ?from= and ?to= dates.
+    """
+    user = request.user
+    if not (user.is_manager or user.is_staff):
+        return Response(
+            {'detail': 'Only managers can view sentiment analytics.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    granularity = request.query_params.get('granularity', 'day')
+    if granularity not in SENTIMENT_GRANULARITIES:
+        return Response(
+            {'detail': f"granularity must be one of {', '.join(SENTIMENT_GRANULARITIES)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        date_from = parse_bound(request.query_params.get('from'))
+        date_to = parse_bound(request.query_params.get('to'), end=True)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    rollups = SentimentRollup.objects.exclude(count=0)
+    # Cached per team, or for every team, until feedback in it changes
+    scope, namespace = 'all', caching.ALL_FEEDBACK
+    if user.is_staff:
+        manager_id = request.query_params.get('manager')
+        if manager_id:
+            if not manager_id.isdigit():
+                return Response({'detail': 'manager must be a user id.'}, status=status.HTTP_400_BAD_REQUEST)
+            rollups = rollups.filter(manager_id=int(manager_id))
+            scope, namespace = int(manager_id), caching.given_namespace(int(manager_id))
+    else:
+        rollups = rollups.filter(manager=user)
+        scope, namespace = user.pk, caching.given_namespace(user.pk)
+    if date_from is not None:
+        rollups = rollups.filter(day__gte=date_from.date())
+    if date_to is not None:
+        rollups = rollups.filter(day__lt=date_to.date())
+    
+    def compute():
+        trunc = SENTIMENT_GRANULARITIES[granularity]
+        rows = (
+            rollups.annotate(period=trunc('day') if trunc else F('day'))
+            .values('period', 'sentiment', 'acknowledged')
+            .annotate(total=Sum('count'))
+            .order_by('period')
+        )
+        
+        periods = {}
+        for row in rows:
+            period = periods.setdefault(row['period'], {
+                'period': row['period'].isoformat(),
+                'positive': 0, 'neutral': 0, 'negative': 0,
+                'acknowledged': 0, 'total': 0,
+            })
+            period[row['sentiment']] += row['total']
+            period['total'] += row['total']
+            if row['acknowledged']:
+                period['acknowledged'] += row['total']
+        return list(periods.values())
+    
+    results = caching.remember(
+        'sentiment-analytics', compute,
+        parts=(scope, granularity, date_from and date_from.isoformat(), date_to and date_to.isoformat()),
+        namespaces=(namespace,),
+    )
+    return Response({'granularity': granularity, 'results': results})
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def realtime_connections(request):
+    """Per-connection send queue depth, deepest first, to spot slow clients"""
+    try:
+        limit = int(request.query_params.get('limit', 100))
+    except ValueError:
+        limit = 100
+    return Response({'connections': connection_stats(limit)})
+
+def metrics_authorized(request):
+    """Scrapers send METRICS_TOKEN as a bearer token; staff can use their JWT"""
+    header = request.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return False
+    token = header[len('Bearer '):]
+    if settings.METRICS_TOKEN and hmac.compare_digest(token, settings.METRICS_TOKEN):
+        return True
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and result[0].is_staff
+
+def metrics(request):
+    """Prometheus text-format metrics for HTTP, WebSocket and channel layer traffic"""
+    if not metrics_authorized(request):
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 @method_decorator(csrf_exempt, name='dispatch')
 class SSEView(View):
-    """Server-Sent Events endpoint - now redirects to WebSocket"""
+    """
+    Server-Sent Events endpoint for clients that can't use WebSockets.
+
+    Fed by the same per-user event log as SSEConsumer. Each stream waits on
+    its own bounded OutboundQueue, so an idle client costs no thread and no
+    polling.
+    Authenticate with an `Authorization: Bearer <token>` header or `?token=`,
+    and resume with the standard `Last-Event-ID` header (or `?last_event_id=`).
+    """
     
-    def get(self, request):
-        # Return instructions to use WebSocket instead
-        response_data = {
-            'message': 'SSE is now handled via WebSocket. Connect to ws://localhost:8000/ws/sse/{user_id}/ with token parameter.',
-            'websocket_url': 'ws://localhost:8000/ws/sse/',
-            'instructions': 'Use WebSocket connection with token as query parameter'
-        }
+    async def get(self, request):
+        token = self._get_token(request)
+        user = await get_user_from_token(token) if token else AnonymousUser()
+        if not user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
         
-        return StreamingHttpResponse(
-            self._info_stream(response_data),
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        response = StreamingHttpResponse(
+            self._event_stream(user, last_event_id),
             content_type='text/event-stream'
         )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+        return response
+    
+    def _get_token(self, request):
+        auth_header = request.headers.get('Authorization', '')
+        if auth_header.startswith('Bearer '):
+            return auth_header[len('Bearer '):]
+        return request.GET.get('token')
     
-    def _info_stream(self, data):
-        """Generate info stream"""
-        yield f"data: {json.dumps(data)}\n\n"
+    def _format_event(self, event_type, data, seq=None):
+        """Format one SSE frame"""
+        return encode_event(event_type, seq, data)[1]
+    
+    async def _event_stream(self, user, last_event_id):
+        """Stream events for a user until the client goes away"""
+        keepalive = getattr(settings, 'SSE_HEARTBEAT_INTERVAL', 30)
+        # The seq is read as the stream subscribes, so every later event is
+        # queued; replayed ones the queue repeats are dropped by seq below
+        queue, last_seq = sse_manager.subscribe(user.id)
+        try:
+            yield "retry: 3000\n\n"
+            yield self._format_event('connected', {'user_id': user.id, 'seq': last_seq})
+            
+            if last_event_id is not None:
+                events, resync_required = sse_manager.get_events_since(user.id, last_event_id)
+                if resync_required:
+                    yield self._format_event('resync_required', {'seq': last_seq}, seq=last_seq)
+                else:
+                    last_seq = last_event_id
+                    for event in events:
+                        last_seq = event['seq']
+                        yield event['sse']
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keepalive\n\n"
+                    continue
+                if event is None:
+                    # Fell too far behind; end the stream so the client
+                    # reconnects with Last-Event-ID and catches up
+                    return
+                if event is RESYNC:
+                    # drop_oldest discarded an event; its id must not be skipped silently
+                    last_seq = sse_manager.current_seq(user.id)
+                    yield self._format_event('resync_required', {'seq': last_seq}, seq=last_seq)
+                    continue
+                if event['seq'] <= last_seq:
+                    continue
+                last_seq = event['seq']
+                yield event['sse']  # Pre-encoded once for all streams
+        finally:
+            sse_manager.unsubscribe(user.id, queue)
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+"""
+Throughput and latency of the hot REST endpoints with the DRF views
+(ASYNC_VIEWS=False) and the async-native ones in feedback/async_views.py.
+
+Drives the real ASGI application (core.asgi) in-process the way Daphne does.
+Each worker plays one manager and one of their employees and loops over a
+mixed workload: list feedback, read one, list the team, edit one, and give
+feedback that the employee acknowledges and the manager deletes again. Every
+user in the run keeps a WebSocket open, so writes push real events through the
+channel layer, and one more socket pings the server throughout to show how
+the REST load delays WebSocket traffic. Each mode runs in a fresh process.
+
+Edits change the sentiment and strengths of seeded feedback; run it against a
+seeded development database, not one with real data.
+
+Usage:
+    python manage.py seed --managers 10 --employees-per-manager 10 --feedback-per-employee 20
+    python scripts/bench_async_views.py --requests 2000 --concurrency 8,32,128
+"""
+import os
+import sys
+import argparse
+import asyncio
+import itertools
+import json
+import subprocess
+import threading
+import time
+from bench_db_connections import percentile, summarize, timed_runs
+
+MODES = {
+    'sync': {'ASYNC_VIEWS': 'False'},
+    'async': {'ASYNC_VIEWS': 'True'},
+}
+
+SENTIMENTS = ('positive', 'neutral', 'negative')
+
+
+async def http_request(application, method, path, token, body=None):
+    """One request through the ASGI application; returns (status, decoded JSON or None)"""
+    path, _, query = path.partition('?')
+    payload = json.dumps(body).encode() if body is not None else b''
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'https', 'path': path, 'raw_path': path.encode(),
+        'query_string': query.encode(), 'root_path': '',
+        'headers': [
+            (b'host', b'localhost'),
+            (b'authorization', f'Bearer {token}'.encode()),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(payload)).encode()),
+        ],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 443),
+    }
+    sent = False
+    status = []
+    chunks = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': payload, 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+
+    await application(scope, receive, send)
+    content = b''.join(chunks)
+    return status[0], json.loads(content) if content else None
+
+
+class Workload:
+    """The request mix one worker runs, as (operation, coroutine factory) steps"""
+
+    def __init__(self, application, manager, employee, feedback_ids):
+        self.application = application
+        self.manager = manager
+        self.employee = employee
+        self.feedback_ids = itertools.cycle(feedback_ids)
+        self.sentiments = itertools.cycle(SENTIMENTS)
+        self.steps = itertools.cycle([
+            ('list', self.list_feedback),
+            ('detail', self.read_feedback),
+            ('list', self.list_feedback),
+            ('team', self.list_team),
+            ('edit', self.edit_feedback),
+            ('list', self.list_feedback),
+            ('give', self.give_and_withdraw),
+        ])
+        self.errors = 0
+
+    async def request(self, method, path, user, body=None, expected=200):
+        status, data = await http_request(self.application, method, path, user['token'], body)
+        if status != expected:
+            self.errors += 1
+        return data
+
+    async def list_feedback(self):
+        await self.request('GET', '/api/feedbacks/', self.employee)
+
+    async def read_feedback(self):
+        await self.request('GET', f'/api/feedbacks/{next(self.feedback_ids)}/', self.employee)
+
+    async def list_team(self):
+        await self.request('GET', '/api/team/', self.manager)
+
+    async def edit_feedback(self):
+        await self.request('PATCH', f'/api/feedbacks/{next(self.feedback_ids)}/', self.manager, {
+            'sentiment': next(self.sentiments),
+            'strengths': f'Benchmark edit at {time.time():.6f}',
+        })
+
+    async def give_and_withdraw(self):
+        created = await self.request('POST', '/api/feedbacks/', self.manager, {
+            'employee_id': self.employee['id'],
+            'strengths': 'Benchmark feedback',
+            'areas_to_improve': 'None',
+        }, expected=201)
+        if created:
+            await self.request('POST', f'/api/feedbacks/{created["id"]}/acknowledge/', self.employee)
+            await self.request('DELETE', f'/api/feedbacks/{created["id"]}/', self.manager, expected=204)
+
+    async def step(self):
+        operation, run = next(self.steps)
+        started = time.perf_counter()
+        await run()
+        return operation, time.perf_counter() - started
+
+
+async def open_socket(application, user):
+    from channels.testing import WebsocketCommunicator
+    communicator = WebsocketCommunicator(application, f'/ws/sse/{user["id"]}/?token={user["token"]}')
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise RuntimeError(f'WebSocket handshake for user {user["id"]} was rejected')
+    return communicator
+
+
+async def drain(communicator, stop):
+    """Read and discard pushed events so per-connection queues don't fill up"""
+    while not stop.is_set():
+        # receive_from() cancels the consumer when it times out; receive_nothing() doesn't
+        if not await communicator.receive_nothing(timeout=0.1):
+            await communicator.receive_from()
+
+
+async def ping_loop(communicator, stop, round_trips):
+    """Ping every 50ms and record the round trip; the prober's socket gets no events"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await communicator.send_to(text_data=json.dumps({'type': 'ping'}))
+        while True:
+            message = json.loads(await communicator.receive_from(timeout=30))
+            if message.get('type') == 'pong':
+                break
+        round_trips.append(time.perf_counter() - started)
+        await asyncio.sleep(0.05)
+
+
+async def count_threads(stop, peak):
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.01)
+
+
+async def run_level(application, users, prober_user, requests, concurrency):
+    workloads = [
+        Workload(application, manager, employee, feedback_ids)
+        for manager, employee, feedback_ids in itertools.islice(itertools.cycle(users), concurrency)
+    ]
+    # One socket per distinct user; a second socket for the same user is closed as a duplicate
+    people = {user['id']: user for workload in workloads for user in (workload.manager, workload.employee)}
+    sockets = [await open_socket(application, user) for user in people.values()]
+    prober = await open_socket(application, prober_user)
+
+    stop = asyncio.Event()
+    round_trips = []
+    peak = [threading.active_count()]
+    background = [asyncio.ensure_future(drain(socket, stop)) for socket in sockets]
+    background.append(asyncio.ensure_future(ping_loop(prober, stop, round_trips)))
+    background.append(asyncio.ensure_future(count_threads(stop, peak)))
+
+    by_operation = {}
+
+    async def run(worker):
+        operation, elapsed = await workloads[worker].step()
+        by_operation.setdefault(operation, []).append(elapsed)
+
+    started = time.perf_counter()
+    durations = await timed_runs(requests, concurrency, run)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(*background, return_exceptions=True)
+    for socket in sockets + [prober]:
+        await socket.disconnect()
+
+    return {
+        **summarize(durations),
+        'steps_per_sec': requests / elapsed,
+        'errors': sum(workload.errors for workload in workloads),
+        'peak_threads': peak[0],
+        'ws_ping_p50_ms': percentile(round_trips, 50) * 1000 if round_trips else None,
+        'ws_ping_p95_ms': percentile(round_trips, 95) * 1000 if round_trips else None,
+        'operations_p95_ms': {operation: percentile(values, 95) * 1000 for operation, values in sorted(by_operation.items())},
+    }
+
+
+async def measure(requests, levels):
+    import django
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    django.setup()
+
+    from channels.db import database_sync_to_async
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import AccessToken
+    from core.asgi import application
+    from feedback.management.commands.seed import SEED_DOMAIN
+    from feedback.models import Feedback
+
+    def describe(user):
+        return {'id': user.id, 'token': str(AccessToken.for_user(user))}
+
+    @database_sync_to_async
+    def seeded_pairs():
+        """(manager, employee, feedback ids) for each seeded employee that has feedback, plus a prober"""
+        User = get_user_model()
+        employees = User.objects.filter(email__endswith=f'@{SEED_DOMAIN}', is_manager=False, manager__isnull=False).select_related('manager').order_by('id')
+        pairs = []
+        for employee in employees:
+            ids = list(Feedback.objects.filter(employee=employee, manager=employee.manager).values_list('id', flat=True)[:20])
+            if ids:
+                pairs.append((describe(employee.manager), describe(employee), ids))
+        if len(pairs) < 2:
+            raise SystemExit('Need seeded feedback; run `python manage.py seed` first')
+        # The prober is a seeded user outside the workload; it only pings
+        in_workload = {user['id'] for pair in pairs for user in pair[:2]}
+        prober = User.objects.filter(email__endswith=f'@{SEED_DOMAIN}').exclude(id__in=in_workload).first()
+        return pairs, describe(prober) if prober else None
+
+    users, prober = await seeded_pairs()
+    if prober is None:
+        # Every seeded user is in the workload: keep one employee out of it
+        prober = users.pop()[1]
+    # Warm up imports and URL resolution
+    for _ in range(5):
+        await http_request(application, 'GET', '/api/feedbacks/', users[0][1]['token'])
+
+    return {str(concurrency): await run_level(application, users, prober, requests, concurrency) for concurrency in levels}
+
+
+def run_mode(mode, args):
+    env = {**os.environ, **MODES[mode]}
+    command = [sys.executable, __file__, '--child', '--requests', str(args.requests), '--concurrency', args.concurrency]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        return {'error': (output.stderr.strip().splitlines() or ['failed'])[-1]}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='Workload steps per concurrency level')
+    parser.add_argument('--concurrency', default='8,32,128', help='Comma-separated numbers of workers in flight at once')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated modes to compare')
+    parser.add_argument('--output', help='Optional JSON results file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        levels = [int(level) for level in args.concurrency.split(',')]
+        print(json.dumps(asyncio.run(measure(args.requests, levels))))
+        return
+
+    results = {}
+    print(f'{"mode":<6} {"workers":>7} {"steps/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>6} {"threads":>7} {"ws ping p95":>11}')
+    for mode in args.modes.split(','):
+        results[mode] = result = run_mode(mode, args)
+        if 'error' in result:
+            print(f'{mode:<6} skipped: {result["error"]}')
+            continue
+        for concurrency, stats in result.items():
+            print(
+                f'{mode:<6} {concurrency:>7} {stats["steps_per_sec"]:>8.0f} {stats["p50_ms"]:>8.2f} '
+                f'{stats["p95_ms"]:>8.2f} {stats["p99_ms"]:>8.2f} {stats["errors"]:>6} '
+                f'{stats["peak_threads"]:>7} {stats["ws_ping_p95_ms"] or 0:>11.2f}'
+            )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'requests': args.requests, 'concurrency': args.concurrency, 'results': results}, f, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
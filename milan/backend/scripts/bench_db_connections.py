@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+"""
+Request latency and database connection churn with and without connection reuse.
+
+Drives the real ASGI application (core.asgi) in-process the way Daphne does:
+HTTP requests to /api/user/profile/ and WebSocket handshakes, which
+authenticate through database_sync_to_async. Each mode runs in a fresh
+process with its own settings:
+
+    no-reuse    DB_POOL=False, DB_CONN_MAX_AGE=0 (a new connection per request)
+    persistent  DB_POOL=False, DB_CONN_MAX_AGE=60
+    pool        DB_POOL=True (PostgreSQL only)
+
+For every mode it reports latency percentiles, how many connections Django
+asked for, how many the server actually opened, and the time spent getting
+them. The savings grow with connect cost, so run it against the real remote
+database to see the production effect.
+
+Usage:
+    python manage.py seed --managers 5 --employees-per-manager 5 --feedback-per-employee 10
+    python scripts/bench_db_connections.py --requests 500 --concurrency 8
+"""
+import os
+import sys
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+
+MODES = {
+    'no-reuse': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '0'},
+    'persistent': {'DB_POOL': 'False', 'DB_CONN_MAX_AGE': '60'},
+    'pool': {'DB_POOL': 'True'},
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def http_get(application, path, token):
+    """One GET through the ASGI application; returns the status code"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'https', 'path': path, 'raw_path': path.encode(),
+        'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'localhost'), (b'authorization', f'Bearer {token}'.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('localhost', 443),
+    }
+    sent = False
+    status = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await application(scope, receive, send)
+    return status[0]
+
+
+async def websocket_handshake(application, user_id, token):
+    from channels.testing import WebsocketCommunicator
+    communicator = WebsocketCommunicator(application, f'/ws/sse/{user_id}/?token={token}')
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise RuntimeError(f'WebSocket handshake for user {user_id} was rejected')
+    await communicator.disconnect()
+
+
+async def timed_runs(count, concurrency, run):
+    """Run run(worker) count times from `concurrency` workers; returns the durations"""
+    durations = []
+
+    async def worker(index):
+        for _ in range(index, count, concurrency):
+            started = time.perf_counter()
+            await run(index)
+            durations.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker(index) for index in range(concurrency)))
+    return durations
+
+
+def summarize(durations):
+    return {
+        'count': len(durations),
+        'mean_ms': sum(durations) / len(durations) * 1000,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+    }
+
+
+def connection_stats():
+    """Connections Django asked for, server connections opened, and time spent getting them"""
+    from django.db import connection
+    from feedback.metrics import db_connect_latency, db_connections
+    requested = sum(db_connections.values.values())
+    connect_seconds = sum(state[1] for state in db_connect_latency.values.values())
+    pool = getattr(connection, '_connection_pools', {}).get(connection.alias)
+    opened = pool.get_stats().get('connections_num', 0) if pool is not None else requested
+    return {
+        'connections_requested': requested,
+        'connections_opened': opened,
+        'connect_ms_total': connect_seconds * 1000,
+        'connect_ms_mean': connect_seconds / requested * 1000 if requested else 0.0,
+    }
+
+
+async def measure(requests, concurrency):
+    import django
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    django.setup()
+
+    from channels.db import database_sync_to_async
+    from django.contrib.auth import get_user_model
+    from rest_framework_simplejwt.tokens import AccessToken
+    from core.asgi import application
+    from feedback.management.commands.seed import SEED_DOMAIN
+    from feedback.metrics import db_connect_latency, db_connections
+
+    @database_sync_to_async
+    def seeded_users():
+        # One user per worker: a second socket for the same user is closed as a duplicate
+        users = list(get_user_model().objects.filter(email__endswith=f'@{SEED_DOMAIN}').order_by('id')[:concurrency])
+        if len(users) < concurrency:
+            raise SystemExit(f'Need {concurrency} seeded users; run `python manage.py seed` first')
+        return [(user.id, str(AccessToken.for_user(user))) for user in users]
+
+    users = await seeded_users()
+    token = users[0][1]
+    # Warm up imports and URL resolution, then count from zero
+    for _ in range(5):
+        await http_get(application, '/api/user/profile/', token)
+    db_connections.values.clear()
+    db_connect_latency.values.clear()
+
+    result = {}
+    started = time.perf_counter()
+    durations = await timed_runs(requests, concurrency, lambda worker: http_get(application, '/api/user/profile/', users[worker][1]))
+    result['http'] = {**summarize(durations), 'requests_per_sec': requests / (time.perf_counter() - started), **connection_stats()}
+
+    db_connections.values.clear()
+    db_connect_latency.values.clear()
+    handshakes = max(1, requests // 5)
+    durations = await timed_runs(handshakes, concurrency, lambda worker: websocket_handshake(application, *users[worker]))
+    result['websocket'] = {**summarize(durations), **connection_stats()}
+    return result
+
+
+def run_mode(mode, args):
+    env = {**os.environ, **MODES[mode]}
+    command = [sys.executable, __file__, '--child', '--requests', str(args.requests), '--concurrency', str(args.concurrency)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        return {'error': (output.stderr.strip().splitlines() or ['failed'])[-1]}
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500, help='HTTP requests per mode (a fifth as many WebSocket handshakes)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at once')
+    parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated modes to compare')
+    parser.add_argument('--output', help='Optional JSON results file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure(args.requests, args.concurrency))))
+        return
+
+    results = {}
+    print(f'{"mode":<12} {"path":<10} {"p50 ms":>8} {"p95 ms":>8} {"req/s":>8} {"asked":>7} {"opened":>7} {"connect ms":>11}')
+    for mode in args.modes.split(','):
+        results[mode] = result = run_mode(mode, args)
+        if 'error' in result:
+            print(f'{mode:<12} skipped: {result["error"]}')
+            continue
+        for path, stats in result.items():
+            print(
+                f'{mode:<12} {path:<10} {stats["p50_ms"]:>8.2f} {stats["p95_ms"]:>8.2f} '
+                f'{stats.get("requests_per_sec", 0):>8.0f} {stats["connections_requested"]:>7} '
+                f'{stats["connections_opened"]:>7} {stats["connect_ms_total"]:>11.1f}'
+            )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'requests': args.requests, 'concurrency': args.concurrency, 'results': results}, f, indent=2)
+        print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
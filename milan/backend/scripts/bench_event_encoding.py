@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark the CPU cost of delivering one event to N connections.
+
+Compares the old path (the channel layer deep-copies the full payload dict
+for every connection and every consumer handler calls json.dumps) with the
+current path (the event is encoded once at dispatch and every connection
+receives the same ready-to-send text).
+
+Usage:
+    python scripts/bench_event_encoding.py [--fanout 1,100,10000] [--events 20]
+"""
+import os
+import sys
+import json
+import argparse
+import time
+from copy import deepcopy
+import django
+
+# Add the parent directory to the path so we can import Django settings
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+django.setup()
+
+from feedback import encoding
+from feedback.encoding import encode_event
+
+
+def sample_feedback():
+    """A payload shaped like FeedbackSerializer output"""
+    def user(user_id, first, last, is_manager):
+        email = f"{first.lower()}@company.com"
+        return {
+            'id': user_id, 'username': email, 'email': email,
+            'first_name': first, 'last_name': last, 'is_manager': is_manager,
+        }
+    return {
+        'id': 12345,
+        'employee': user(2, 'Jane', 'Employee', False),
+        'manager': user(1, 'John', 'Manager', True),
+        'strengths': 'Excellent communication skills and always meets deadlines. ' * 3,
+        'areas_to_improve': 'Could benefit from taking on leadership roles in projects. ' * 3,
+        'sentiment': 'positive',
+        'acknowledged': False,
+        'created_at': '2025-06-24T06:02:00.000000Z',
+        'updated_at': '2025-06-24T06:02:00.000000Z',
+        'acknowledged_at': None,
+    }
+
+
+def per_connection(data, fanout):
+    """Old path: full dict through the channel layer, json.dumps per handler call"""
+    message = {'type': 'new.feedback', 'event_type': 'new_feedback', 'data': data}
+    for _ in range(fanout):
+        received = deepcopy(message)
+        json.dumps({'type': 'new_feedback', 'data': received['data']})
+
+
+def encode_once(data, fanout, seq):
+    """Current path: encode at dispatch, pass the text through"""
+    text, _ = encode_event('new_feedback', seq, data)
+    message = {'type': 'new.feedback', 'event_type': 'new_feedback', 'seq': seq, 'text': text}
+    for _ in range(fanout):
+        received = deepcopy(message)
+        received['text']
+
+
+def measure(fn, events):
+    started = time.process_time()
+    for _ in range(events):
+        fn()
+    return (time.process_time() - started) / events
+
+
+def main(fanouts, events):
+    data = sample_feedback()
+    print(f"Encoder: {'orjson' if encoding.orjson is not None else 'json (stdlib)'}")
+    print(f"{'fan-out':>8} {'old us/msg':>12} {'new us/msg':>12} {'old ms/event':>14} {'new ms/event':>14} {'speedup':>8}")
+    for fanout in fanouts:
+        # Fewer repetitions for big fan-outs keep the run short
+        reps = max(1, events // max(1, fanout // 100))
+        old = measure(lambda: per_connection(data, fanout), reps)
+        new = measure(lambda: encode_once(data, fanout, 1), reps)
+        print(
+            f"{fanout:>8} {old / fanout * 1e6:>12.2f} {new / fanout * 1e6:>12.2f} "
+            f"{old * 1000:>14.3f} {new * 1000:>14.3f} {old / new if new else float('inf'):>7.1f}x"
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fanout', default='1,100,10000', help='Comma-separated connection counts')
+    parser.add_argument('--events', type=int, default=200, help='Events per measurement')
+    args = parser.parse_args()
+    main([int(n) for n in args.fanout.split(',')], args.events)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Benchmark heartbeat cost for many idle WebSocket connections.
+
+Compares the old one-asyncio-task-per-socket heartbeat loop with the shared
+HeartbeatScheduler timer wheel. For each connection count it reports traced
+memory per connection and CPU time spent per second of wall time while the
+connections sit idle receiving heartbeats.
+
+Usage:
+    python scripts/bench_heartbeats.py [--connections 10000,50000,100000]
+                                       [--interval 1.0] [--duration 5]
+"""
+import os
+import sys
+import asyncio
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import django
+
+# Add the parent directory to the path so we can import Django settings
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+django.setup()
+
+from feedback.heartbeat import HeartbeatScheduler
+
+
+class IdleConnection:
+    """Stands in for an idle SSEConsumer; sends go nowhere"""
+
+    def __init__(self, loop):
+        self.last_activity = loop.time()
+        self.beats = 0
+
+    async def send(self, text_data=None):
+        self.beats += 1
+
+    async def send_heartbeat(self, text):
+        self.beats += 1
+
+    async def close(self, code=None):
+        pass
+
+
+async def legacy_heartbeat(connection, interval):
+    """The previous per-socket heartbeat loop, without its 20-beat cut-off"""
+    count = 0
+    while True:
+        await asyncio.sleep(interval)
+        count += 1
+        await connection.send(text_data=json.dumps({
+            'type': 'heartbeat',
+            'timestamp': asyncio.get_event_loop().time(),
+            'count': count
+        }))
+
+
+async def run(mode, count, interval, duration):
+    loop = asyncio.get_running_loop()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    connections = [IdleConnection(loop) for _ in range(count)]
+    connections_memory = tracemalloc.get_traced_memory()[0] - baseline
+    if mode == 'task-per-socket':
+        tasks = [loop.create_task(legacy_heartbeat(connection, interval)) for connection in connections]
+        scheduler = None
+    else:
+        scheduler = HeartbeatScheduler(interval=interval, idle_timeout=0, tick=interval / 10)
+        for connection in connections:
+            scheduler.register(connection)
+        tasks = []
+    await asyncio.sleep(0)
+    heartbeat_memory = tracemalloc.get_traced_memory()[0] - baseline - connections_memory
+    tracemalloc.stop()
+
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    await asyncio.sleep(duration)
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    beats = sum(connection.beats for connection in connections)
+
+    for task in tasks:
+        task.cancel()
+    if scheduler is not None:
+        for connection in connections:
+            scheduler.unregister(connection)
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if scheduler is not None and scheduler.task is not None:
+        await scheduler.task
+
+    print(
+        f"{count:>8} {mode:>16} {heartbeat_memory / count:>14.0f} "
+        f"{cpu / wall * 1000:>14.1f} {beats / wall:>12.0f} {cpu / max(beats, 1) * 1e6:>12.2f}"
+    )
+
+
+async def main(counts, interval, duration):
+    print(f"{'conns':>8} {'mode':>16} {'bytes/conn':>14} {'CPU ms/s':>14} {'beats/s':>12} {'CPU us/beat':>12}")
+    for count in counts:
+        for mode in ('task-per-socket', 'timer-wheel'):
+            await run(mode, count, interval, duration)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', default='10000,50000,100000', help='Comma-separated connection counts')
+    parser.add_argument('--interval', type=float, default=1.0, help='Heartbeat interval in seconds (scaled down from 30s)')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds to measure each run')
+    args = parser.parse_args()
+    asyncio.run(main([int(n) for n in args.connections.split(',')], args.interval, args.duration))
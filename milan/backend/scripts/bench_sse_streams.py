@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+"""
+Benchmark concurrent /api/sse/ streams in a single process.
+
+Opens N Server-Sent Events streams against the ASGI application in-process,
+then reports memory per open stream and how long one event takes to reach
+every stream.
+
+Usage:
+    python scripts/bench_sse_streams.py [--streams 100,1000,5000]
+"""
+import os
+import sys
+import asyncio
+import argparse
+import gc
+import time
+import tracemalloc
+import django
+
+# Add the parent directory to the path so we can import Django settings
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+django.setup()
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import AccessToken
+from core.asgi import application
+from feedback.channel_manager import channel_manager
+
+User = get_user_model()
+
+BENCH_EMAIL = 'sse-bench@company.com'
+
+
+class SSEStreamClient:
+    """Minimal ASGI HTTP client that holds one SSE response open"""
+
+    def __init__(self, token):
+        self.token = token
+        self.disconnected = asyncio.Event()
+        self.request_sent = False
+        self.buffer = b''
+        self.frame_received = asyncio.Event()
+        self.task = None
+
+    def scope(self):
+        return {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': '/api/sse/',
+            'raw_path': b'/api/sse/',
+            'query_string': f'token={self.token}'.encode(),
+            'headers': [(b'host', b'localhost'), (b'accept', b'text/event-stream')],
+            'client': ('127.0.0.1', 50000),
+            'server': ('localhost', 8000),
+        }
+
+    async def receive(self):
+        if not self.request_sent:
+            self.request_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        if message['type'] == 'http.response.body':
+            self.buffer += message.get('body', b'')
+            self.frame_received.set()
+
+    def start(self):
+        self.task = asyncio.ensure_future(application(self.scope(), self.receive, self.send))
+
+    async def wait_for(self, marker):
+        """Wait until marker shows up in the stream, then reset the buffer"""
+        while marker not in self.buffer:
+            self.frame_received.clear()
+            await self.frame_received.wait()
+        self.buffer = b''
+
+    async def close(self):
+        self.disconnected.set()
+        try:
+            await asyncio.wait_for(self.task, timeout=5)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            self.task.cancel()
+
+
+def get_bench_user():
+    user, _ = User.objects.get_or_create(
+        email=BENCH_EMAIL,
+        defaults={'username': BENCH_EMAIL, 'first_name': 'SSE', 'last_name': 'Bench'}
+    )
+    return user, str(AccessToken.for_user(user))
+
+
+def rss_kb():
+    """Current resident set size in KB (Linux), or 0 if unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError):
+        return 0
+
+
+async def run(count, user, token):
+    gc.collect()
+    rss_before = rss_kb()
+    tracemalloc.start()
+    snapshot_before = tracemalloc.take_snapshot()
+
+    started = time.perf_counter()
+    clients = [SSEStreamClient(token) for _ in range(count)]
+    for client in clients:
+        client.start()
+    await asyncio.gather(*(client.wait_for(b'event: connected') for client in clients))
+    open_seconds = time.perf_counter() - started
+
+    gc.collect()
+    snapshot_after = tracemalloc.take_snapshot()
+    traced = sum(stat.size_diff for stat in snapshot_after.compare_to(snapshot_before, 'filename'))
+    tracemalloc.stop()
+    rss_after = rss_kb()
+
+    started = time.perf_counter()
+    await sync_to_async(channel_manager.send_to_user)(user.id, 'bench_event', {'n': count})
+    await asyncio.gather(*(client.wait_for(b'event: bench_event') for client in clients))
+    fanout_seconds = time.perf_counter() - started
+
+    await asyncio.gather(*(client.close() for client in clients))
+
+    print(
+        f"{count:>8} {open_seconds:>10.2f} {traced / count / 1024:>14.1f} "
+        f"{(rss_after - rss_before) / count:>12.1f} {fanout_seconds * 1000:>12.1f}"
+    )
+
+
+async def main(counts):
+    user, token = await sync_to_async(get_bench_user)()
+    print(f"{'streams':>8} {'open (s)':>10} {'traced KB/str':>14} {'RSS KB/str':>12} {'fan-out ms':>12}")
+    for count in counts:
+        await run(count, user, token)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', default='100,1000,5000', help='Comma-separated stream counts')
+    args = parser.parse_args()
+    asyncio.run(main([int(n) for n in args.streams.split(',')]))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Compare WebSocket wire encodings: bytes on the wire and encode cost.
+
+Encodes a typical feedback event and a large one (long review text) with
+every encoding a client can negotiate on ws/sse/: JSON text (default),
+JSON + deflate, MessagePack and MessagePack + deflate.
+
+Usage:
+    python scripts/bench_wire_encoding.py [--iterations 2000] [--threshold 0]
+"""
+import os
+import sys
+import argparse
+import time
+import django
+
+# Add the parent directory to the path so we can import Django settings
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+django.setup()
+
+from feedback import encoding
+from feedback.encoding import WireFormat, encode_event, JSON, MSGPACK
+from bench_event_encoding import sample_feedback
+
+
+def frame_size(frame):
+    if 'text_data' in frame:
+        return len(frame['text_data'].encode())
+    return len(frame['bytes_data'])
+
+
+def measure(wire, data, iterations):
+    """Average encode time in microseconds and frame size in bytes"""
+    started = time.perf_counter()
+    for seq in range(iterations):
+        text, _ = encode_event('new_feedback', seq, data)
+        frame = wire.encode_event({'type': 'new_feedback', 'seq': seq, 'data': data, 'text': text})
+    elapsed = time.perf_counter() - started
+    return elapsed / iterations * 1e6, frame_size(frame)
+
+
+def main(iterations, threshold):
+    payloads = {'typical': sample_feedback()}
+    large = sample_feedback()
+    large['strengths'] = large['strengths'] * 20
+    large['areas_to_improve'] = large['areas_to_improve'] * 20
+    payloads['large'] = large
+
+    formats = [WireFormat(JSON, False, threshold), WireFormat(JSON, True, threshold)]
+    if encoding.msgpack is not None:
+        formats += [WireFormat(MSGPACK, False, threshold), WireFormat(MSGPACK, True, threshold)]
+    else:
+        print("msgpack is not installed; skipping MessagePack encodings")
+
+    print(f"Compression threshold: {threshold} bytes")
+    print(f"{'payload':>8} {'encoding':>16} {'bytes':>8} {'vs json':>8} {'encode us':>10}")
+    for name, data in payloads.items():
+        baseline = None
+        for wire in formats:
+            encode_us, size = measure(wire, data, iterations)
+            baseline = baseline or size
+            print(f"{name:>8} {wire.cache_key:>16} {size:>8} {size / baseline:>7.0%} {encode_us:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--threshold', type=int, default=0, help='Deflate payloads larger than this many bytes')
+    args = parser.parse_args()
+    main(args.iterations, args.threshold)
@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+"""
+End-to-end performance benchmarks for the HTTP API and the WebSocket surface.
+
+Runs against whatever database DATABASE_URL points at (local SQLite or
+Postgres), using accounts created by `python manage.py seed`. Every
+benchmark records latency percentiles or throughput together with the
+number of SQL queries per request. Results are written to a JSON file and
+can be compared against a previously saved baseline.
+
+Usage:
+    python manage.py seed --managers 20 --employees-per-manager 10 --feedback-per-employee 200
+    python scripts/benchmark.py --output results.json
+    python scripts/benchmark.py --output new.json --baseline results.json [--fail-on-regression]
+"""
+import os
+import sys
+import asyncio
+import argparse
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone as dt_timezone
+import django
+
+# Add the parent directory to the path so we can import Django settings
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+django.setup()
+
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework_simplejwt.tokens import AccessToken
+from core.asgi import application
+from feedback.management.commands.seed import SEED_DOMAIN, SEED_PASSWORD
+from feedback.models import Feedback
+
+User = get_user_model()
+
+# Metrics where a larger number is better; everything else is a latency
+HIGHER_IS_BETTER = ('ops_per_sec',)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(durations, queries=None):
+    """Latency summary in milliseconds for a list of durations in seconds"""
+    total = sum(durations)
+    result = {
+        'count': len(durations),
+        'mean_ms': total / len(durations) * 1000,
+        'p50_ms': percentile(durations, 50) * 1000,
+        'p95_ms': percentile(durations, 95) * 1000,
+        'p99_ms': percentile(durations, 99) * 1000,
+        'ops_per_sec': len(durations) / total if total else 0.0,
+    }
+    if queries is not None:
+        result['queries_per_op'] = sum(queries) / len(queries)
+    return result
+
+
+class APIBenchmark:
+    """Drives the REST API in-process through Django's test client"""
+
+    def __init__(self, iterations, warmup):
+        self.iterations = iterations
+        self.warmup = warmup
+        self.client = Client(HTTP_HOST='localhost')
+        self.created_ids = []
+
+        # The busiest seeded manager gives the deepest feedback list
+        busiest = (
+            Feedback.objects.filter(manager__email__endswith=f'@{SEED_DOMAIN}')
+            .values('manager').annotate(n=Count('id')).order_by('-n').first()
+        )
+        if busiest is None:
+            raise SystemExit('No seeded data found. Run `python manage.py seed` first.')
+        self.manager = User.objects.get(pk=busiest['manager'])
+        self.feedback_count = busiest['n']
+        self.employee = User.objects.filter(manager=self.manager).order_by('id').first()
+        self.manager_auth = self.auth_header(self.manager)
+        self.employee_auth = self.auth_header(self.employee)
+
+    def auth_header(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+    def timed(self, method, path, expected_status, **kwargs):
+        """Run one request; returns (seconds, query count, response)"""
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(self.client, method)(path, secure=True, **kwargs)
+            elapsed = time.perf_counter() - started
+        if response.status_code != expected_status:
+            raise RuntimeError(f'{method.upper()} {path} returned {response.status_code}: {response.content[:200]!r}')
+        return elapsed, len(queries), response
+
+    def run_many(self, requests, warmup=True):
+        # Warm caches and connections on the first request before timing
+        for method, path, status, kwargs in requests[:1] * (self.warmup if warmup else 0):
+            self.timed(method, path, status, **kwargs)
+        durations, query_counts = [], []
+        for method, path, status, kwargs in requests:
+            elapsed, queries, _ = self.timed(method, path, status, **kwargs)
+            durations.append(elapsed)
+            query_counts.append(queries)
+        return summarize(durations, query_counts)
+
+    def list_by_page_depth(self):
+        page_size = 20
+        last_page = max(1, -(-self.feedback_count // page_size))
+        results = {}
+        for page in sorted({1, 10, 100, last_page}):
+            if page > last_page:
+                continue
+            path = f'/api/feedbacks/?page={page}'
+            results[f'feedback_list_page_{page}'] = self.run_many(
+                [('get', path, 200, self.manager_auth)] * self.iterations
+            )
+        return results
+
+    def detail(self):
+        feedback_id = Feedback.objects.filter(manager=self.manager).values_list('id', flat=True).first()
+        path = f'/api/feedbacks/{feedback_id}/'
+        return {'feedback_detail': self.run_many([('get', path, 200, self.manager_auth)] * self.iterations)}
+
+    def create_and_acknowledge(self):
+        body = json.dumps({
+            'employee_id': self.employee.id,
+            'strengths': 'Benchmark strengths text. ' * 5,
+            'areas_to_improve': 'Benchmark areas to improve. ' * 5,
+            'sentiment': 'positive',
+        })
+        durations, query_counts = [], []
+        for _ in range(self.iterations):
+            elapsed, queries, response = self.timed(
+                'post', '/api/feedbacks/', 201, data=body, content_type='application/json', **self.manager_auth
+            )
+            durations.append(elapsed)
+            query_counts.append(queries)
+            self.created_ids.append(response.json()['id'])
+        results = {'feedback_create': summarize(durations, query_counts)}
+
+        results['feedback_acknowledge'] = self.run_many([
+            ('post', f'/api/feedbacks/{feedback_id}/acknowledge/', 200, self.employee_auth)
+            for feedback_id in self.created_ids
+        ], warmup=False)
+        return results
+
+    def create_one(self):
+        """Create a single feedback; used to trigger real-time events"""
+        body = json.dumps({
+            'employee_id': self.employee.id,
+            'strengths': 'Delivery latency probe.',
+            'areas_to_improve': 'None.',
+            'sentiment': 'neutral',
+        })
+        _, _, response = self.timed('post', '/api/feedbacks/', 201, data=body, content_type='application/json', **self.manager_auth)
+        self.created_ids.append(response.json()['id'])
+
+    def login(self):
+        body = json.dumps({'username': self.employee.email, 'password': SEED_PASSWORD})
+        # Password hashing dominates login, so fewer iterations are enough
+        count = max(1, self.iterations // 5)
+        return {'token_obtain': self.run_many(
+            [('post', '/api/token/', 200, {'data': body, 'content_type': 'application/json'})] * count
+        )}
+
+    def cleanup(self):
+        Feedback.objects.filter(id__in=self.created_ids).delete()
+
+
+class WebSocketBenchmark:
+    """Drives ws/sse/ through Channels' WebsocketCommunicator"""
+
+    def __init__(self, api):
+        self.api = api
+        self.iterations = api.iterations
+        self.employee = api.employee
+        self.token = str(AccessToken.for_user(self.employee))
+
+    def communicator(self):
+        return WebsocketCommunicator(application, f'/ws/sse/{self.employee.id}/?token={self.token}')
+
+    async def connect_rate(self):
+        durations = []
+        for _ in range(self.iterations):
+            communicator = self.communicator()
+            started = time.perf_counter()
+            connected, _ = await communicator.connect()
+            await communicator.receive_json_from()
+            durations.append(time.perf_counter() - started)
+            if not connected:
+                raise RuntimeError('WebSocket connection was rejected')
+            await communicator.disconnect()
+        return {'ws_connect': summarize(durations)}
+
+    async def event_delivery(self):
+        """Latency from the start of a feedback POST to the employee's socket receiving it"""
+        communicator = self.communicator()
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        durations = []
+        for _ in range(self.iterations):
+            started = time.perf_counter()
+            await database_sync_to_async(self.api.create_one)()
+            while True:
+                message = await communicator.receive_json_from(timeout=5)
+                if message.get('type') == 'new_feedback':
+                    break
+            durations.append(time.perf_counter() - started)
+        await communicator.disconnect()
+        return {'ws_event_delivery': summarize(durations)}
+
+    async def run(self):
+        results = await self.connect_rate()
+        results.update(await self.event_delivery())
+        return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; returns the names of regressed metrics"""
+    regressions = []
+    print(f"\n{'benchmark':<28} {'metric':<14} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, metrics in results['benchmarks'].items():
+        before = baseline.get('benchmarks', {}).get(name)
+        if not before:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'ops_per_sec', 'queries_per_op'):
+            if metric not in metrics or metric not in before or not before[metric]:
+                continue
+            change = (metrics[metric] - before[metric]) / before[metric]
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ''
+            if metric == 'queries_per_op':
+                if metrics[metric] > before[metric]:
+                    flag = '  REGRESSION'
+            elif worse > threshold:
+                flag = '  REGRESSION'
+            if flag:
+                regressions.append(f'{name}.{metric}')
+            print(f"{name:<28} {metric:<14} {before[metric]:>10.2f} {metrics[metric]:>10.2f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=50, help='Requests per benchmark')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed requests before each read benchmark')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to write results')
+    parser.add_argument('--baseline', help='Saved results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative slowdown that counts as a regression')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit non-zero if anything regressed')
+    parser.add_argument('--skip-websocket', action='store_true')
+    args = parser.parse_args()
+
+    api = APIBenchmark(args.iterations, args.warmup)
+    benchmarks = {}
+    try:
+        for suite in (api.list_by_page_depth, api.detail, api.create_and_acknowledge, api.login):
+            benchmarks.update(suite())
+        if not args.skip_websocket:
+            benchmarks.update(asyncio.run(WebSocketBenchmark(api).run()))
+    finally:
+        api.cleanup()
+
+    results = {
+        'meta': {
+            'timestamp': datetime.now(dt_timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': args.iterations,
+            'feedback_rows': Feedback.objects.count(),
+            'list_depth_rows': api.feedback_count,
+        },
+        'benchmarks': benchmarks,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"{'benchmark':<28} {'p50 ms':>9} {'p95 ms':>9} {'ops/s':>9} {'queries':>8}")
+    for name, metrics in benchmarks.items():
+        queries = metrics.get('queries_per_op')
+        print(
+            f"{name:<28} {metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f} "
+            f"{metrics['ops_per_sec']:>9.1f} {'' if queries is None else f'{queries:.1f}':>8}"
+        )
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+        else:
+            print('\nNo regressions against baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+"""
+WebSocket fan-out load harness.
+
+Opens thousands of simulated, authenticated clients against the ASGI
+application in core/asgi.py (seeded managers and their employees), then
+drives feedback creates and acknowledgements through the REST views while
+every client listens on ws/sse/. For each connection count it reports:
+
+- create-to-receive latency percentiles (p50/p95/p99) over every delivery
+- dropped events (expected deliveries that never arrived) and slow-consumer
+  disconnects
+- traced memory per connection
+
+and names the connection count at which latency or memory degrades
+relative to the smallest run.
+
+Needs enough seeded users for the largest step, e.g.:
+    python manage.py seed --managers 50 --employees-per-manager 100 --feedback-per-employee 1
+
+Usage:
+    python scripts/load_ws_fanout.py [--connections 100,500,1000,2000,5000]
+                                     [--events 200] [--degrade-factor 2.0]
+"""
+import os
+import sys
+import asyncio
+import argparse
+import contextlib
+import gc
+import io
+import json
+import logging
+import time
+import tracemalloc
+import django
+
+# Add the parent directory to the path so we can import Django settings
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+django.setup()
+
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.test import Client
+from rest_framework_simplejwt.tokens import AccessToken
+from core.asgi import application
+from feedback.management.commands.seed import SEED_DOMAIN
+from feedback.models import Feedback
+from benchmark import percentile
+
+User = get_user_model()
+
+
+class SimulatedClient:
+    """One authenticated ws/sse/ connection that timestamps every event it receives"""
+
+    def __init__(self, user):
+        self.user = user
+        self.communicator = WebsocketCommunicator(
+            application, f'/ws/sse/{user.id}/?token={AccessToken.for_user(user)}'
+        )
+        self.received = {}
+        self.close_code = None
+        self.listener = None
+
+    async def connect(self):
+        connected, _ = await self.communicator.connect(timeout=30)
+        if not connected:
+            raise RuntimeError(f'Connection rejected for user {self.user.id}')
+        await self.communicator.receive_output(timeout=30)
+        self.listener = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        while True:
+            message = await self.communicator.receive_output(timeout=None)
+            now = time.perf_counter()
+            if message['type'] == 'websocket.close':
+                self.close_code = message.get('code')
+                return
+            event = json.loads(message['text'])
+            data = event.get('data')
+            if isinstance(data, dict) and 'id' in data:
+                self.received[(event['type'], data['id'])] = now
+
+    async def close(self):
+        if self.listener is not None:
+            self.listener.cancel()
+        with contextlib.suppress(Exception):
+            await self.communicator.disconnect(timeout=5)
+
+
+class Driver:
+    """Creates and acknowledges feedback through the REST views"""
+
+    def __init__(self):
+        self.client = Client(HTTP_HOST='localhost')
+        self.tokens = {}
+
+    def auth(self, user_id):
+        if user_id not in self.tokens:
+            self.tokens[user_id] = f'Bearer {AccessToken.for_user(User(pk=user_id))}'
+        return {'HTTP_AUTHORIZATION': self.tokens[user_id]}
+
+    def create(self, employee_id, manager_id):
+        """Returns (feedback id, perf_counter time the request started)"""
+        started = time.perf_counter()
+        response = self.client.post(
+            '/api/feedbacks/',
+            data=json.dumps({
+                'employee_id': employee_id,
+                'strengths': 'Load test strengths.',
+                'areas_to_improve': 'Load test areas to improve.',
+                'sentiment': 'positive',
+            }),
+            content_type='application/json',
+            secure=True,
+            **self.auth(manager_id),
+        )
+        if response.status_code != 201:
+            raise RuntimeError(f'Create returned {response.status_code}: {response.content[:200]!r}')
+        return response.json()['id'], started
+
+    def acknowledge(self, feedback_id, employee_id):
+        started = time.perf_counter()
+        response = self.client.post(f'/api/feedbacks/{feedback_id}/acknowledge/', secure=True, **self.auth(employee_id))
+        if response.status_code != 200:
+            raise RuntimeError(f'Acknowledge returned {response.status_code}: {response.content[:200]!r}')
+        return started
+
+
+def seeded_users(limit):
+    """Managers each followed by their employees, so small runs still cover both roles"""
+    users = []
+    managers = User.objects.filter(email__endswith=f'@{SEED_DOMAIN}', is_manager=True).order_by('id')
+    for manager in managers.iterator():
+        users.append(manager)
+        users.extend(User.objects.filter(manager=manager).order_by('id'))
+        if len(users) >= limit:
+            return users[:limit]
+    raise SystemExit(f'Only {len(users)} seeded users; run `python manage.py seed` with more employees.')
+
+
+async def open_clients(users, concurrency):
+    clients = [SimulatedClient(user) for user in users]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect(client):
+        async with semaphore:
+            await client.connect()
+
+    await asyncio.gather(*(connect(client) for client in clients))
+    return clients
+
+
+async def run_step(count, args):
+    users = await sync_to_async(seeded_users)(count)
+    connected_ids = {user.id for user in users}
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    open_started = time.perf_counter()
+    clients = await open_clients(users, args.connect_concurrency)
+    open_elapsed = time.perf_counter() - open_started
+    memory_per_connection = (tracemalloc.get_traced_memory()[0] - before) / count
+    tracemalloc.stop()
+
+    by_user = {client.user.id: client for client in clients}
+    employees = [user for user in users if not user.is_manager]
+    driver = Driver()
+    sent = []  # (event type, feedback id, start time, recipient user ids)
+
+    def drive():
+        created = []
+        for i in range(args.events):
+            employee = employees[i % len(employees)]
+            feedback_id, started = driver.create(employee.id, employee.manager_id)
+            recipients = [uid for uid in (employee.id, employee.manager_id) if uid in connected_ids]
+            sent.append(('new_feedback', feedback_id, started, [employee.id]))
+            sent.append(('feedback_created', feedback_id, started, [uid for uid in recipients if uid != employee.id]))
+            created.append((feedback_id, employee))
+            if args.interval:
+                time.sleep(args.interval)
+        for feedback_id, employee in created:
+            started = driver.acknowledge(feedback_id, employee.id)
+            recipients = [uid for uid in (employee.id, employee.manager_id) if uid in connected_ids]
+            sent.append(('feedback_acknowledged', feedback_id, started, recipients))
+            if args.interval:
+                time.sleep(args.interval)
+        return [feedback_id for feedback_id, _ in created]
+
+    # Channels dispatches every event through the thread-sensitive executor
+    # (close_old_connections), so REST calls get their own thread as under Daphne
+    drive_started = time.perf_counter()
+    created_ids = await sync_to_async(drive, thread_sensitive=False)()
+    drive_elapsed = time.perf_counter() - drive_started
+
+    # Give in-flight deliveries a chance to land before counting drops
+    expected = sum(len(recipients) for *_, recipients in sent)
+    deadline = time.perf_counter() + args.drain
+    while time.perf_counter() < deadline:
+        if sum(len(client.received) for client in clients) >= expected:
+            break
+        await asyncio.sleep(0.05)
+
+    latencies, dropped = [], 0
+    for event_type, feedback_id, started, recipients in sent:
+        for user_id in recipients:
+            received = by_user[user_id].received.get((event_type, feedback_id))
+            if received is None:
+                dropped += 1
+            else:
+                latencies.append(received - started)
+    slow_disconnects = sum(1 for client in clients if client.close_code == 4009)
+
+    await asyncio.gather(*(client.close() for client in clients))
+    await sync_to_async(lambda: Feedback.objects.filter(id__in=created_ids).delete())()
+
+    return {
+        'connections': count,
+        'connect_per_sec': count / open_elapsed,
+        'bytes_per_connection': memory_per_connection,
+        'requests_per_sec': len(created_ids) * 2 / drive_elapsed,
+        'expected': expected,
+        'dropped': dropped,
+        'slow_disconnects': slow_disconnects,
+        'p50_ms': percentile(latencies, 50) * 1000 if latencies else None,
+        'p95_ms': percentile(latencies, 95) * 1000 if latencies else None,
+        'p99_ms': percentile(latencies, 99) * 1000 if latencies else None,
+    }
+
+
+def degradation(results, factor):
+    """First connection count whose p95 latency or memory per connection exceeds factor x the smallest run"""
+    baseline = results[0]
+    latency_at = memory_at = drops_at = None
+    for result in results[1:]:
+        if latency_at is None and result['p95_ms'] and baseline['p95_ms'] and result['p95_ms'] > baseline['p95_ms'] * factor:
+            latency_at = result['connections']
+        if memory_at is None and result['bytes_per_connection'] > baseline['bytes_per_connection'] * factor:
+            memory_at = result['connections']
+    for result in results:
+        if drops_at is None and (result['dropped'] or result['slow_disconnects']):
+            drops_at = result['connections']
+    return latency_at, memory_at, drops_at
+
+
+def fmt(value, spec):
+    return '-' if value is None else format(value, spec)
+
+
+async def main(args):
+    counts = [int(n) for n in args.connections.split(',')]
+    results = []
+    print(
+        f"{'conns':>7} {'conn/s':>8} {'B/conn':>8} {'req/s':>7} {'events':>7} {'dropped':>8} "
+        f"{'slow':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for count in counts:
+        # The real-time path prints per event; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = await run_step(count, args)
+        results.append(result)
+        print(
+            f"{count:>7} {result['connect_per_sec']:>8.0f} {result['bytes_per_connection']:>8.0f} "
+            f"{result['requests_per_sec']:>7.1f} {result['expected']:>7} {result['dropped']:>8} "
+            f"{result['slow_disconnects']:>5} {fmt(result['p50_ms'], '8.2f')} "
+            f"{fmt(result['p95_ms'], '8.2f')} {fmt(result['p99_ms'], '8.2f')}"
+        )
+
+    latency_at, memory_at, drops_at = degradation(results, args.degrade_factor)
+    print()
+    print(f"p95 latency > {args.degrade_factor}x the {counts[0]}-connection run at: {latency_at or 'not reached'}")
+    print(f"Memory per connection > {args.degrade_factor}x at: {memory_at or 'not reached'}")
+    print(f"First dropped events or slow-consumer disconnects at: {drops_at or 'none'}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'steps': results,
+                'degrades_at': {'latency': latency_at, 'memory': memory_at, 'drops': drops_at},
+            }, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--connections', default='100,500,1000,2000,5000', help='Comma-separated connection counts')
+    parser.add_argument('--events', type=int, default=200, help='Feedbacks created (and then acknowledged) per step')
+    parser.add_argument('--interval', type=float, default=0, help='Seconds to pause between REST calls (0 = back to back)')
+    parser.add_argument('--drain', type=float, default=10, help='Seconds to wait for outstanding deliveries')
+    parser.add_argument('--connect-concurrency', type=int, default=100, help='Connections opened in parallel')
+    parser.add_argument('--degrade-factor', type=float, default=2.0, help='Slowdown vs the smallest run that counts as degraded')
+    parser.add_argument('--output', help='Optional JSON results file')
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    asyncio.run(main(args))
@@ -60,6 +60,11 @@ const EmployeeDashboard = () => {
         })
         break
 
+      case "resync_required":
+        // Missed events are no longer buffered on the server, reload everything
+        fetchFeedbacks()
+        break
+
       default:
         console.log("Unhandled SSE event type:", event.type)
     }
@@ -87,6 +87,11 @@ const ManagerDashboard = () => {
         setTimeout(() => setSuccess(""), 3000)
         break
 
+      case "resync_required":
+        // Missed events are no longer buffered on the server, reload everything
+        fetchData()
+        break
+
       default:
         console.log("Unhandled SSE event type:", event.type)
     }
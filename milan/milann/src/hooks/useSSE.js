@@ -15,6 +15,7 @@ export const useSSE = (onEvent) => {
   const reconnectAttempts = useRef(0)
   const maxReconnectAttempts = 5
   const isManuallyDisconnected = useRef(false)
+  const lastSeqRef = useRef(null)
 
   // Use port 8001 for localhost
   const getWsUrl = () => {
@@ -30,7 +31,8 @@ export const useSSE = (onEvent) => {
       wsHost = "feedbackmangement.onrender.com"
       wsPort = ""
     }
-    return `${wsProtocol}//${wsHost}${wsPort}/ws/sse/${user.id}/?token=${token}`
+    const resume = lastSeqRef.current !== null ? `&last_seq=${lastSeqRef.current}` : ""
+    return `${wsProtocol}//${wsHost}${wsPort}/ws/sse/${user.id}/?token=${token}${resume}`
   }
 
   const connect = () => {
@@ -48,6 +50,10 @@ export const useSSE = (onEvent) => {
       websocket.onmessage = (event) => {
         try {
           const data = JSON.parse(event.data)
+          // Remember the last sequence number seen so a reconnect only replays missed events
+          if (typeof data.seq === "number" && (data.type !== "connected" || lastSeqRef.current === null)) {
+            lastSeqRef.current = data.seq
+          }
           if (onEvent && data.type !== "heartbeat" && data.type !== "connected") {
             onEvent({ type: data.type, data: data.data || data })
           }
@@ -8,6 +8,7 @@ export class SSEClient {
     this.isConnected = false
     this.reconnectAttempts = 0
     this.maxReconnectAttempts = 5
+    this.lastEventId = null
   }
 
   addEventListener(eventType, callback) {
@@ -58,6 +59,7 @@ export class SSEClient {
           Authorization: `Bearer ${token}`,
           Accept: "text/event-stream",
           "Cache-Control": "no-cache",
+          ...(this.lastEventId !== null ? { "Last-Event-ID": this.lastEventId } : {}),
         },
         signal: this.controller.signal,
         ...this.options,
@@ -91,7 +93,10 @@ export class SSEClient {
         let eventData = ""
 
         for (const line of lines) {
-          if (line.startsWith("event:")) {
+          if (line.startsWith("id:")) {
+            // Sent back as Last-Event-ID so a reconnect only replays missed events
+            this.lastEventId = line.substring(3).trim()
+          } else if (line.startsWith("event:")) {
             eventType = line.substring(6).trim()
           } else if (line.startsWith("data:")) {
             eventData = line.substring(5).trim()